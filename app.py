@@ -6,9 +6,6 @@ import os
 # Importa o Streamlit para criação de interface web interativa
 import streamlit as st
 
-# Importa sqlite3 para interação com banco de dados SQLite
-import sqlite3 
-
 # Importa operator para operações funcionais em estruturas de dados
 import operator
 
@@ -33,11 +30,23 @@ from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 # Importa a classe StateGraph e constantes de início/fim para definição de grafos de estados
 from langgraph.graph import StateGraph, END, START
 
-# Importa nós de ferramenta predefinidos para uso dentro do grafo de estados
-from langgraph.prebuilt import ToolNode
+# Importa a classe de ferramenta estruturada, que aceita uma versão síncrona e outra assíncrona
+from langchain_core.tools import StructuredTool
+
+# Importa RunnableLambda para registrar um nó com implementações síncrona e assíncrona
+from langchain_core.runnables import RunnableLambda
+
+# Importa a execução de consultas somente leitura sobre o banco da Folha (sequencial e assíncrona)
+from consulta_db import executa_consulta_folha, executa_consulta_folha_async
+
+# Importa a execução das chamadas de ferramenta (paralela no pool de consultas, com erros devolvidos ao agente)
+from ferramentas import executa_chamadas, executa_chamadas_async
+
+# Importa a busca aproximada de servidores, órgãos e cargos pelo índice de texto
+from consulta_db import busca_servidores
 
-# Importa o decorador tool para registrar funções como ferramentas de agente
-from langchain.tools import tool
+# Importa a resolução do snapshot publicado do banco (o arquivo indicado pelo ponteiro '<banco>.atual')
+from cria_db import banco_atual
 
 # Define o nome do arquivo que será utilizado como banco de dados SQLite
 DB_FILE = "folha_pagamento.db" 
@@ -79,8 +88,6 @@ class AgentState(TypedDict):
     # Declara o campo 'messages' como uma lista de BaseMessage, agregada pelo operador de soma
     messages: Annotated[List[BaseMessage], operator.add]
 
-# Registra a função como ferramenta utilizável pelos agentes
-@tool
 # Define a função query_folha_database, que recebe uma string de consulta SQL e retorna uma string com o resultado
 def query_folha_database(sql_query: str) -> str:
     # Docstring que descreve o comportamento e uso da ferramenta
@@ -89,109 +96,76 @@ def query_folha_database(sql_query: str) -> str:
     e retorna os resultados.
     Usamos esta ferramenta para obter informações sobre Servidores ou remunerações.
     Tabelas disponíveis:
-    1. tb_servidores (colunas: id, nome, cpf, matricula, orgao, cargo)
+    1. tb_servidores (colunas: id, nome, cpf, matricula, orgao, cargo, orgao_busca, cargo_busca)
+       orgao_busca e cargo_busca trazem o órgão e o cargo em minúsculas e sem acentos, para buscas aproximadas
     2. tb_folha_pagamento (colunas: id, matricula, competencia, vencimentos, descontos, liquido)
+    3. tb_resumo_folha_mensal (colunas: orgao, cargo, competencia, total_vencimentos, total_descontos, total_liquido, qtd_servidores)
+    4. tb_resumo_folha_anual (colunas: orgao, cargo, ano, total_vencimentos, total_descontos, total_liquido, qtd_servidores, qtd_competencias)
+    5. tb_eventos_folha (colunas: matricula, competencia, competencia_anterior, vencimentos, vencimentos_anterior, variacao_vencimentos, lacuna_meses, tipo_evento)
+       tipo_evento: 'inicio', 'admissao', 'aumento', 'reducao' ou 'sem_alteracao' em relação à competência anterior do servidor
+    6. tb_situacao_servidor (colunas: matricula, primeira_competencia, ultima_competencia, qtd_competencias, qtd_lacunas, meses_ausente, qtd_aumentos, variacao_total_vencimentos, desligado)
+       desligado = 1 quando o servidor não tem folha na competência mais recente
+    As tabelas de resumo já trazem os totais por órgão, cargo e competência (formato AAAAMM) ou ano (formato AAAA).
+    Prefira-as para totais da folha e contagens de servidores por órgão, cargo, competência ou ano.
+    Para aumentos, admissões e desligamentos use tb_eventos_folha e tb_situacao_servidor em vez de subconsultas correlacionadas.
+    Quando há linhas omitidas, o resultado traz um resumo de todas as linhas (soma, mínimo, máximo, média e percentis
+    das colunas numéricas, valores mais frequentes das colunas de texto); use-o para totais e médias sem nova consulta.
     Importante: Forneça APENAS consultas SQL `SELECT`. Não use `UPDATE`, `DELETE`, `INSERT` ou `DROP`.
     Exemplo de consulta SQL válida:
     'SELECT nome, liquido, descontos, vencimentos FROM tb_servidores s JOIN tb_folha_pagamento f ON s.matricula = f.matricula WHERE orgao = 'Secretaria da Saúde';'
     'SELECT competencia, vencimentos, descontos, liquido FROM tb_servidores s JOIN tb_folha_pagamento f ON f.matricula = s.matricula WHERE nome = 'Servidor 3' ORDER BY competencia DESC;'
-    'SELECT COUNT(DISTINCT f1.matricula) AS total_servidores_com_aumento FROM tb_folha_pagamento AS f1 WHERE f1.vencimentos > (SELECT f2.vencimentos FROM tb_folha_pagamento AS f2 WHERE f2.matricula = f1.matricula AND f2.competencia < f1.competencia ORDER BY f2.competencia DESC LIMIT 1 );'
+    'SELECT SUM(total_liquido) FROM tb_resumo_folha_mensal WHERE orgao = 'Secretaria da Fazenda' AND competencia = '202401';'
+    'SELECT SUM(total_liquido) FROM tb_resumo_folha_anual WHERE orgao = 'Secretaria da Saúde' AND ano = '2024';'
+    'SELECT COUNT(*) AS total_servidores_com_aumento FROM tb_situacao_servidor WHERE qtd_aumentos > 0;'
+    'SELECT s.nome, x.ultima_competencia FROM tb_situacao_servidor x JOIN tb_servidores s ON s.matricula = x.matricula WHERE x.desligado = 1;'
+    'SELECT COUNT(*) FROM tb_servidores WHERE orgao_busca LIKE '%saude%';'
      """
-    # Exibe no console a query recebida para fins de debug
-    print(f"--- Ferramenta query_folha_database recebendo SQL: {sql_query} ---")
-
-    # Verifica se a consulta começa com SELECT, garantindo segurança
-    if not sql_query.strip().upper().startswith("SELECT"):
-
-        # Em caso de tentativa de SQL não-SELECT, exibe erro de segurança
-        print("!!! ERRO DE SEGURANÇA: Tentativa de executar SQL não-SELECT !!!")
-
-        # Retorna mensagem de erro ao usuário
-        return "Erro: Esta ferramenta só pode executar consultas SELECT."
-
-    # Inicializa a variável de conexão como None
-    conn = None
-
-    # Bloco principal de execução da consulta SQL
-    try:
-
-        # Verifica se o arquivo de banco de dados existe antes de conectar
-        if not os.path.exists(DB_FILE):
-
-             # Retorna mensagem de erro se o arquivo não foi encontrado
-             return f"Erro: Arquivo do banco de dados '{DB_FILE}' não encontrado. Execute o script 'create_folha_db.py' primeiro."
-
-        # Abre conexão com o banco de dados SQLite
-        conn = sqlite3.connect(DB_FILE)
-
-        # Cria um cursor para executar comandos SQL
-        cursor = conn.cursor()
-
-        # Executa a consulta SQL recebida
-        cursor.execute(sql_query)
+    # Delega a execução ao gerenciador de conexões somente leitura, que reaproveita conexões aquecidas
+    return executa_consulta_folha(sql_query)
 
-        # Busca todos os resultados retornados pela consulta
-        results = cursor.fetchall()
+# Registra a função como ferramenta utilizável pelos agentes, com a variante assíncrona que roda no pool de consultas
+query_folha_database = StructuredTool.from_function(func=query_folha_database, coroutine=executa_consulta_folha_async)
 
-        # Caso não haja resultados, informa ao usuário
-        if not results:
-
-            return "Nenhum resultado encontrado para a consulta."
-
-        else:
-
-            # Obtém os nomes das colunas a partir da descrição do cursor
-            column_names = [description[0] for description in cursor.description]
-
-            # Cria um cabeçalho com nomes de colunas separados por " | "
-            header = " | ".join(column_names)
-
-            # Converte cada linha de resultados em string, separando campos por " | "
-            rows_str = [" | ".join(map(str, row)) for row in results]
-
-            # Define número máximo de resultados a exibir
-            max_results = 15
+# Define a ferramenta de busca aproximada, usada para resolver nomes digitados pelo usuário antes da consulta SQL
+def busca_servidor(termo: str) -> str:
+    """
+    Busca servidores por nome, órgão ou cargo digitados de forma aproximada, sem diferenciar acentos
+    e maiúsculas (ex.: 'saude', 'fazenda', 'servidor 2', 'tecnico educacao').
+    Retorna matricula, nome, orgao e cargo dos servidores encontrados, com os nomes exatos gravados no banco.
+    Use-a antes de query_folha_database quando o nome, órgão ou cargo da pergunta puder estar escrito
+    de outra forma, e filtre a consulta SQL pelas matrículas ou pelos valores exatos retornados.
+    """
+    # Delega a busca ao índice de texto do banco
+    return busca_servidores(termo)
 
-            # Monta a saída inicial com quantidade de registros e cabeçalho
-            output = f"Resultados da consulta ({len(results)} encontrados):\n{header}\n" + "\n".join(rows_str[:max_results])
+# Registra a função como ferramenta utilizável pelos agentes
+busca_servidor = StructuredTool.from_function(func=busca_servidor)
 
-            # Se houver mais resultados que o limite, adiciona informação de omissão
-            if len(results) > max_results:
-                output += f"\n... (mais {len(results) - max_results} resultados omitidos)"
+# Lista de ferramentas
+tools = [query_folha_database, busca_servidor]
 
-            # Retorna a string formatada com os resultados da consulta
-            return output
+# Indexa as ferramentas pelo nome para o nó de execução
+tools_por_nome = {t.name: t for t in tools}
 
-    # Captura erros específicos de SQLite
-    except sqlite3.Error as e:
-        
-        # Exibe mensagem de erro SQL no console para debug
-        print(f"!!! ERRO SQL: {e} ao executar '{sql_query}' !!!")
-        
-        # Retorna mensagem de erro ao usuário com detalhes do SQLite
-        return f"Erro ao executar a consulta SQL: {e}. Verifique a sintaxe da sua consulta e os nomes das tabelas/colunas."
-   
-    # Captura quaisquer outras exceções inesperadas
-    except Exception as e:
+# Monta as ToolMessages na ordem das chamadas de ferramenta
+def mensagens_ferramentas(tool_calls, conteudos) -> list:
+    return [ToolMessage(content=c, name=tc["name"], tool_call_id=tc["id"]) for tc, c in zip(tool_calls, conteudos)]
 
-        # Exibe mensagem genérica de erro no console para debug
-        print(f"!!! ERRO Inesperado na ferramenta: {e} !!!")
-        
-        # Retorna mensagem de erro genérico ao usuário
-        return f"Ocorreu um erro inesperado na ferramenta de banco de dados: {e}"
-    
-    # Bloco finally executado sempre, para fechar conexão se aberta
-    finally:
-        
-        # Se a conexão foi estabelecida, fecha-a para não deixar recursos abertos
-        if conn:
-            conn.close()
+# Executa as chamadas de ferramenta da última mensagem da IA (as consultas ao banco em paralelo, no pool
+# limitado de consultas), devolvendo as ToolMessages na mesma ordem das chamadas
+def executa_ferramentas(state: AgentState) -> dict:
+    tool_calls = state["messages"][-1].tool_calls
+    conteudos = executa_chamadas(tool_calls, tools_por_nome, paralelas={query_folha_database.name})
+    return {"messages": mensagens_ferramentas(tool_calls, conteudos)}
 
-# Lista de ferramentas
-tools = [query_folha_database]
+# Versão assíncrona do nó de ferramentas: dispara todas as chamadas e aguarda na ordem original
+async def executa_ferramentas_async(state: AgentState) -> dict:
+    tool_calls = state["messages"][-1].tool_calls
+    conteudos = await executa_chamadas_async(tool_calls, tools_por_nome)
+    return {"messages": mensagens_ferramentas(tool_calls, conteudos)}
 
-# Cria o objeto para o nó de ferramenta
-tool_node = ToolNode(tools) 
+# Cria o objeto para o nó de ferramenta, usado tanto por invoke quanto por ainvoke
+tool_node = RunnableLambda(executa_ferramentas, afunc=executa_ferramentas_async)
 
 # Define a função que cria um agente “runnable” a partir de um LLM e um prompt de sistema
 def cria_agente_runnable(llm, system_prompt):
@@ -229,6 +203,8 @@ def groq_agent_node(state: AgentState):
         Sua principal função é responder perguntas sobre servidores e remunerações consultando o banco de dados da Folha de Pagamento.
         Use a ferramenta 'query_folha_database' fornecendo uma consulta SQL SELECT válida para buscar as informações pedidas.
         Consulte a descrição da ferramenta para ver o schema do banco de dados (tabelas: tb_servidores, tb_folha_pagamento e suas colunas).
+        Quando o nome, órgão ou cargo da pergunta puder estar escrito de forma aproximada (ex.: 'saude', 'servidor 2'),
+        use antes a ferramenta 'busca_servidor' para obter as matrículas e os nomes exatos, em vez de LIKE sobre tb_servidores.
         Seja direto e baseie suas respostas nos dados retornados pela ferramenta. Se a ferramenta retornar um erro, informe o usuário.
         Não invente informações se elas não estiverem no banco de dados.
         """
@@ -283,6 +259,8 @@ def openai_agent_node(state: AgentState):
         Seu objetivo é ajudar o usuário com informações do banco de dados Folha de Pagamento.
         Utilize a ferramenta 'query_folha_database' para executar consultas SQL SELECT e buscar dados sobre servidores ou remunerações.
         Refira-se à descrição da ferramenta para entender o schema do banco (tabelas: tb_servidores, tb_folha_pagamento e suas colunas).
+        Para nomes, órgãos ou cargos digitados de forma aproximada (ex.: 'fazenda', 'servidor 2'), use antes a ferramenta
+        'busca_servidor' para obter as matrículas e os nomes exatos, em vez de LIKE sobre tb_servidores.
         Seja direto e baseie suas respostas; colunas relevantes como nome, cpf_mascarado, cargo, orgao_lotacao, status, ano_mes, remuneracao_basica_bruta, verbas_indenizatorias, total_descontos, salario_liquido).
         Formule consultas SQL SELECT precisas com base na pergunta do usuário.
         Apresente os resultados de forma clara. Se encontrar um erro da ferramenta, comunique-o.
@@ -455,7 +433,7 @@ def compila_grafo():
 if "app" not in st.session_state:
 
     # Se o arquivo do banco de dados não existir, exibe erro e orienta a criação
-    if not os.path.exists(DB_FILE):
+    if not os.path.exists(banco_atual(DB_FILE)):
         st.error(f"Erro: O arquivo do banco de dados '{DB_FILE}' não foi encontrado.")
         st.info("Por favor, execute o script 'cria_db.py' no mesmo diretório para criar o banco de dados e depois recarregue esta página.")
         st.stop()
@@ -0,0 +1,119 @@
+"""
+Benchmark dos motores de consulta (SQLite x DuckDB/Parquet) sobre o catálogo de
+perguntas de exemplo da barra lateral do app.
+
+Uso:
+    python benchmarks/benchmark_backends.py --linhas 1000000 10000000 50000000
+"""
+
+import argparse
+import sqlite3
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from dados_sinteticos import gera_banco_sintetico
+
+import cria_db
+from consulta_db import GerenciadorConexoes, GerenciadorDuckDB
+
+# Consultas que os agentes geram para as perguntas de exemplo da barra lateral
+CATALOGO = {
+    "folha da fazenda em 202001": (
+        "SELECT SUM(f.liquido) AS total_liquido FROM tb_servidores s "
+        "JOIN tb_folha_pagamento f ON f.matricula = s.matricula "
+        "WHERE s.orgao = 'Secretaria da Fazenda' AND f.competencia = '202001'"
+    ),
+    "folha da saúde no ano de 2021": (
+        "SELECT SUM(f.liquido) AS total_liquido FROM tb_servidores s "
+        "JOIN tb_folha_pagamento f ON f.matricula = s.matricula "
+        "WHERE s.orgao = 'Secretaria da Saúde' AND f.competencia BETWEEN '202101' AND '202112'"
+    ),
+    "folha por órgão e ano": (
+        "SELECT s.orgao, substr(f.competencia, 1, 4) AS ano, SUM(f.liquido) AS total_liquido "
+        "FROM tb_servidores s JOIN tb_folha_pagamento f ON f.matricula = s.matricula "
+        "GROUP BY 1, 2 ORDER BY 1, 2"
+    ),
+    "simulação de aumento de 10% na fazenda": (
+        "SELECT SUM(f.vencimentos * 1.1 - f.descontos) AS total_liquido FROM tb_servidores s "
+        "JOIN tb_folha_pagamento f ON f.matricula = s.matricula "
+        "WHERE s.orgao = 'Secretaria da Fazenda' AND f.competencia LIKE '2021%'"
+    ),
+    "servidores por cargo": "SELECT cargo, COUNT(*) AS qtd_servidores FROM tb_servidores GROUP BY cargo",
+    "servidores com aumento": (
+        "SELECT COUNT(*) AS qtd_servidores FROM tb_situacao_servidor WHERE qtd_aumentos > 0"
+    ),
+    "média de vencimentos por competência": (
+        "SELECT competencia, AVG(vencimentos) AS media_vencimentos FROM tb_folha_pagamento "
+        "GROUP BY competencia ORDER BY competencia"
+    ),
+}
+
+
+def mede(gerenciador, sql: str, repeticoes: int) -> float:
+    """Retorna a mediana, em milissegundos, de execuções completas (execute + fetchall)."""
+    conn = gerenciador.obter_conexao()
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        cursor = conn.cursor()
+        cursor.execute(sql).fetchall()
+        cursor.close()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(tempos)
+
+
+def colunas(gerenciador, sql: str) -> list:
+    """Nomes das colunas do resultado, que devem ser os mesmos nos dois motores."""
+    cursor = gerenciador.obter_conexao().cursor()
+    cursor.execute(sql)
+    nomes = [d[0] for d in cursor.description]
+    cursor.close()
+    return nomes
+
+
+def executa(n_linhas: int, diretorio: Path, repeticoes: int) -> None:
+    db_file = diretorio / f"folha_{n_linhas}.db"
+    parquet_dir = diretorio / f"parquet_{n_linhas}"
+
+    print(f"\nGerando {n_linhas:,} linhas sintéticas...")
+    gera_banco_sintetico(str(db_file), n_linhas)
+    conn = sqlite3.connect(db_file)
+    cria_db.exporta_parquet(conn, str(parquet_dir))
+    conn.close()
+
+    motores = {"sqlite": GerenciadorConexoes(str(db_file)), "duckdb": GerenciadorDuckDB(str(parquet_dir))}
+
+    print(f"\n| consulta ({n_linhas:,} linhas) | sqlite (ms) | duckdb (ms) |")
+    print("|---|---:|---:|")
+    for nome, sql in CATALOGO.items():
+        nomes = {motor: colunas(g, sql) for motor, g in motores.items()}
+        if nomes["sqlite"] != nomes["duckdb"]:
+            raise SystemExit(f"Colunas diferentes entre os motores em '{nome}': {nomes}")
+        tempos = [mede(g, sql, repeticoes) for g in motores.values()]
+        print(f"| {nome} | {tempos[0]:.1f} | {tempos[1]:.1f} |")
+
+    for g in motores.values():
+        g.fecha_todas()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara os motores SQLite e DuckDB no catálogo de consultas do app.")
+    parser.add_argument("--linhas", type=int, nargs="+", default=[1_000_000], help="Tamanhos da tabela de folha a testar.")
+    parser.add_argument("--repeticoes", type=int, default=3, help="Execuções por consulta (usa a mediana).")
+    parser.add_argument("--diretorio", help="Diretório de trabalho (padrão: temporário).")
+    args = parser.parse_args()
+
+    if args.diretorio:
+        Path(args.diretorio).mkdir(parents=True, exist_ok=True)
+        for n in args.linhas:
+            executa(n, Path(args.diretorio), args.repeticoes)
+    else:
+        with tempfile.TemporaryDirectory() as diretorio:
+            for n in args.linhas:
+                executa(n, Path(diretorio), args.repeticoes)
+
+
+if __name__ == "__main__":
+    main()
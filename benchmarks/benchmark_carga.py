@@ -0,0 +1,97 @@
+"""
+Compara o tempo de montagem do banco da Folha a partir de um CSV sintético: o caminho atual
+(cria_database + popula_tabelas, com pandas to_sql e as planilhas de exportação), a carga em
+lotes (cria_db.carga_em_lotes) e a carga rápida (cria_db.carga_rapida: arquivo temporário sem
+journal, índices ao final, VACUUM INTO e troca atômica).
+
+Uso:
+    python benchmarks/benchmark_carga.py --linhas 1000000
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from dados_sinteticos import RAIZ, gera_csv_sintetico
+
+import cria_db
+
+SQL_FILE = str(RAIZ / cria_db.SQL_FILE)
+
+
+def caminho_atual(db_file: str, csv_file: str) -> None:
+    conn, cursor = cria_db.cria_database(db_file, SQL_FILE)
+    cria_db.popula_tabelas(conn, cursor, csv_file)
+    # Planilhas gravadas como antes da etapa de exportação: DataFrames inteiros, em série
+    for nome, consulta in cria_db.PLANILHAS_EXPORTACAO.items():
+        df = pd.read_sql_query(consulta, conn)
+        df.to_excel(f"{nome}.xlsx", index=False)
+        df.to_csv(f"{nome}.csv", index=False, sep=";")
+    conn.close()
+
+
+def carga_em_lotes(db_file: str, csv_file: str) -> None:
+    conn, _ = cria_db.cria_database(db_file, SQL_FILE)
+    cria_db.carga_em_lotes(conn, csv_file)
+    conn.close()
+
+
+def carga_rapida(db_file: str, csv_file: str) -> None:
+    cria_db.carga_rapida(db_file, csv_file, SQL_FILE)
+
+
+MODOS = {
+    "atual (to_sql + planilhas)": caminho_atual,
+    "em lotes": carga_em_lotes,
+    "rápida": carga_rapida,
+}
+
+
+def executa(n_linhas: int, diretorio: Path, modos: list) -> None:
+    csv_file = str(diretorio / f"folha_{n_linhas}.csv")
+    print(f"\nGerando CSV com {n_linhas:,} linhas sintéticas...")
+    gera_csv_sintetico(csv_file, n_linhas)
+
+    # O caminho atual grava as planilhas de exportação no diretório atual
+    os.chdir(diretorio)
+
+    print(f"\n| ({n_linhas:,} linhas) | segundos | linhas/s | arquivo (MB) |")
+    print("|---|---:|---:|---:|")
+    referencia = None
+    for nome in modos:
+        db_file = str(diretorio / "folha.db")
+        inicio = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            MODOS[nome](db_file, csv_file)
+        segundos = time.perf_counter() - inicio
+        referencia = referencia or segundos
+        tamanho = os.path.getsize(db_file) / 1024 / 1024
+        print(f"| {nome} | {segundos:.1f} ({referencia / segundos:.1f}x) | {n_linhas / segundos:,.0f} | {tamanho:.1f} |")
+        os.remove(db_file)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara os modos de carga do banco da Folha.")
+    parser.add_argument("--linhas", type=int, nargs="+", default=[1_000_000], help="Tamanhos do CSV a testar.")
+    parser.add_argument("--modos", nargs="+", choices=list(MODOS), default=list(MODOS), help="Modos de carga a medir.")
+    parser.add_argument("--diretorio", help="Diretório de trabalho (padrão: temporário).")
+    args = parser.parse_args()
+
+    if args.diretorio:
+        Path(args.diretorio).mkdir(parents=True, exist_ok=True)
+        for n in args.linhas:
+            executa(n, Path(args.diretorio).resolve(), args.modos)
+    else:
+        with tempfile.TemporaryDirectory() as diretorio:
+            for n in args.linhas:
+                executa(n, Path(diretorio), args.modos)
+
+
+if __name__ == "__main__":
+    main()
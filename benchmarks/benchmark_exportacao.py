@@ -0,0 +1,81 @@
+"""
+Compara a gravação das planilhas de exportação (servidores e folha, em XLSX e CSV): o caminho
+anterior (DataFrames inteiros em memória, pandas to_excel/to_csv em série) e a etapa de
+exportação (cria_db.exporta_planilhas: leitura do SQLite em lotes, openpyxl write-only,
+CSV lote a lote e um processo por arquivo).
+
+Uso:
+    python benchmarks/benchmark_exportacao.py --linhas 1000000
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from dados_sinteticos import RAIZ, gera_csv_sintetico
+
+import cria_db
+
+SQL_FILE = str(RAIZ / cria_db.SQL_FILE)
+
+
+def pandas_em_serie(db_file: str, destino: Path) -> None:
+    conn = cria_db._conexao_leitura(db_file)
+    for nome, consulta in cria_db.PLANILHAS_EXPORTACAO.items():
+        df = pd.read_sql_query(consulta, conn)
+        df.to_excel(destino / f"{nome}.xlsx", index=False)
+        df.to_csv(destino / f"{nome}.csv", index=False, sep=";")
+    conn.close()
+
+
+def etapa_exportacao(db_file: str, destino: Path) -> None:
+    cria_db.exporta_planilhas(db_file, destino=str(destino))
+
+
+MODOS = {
+    "pandas (em série)": pandas_em_serie,
+    "etapa de exportação": etapa_exportacao,
+}
+
+
+def executa(n_linhas: int, diretorio: Path, modos: list) -> None:
+    csv_file = str(diretorio / f"folha_{n_linhas}.csv")
+    db_file = str(diretorio / "folha.db")
+    print(f"\nGerando banco com {n_linhas:,} linhas sintéticas...")
+    gera_csv_sintetico(csv_file, n_linhas)
+    with contextlib.redirect_stdout(io.StringIO()):
+        cria_db.carga_rapida(db_file, csv_file, SQL_FILE)
+
+    print(f"\n| ({n_linhas:,} linhas, {os.cpu_count()} CPU) | segundos | linhas/s |")
+    print("|---|---:|---:|")
+    referencia = None
+    for nome in modos:
+        destino = diretorio / nome.split()[0]
+        destino.mkdir(exist_ok=True)
+        inicio = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            MODOS[nome](db_file, destino)
+        segundos = time.perf_counter() - inicio
+        referencia = referencia or segundos
+        print(f"| {nome} | {segundos:.1f} ({referencia / segundos:.1f}x) | {n_linhas / segundos:,.0f} |")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara a gravação das planilhas de exportação.")
+    parser.add_argument("--linhas", type=int, nargs="+", default=[1_000_000], help="Linhas da folha a exportar.")
+    parser.add_argument("--modos", nargs="+", choices=list(MODOS), default=list(MODOS), help="Modos de exportação a medir.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        for n in args.linhas:
+            executa(n, Path(diretorio), args.modos)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Compara o layout padrão da folha (competência TEXT, valores REAL, id AUTOINCREMENT e índices
+separados) com o layout compacto de cria_db.compacta_folha (competência INTEGER, centavos,
+STRICT WITHOUT ROWID agrupado por matrícula e competência): tamanho do arquivo e tempo das
+consultas típicas, sempre pela view/tabela tb_folha_pagamento usada pelos agentes.
+
+Uso:
+    python benchmarks/benchmark_layout.py --linhas 1000000
+"""
+
+import argparse
+import os
+import shutil
+import sqlite3
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from dados_sinteticos import gera_banco_sintetico
+
+import cria_db
+
+# Consultas sobre a tabela fato nos padrões gerados pelos agentes
+CONSULTAS = {
+    "soma de toda a folha (varredura)": "SELECT SUM(liquido) FROM tb_folha_pagamento",
+    "soma por competência (varredura)": (
+        "SELECT competencia, SUM(vencimentos), SUM(liquido) FROM tb_folha_pagamento GROUP BY competencia"
+    ),
+    "folha de uma competência": "SELECT SUM(liquido) FROM tb_folha_pagamento WHERE competencia = '202106'",
+    "histórico de um servidor": (
+        "SELECT competencia, vencimentos, descontos, liquido FROM tb_folha_pagamento "
+        "WHERE matricula = 'A-1500' ORDER BY competencia"
+    ),
+    "folha de um órgão em um ano": (
+        "SELECT SUM(f.liquido) FROM tb_servidores s JOIN tb_folha_pagamento f ON f.matricula = s.matricula "
+        "WHERE s.orgao = 'Secretaria da Fazenda' AND f.competencia BETWEEN '202101' AND '202112'"
+    ),
+}
+
+
+def tamanho_folha(conn) -> float:
+    """Retorna, em MB, o espaço da tabela fato e de seus índices (via dbstat)."""
+    return conn.execute("""
+        SELECT SUM(pgsize) FROM dbstat WHERE name IN (
+            SELECT name FROM sqlite_master
+            WHERE type IN ('table', 'index') AND tbl_name IN ('tb_folha_pagamento', 'tb_folha_compacta')
+        )
+    """).fetchone()[0] / 1024 / 1024
+
+
+def mede(conn, sql: str, repeticoes: int) -> float:
+    """Retorna a mediana, em milissegundos, de execuções completas (execute + fetchall)."""
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        conn.execute(sql).fetchall()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(tempos)
+
+
+def executa(n_linhas: int, diretorio: Path, repeticoes: int) -> None:
+    padrao = diretorio / f"padrao_{n_linhas}.db"
+    compacto = diretorio / f"compacto_{n_linhas}.db"
+
+    print(f"\nGerando {n_linhas:,} linhas sintéticas...")
+    gera_banco_sintetico(str(padrao), n_linhas)
+    shutil.copy(padrao, compacto)
+
+    conn = sqlite3.connect(compacto)
+    cria_db.compacta_folha(conn)
+    conn.close()
+
+    # Compacta os dois arquivos para comparar apenas o espaço ocupado pelos dados e índices
+    bancos = {}
+    for nome, caminho in (("padrão", padrao), ("compacto", compacto)):
+        conn = sqlite3.connect(caminho)
+        conn.execute("VACUUM")
+        bancos[nome] = conn
+
+    print(f"\n| ({n_linhas:,} linhas) | padrão | compacto |")
+    print("|---|---:|---:|")
+    tamanhos = [tamanho_folha(conn) for conn in bancos.values()]
+    print(f"| tabela da folha + índices (MB) | {tamanhos[0]:.1f} | {tamanhos[1]:.1f} |")
+    tamanhos = [os.path.getsize(caminho) / 1024 / 1024 for caminho in (padrao, compacto)]
+    print(f"| arquivo completo, com tabelas derivadas (MB) | {tamanhos[0]:.1f} | {tamanhos[1]:.1f} |")
+    for descricao, sql in CONSULTAS.items():
+        tempos = [mede(conn, sql, repeticoes) for conn in bancos.values()]
+        print(f"| {descricao} (ms) | {tempos[0]:.1f} | {tempos[1]:.1f} |")
+
+    for conn in bancos.values():
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara o layout padrão e o compacto da tabela de folha.")
+    parser.add_argument("--linhas", type=int, nargs="+", default=[1_000_000], help="Tamanhos da tabela de folha a testar.")
+    parser.add_argument("--repeticoes", type=int, default=3, help="Execuções por consulta (usa a mediana).")
+    parser.add_argument("--diretorio", help="Diretório de trabalho (padrão: temporário).")
+    args = parser.parse_args()
+
+    if args.diretorio:
+        Path(args.diretorio).mkdir(parents=True, exist_ok=True)
+        for n in args.linhas:
+            executa(n, Path(args.diretorio), args.repeticoes)
+    else:
+        with tempfile.TemporaryDirectory() as diretorio:
+            for n in args.linhas:
+                executa(n, Path(diretorio), args.repeticoes)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Compara o tamanho, em tokens estimados, da saída da ferramenta query_folha_database
+no formato anterior (" | " e 15 linhas) e no formato compacto atual, para as consultas
+das perguntas de exemplo da barra lateral sobre o banco de exemplo.
+
+Uso:
+    python benchmarks/benchmark_tokens.py
+"""
+
+import os
+import tempfile
+from pathlib import Path
+
+import dados_sinteticos  # noqa: F401  (inclui a raiz do repositório no sys.path)
+
+import cria_db
+from consulta_db import CacheResultados, GerenciadorConexoes, estima_tokens, executa_consulta_folha
+
+RAIZ = Path(__file__).resolve().parent.parent
+
+# Consultas geradas pelos agentes para as perguntas da barra lateral do app
+CATALOGO = {
+    "servidores ativos": "SELECT COUNT(*) FROM tb_situacao_servidor WHERE desligado = 0",
+    "remuneração do Servidor 2": (
+        "SELECT s.nome, f.competencia, f.vencimentos, f.descontos, f.liquido FROM tb_servidores s "
+        "JOIN tb_folha_pagamento f ON f.matricula = s.matricula WHERE s.nome = 'Servidor 2' ORDER BY f.competencia DESC"
+    ),
+    "assistentes": "SELECT COUNT(*) FROM tb_servidores WHERE cargo = 'Assistente'",
+    "servidores da saúde": "SELECT nome, matricula, orgao, cargo FROM tb_servidores WHERE orgao = 'Secretaria da Saúde'",
+    "assistentes na fazenda": (
+        "SELECT nome, orgao, cargo FROM tb_servidores WHERE orgao = 'Secretaria da Fazenda' AND cargo = 'Assistente'"
+    ),
+    "servidores com aumento": "SELECT COUNT(*) FROM tb_situacao_servidor WHERE qtd_aumentos > 0",
+    "desligados": (
+        "SELECT s.nome, x.ultima_competencia, x.desligado FROM tb_situacao_servidor x "
+        "JOIN tb_servidores s ON s.matricula = x.matricula WHERE x.desligado = 1"
+    ),
+    "folha da fazenda em 202401": (
+        "SELECT SUM(total_liquido) FROM tb_resumo_folha_mensal WHERE orgao = 'Secretaria da Fazenda' AND competencia = '202401'"
+    ),
+    "folha da saúde em 2024": (
+        "SELECT SUM(total_liquido) FROM tb_resumo_folha_anual WHERE orgao = 'Secretaria da Saúde' AND ano = '2024'"
+    ),
+    "simulação da saúde (base 202404)": (
+        "SELECT s.orgao, f.competencia, s.nome, f.vencimentos, f.descontos, f.liquido FROM tb_servidores s "
+        "JOIN tb_folha_pagamento f ON f.matricula = s.matricula "
+        "WHERE s.orgao = 'Secretaria da Saúde' AND f.competencia = '202404'"
+    ),
+    "folha da fazenda em 2024": (
+        "SELECT ano, total_vencimentos, total_descontos, total_liquido, qtd_servidores FROM tb_resumo_folha_anual "
+        "WHERE orgao = 'Secretaria da Fazenda' AND cargo = 'Assistente' AND ano = '2024'"
+    ),
+    "aumento de 10% na fazenda em 2024": (
+        "SELECT SUM(total_vencimentos * 1.1 - total_descontos) FROM tb_resumo_folha_anual "
+        "WHERE orgao = 'Secretaria da Fazenda' AND ano = '2024'"
+    ),
+}
+
+
+def formato_anterior(conn, sql: str, max_results: int = 15) -> str:
+    """Reproduz a formatação original da ferramenta (" | ", str() dos valores e 15 linhas)."""
+    cursor = conn.execute(sql)
+    results = cursor.fetchall()
+    if not results:
+        return "Nenhum resultado encontrado para a consulta."
+    header = " | ".join(d[0] for d in cursor.description)
+    rows_str = [" | ".join(map(str, row)) for row in results[:max_results]]
+    output = f"Resultados da consulta ({len(results)} encontrados):\n{header}\n" + "\n".join(rows_str)
+    if len(results) > max_results:
+        output += f"\n... (mais {len(results) - max_results} resultados omitidos)"
+    return output
+
+
+def main():
+    with tempfile.TemporaryDirectory() as diretorio:
+        # A quarentena da carga, se houver rejeições, fica no diretório atual
+        os.chdir(diretorio)
+        db_file = os.path.join(diretorio, "folha.db")
+        conn, cursor = cria_db.cria_database(db_file, str(RAIZ / "criacao_banco.sql"))
+        cria_db.popula_tabelas(conn, cursor, str(RAIZ / "folha_pe_200linhas.csv"))
+
+        gerenciador = GerenciadorConexoes(db_file)
+        total_anterior = total_atual = 0
+
+        linhas = []
+        for nome, sql in CATALOGO.items():
+            anterior = estima_tokens(formato_anterior(conn, sql))
+            atual = estima_tokens(executa_consulta_folha(sql, gerenciador, CacheResultados(0)))
+            total_anterior += anterior
+            total_atual += atual
+            linhas.append(f"| {nome} | {anterior} | {atual} |")
+
+        conn.close()
+        gerenciador.fecha_todas()
+
+    print("\n| pergunta | formato anterior (tokens) | formato compacto (tokens) |")
+    print("|---|---:|---:|")
+    print("\n".join(linhas))
+    print(f"| **total** | **{total_anterior}** | **{total_atual}** ({100 * (total_anterior - total_atual) / total_anterior:.0f}% menos) |")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Geração de dados sintéticos da Folha de Pagamento para os benchmarks.
+
+Produz lotes com as mesmas colunas do CSV de exemplo (folha_pe_200linhas.csv),
+permitindo simular históricos de milhões de linhas sem dados reais.
+"""
+
+import os
+import sqlite3
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Permite importar os módulos da raiz do projeto ao executar a partir de benchmarks/
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+
+import cria_db  # noqa: E402
+
+ORGAOS = np.array(["Secretaria da Saúde", "Secretaria da Fazenda", "Secretaria da Educação", "Secretaria de Administração"])
+CARGOS = np.array(["Assistente", "Analista", "Gestor", "Técnico"])
+COLUNAS = ["nome", "cpf", "matricula", "orgao", "cargo", "competencia", "vencimentos", "descontos", "liquido"]
+
+
+def competencias(qtd_meses: int, ano_inicial: int = 2020) -> list:
+    """Retorna qtd_meses competências consecutivas no formato AAAAMM."""
+    return [f"{ano_inicial + m // 12}{m % 12 + 1:02d}" for m in range(qtd_meses)]
+
+
+def gera_folha_sintetica(n_linhas: int, qtd_meses: int = 24, tamanho_lote: int = 500_000, semente: int = 42):
+    """
+    Gera DataFrames em lotes (ordenados por matrícula e competência) somando n_linhas.
+    Cada servidor tem folha em todos os meses, com aumentos ocasionais.
+    """
+    rng = np.random.default_rng(semente)
+    meses = np.array(competencias(qtd_meses))
+    n_servidores = -(-n_linhas // qtd_meses)
+    servidores_por_lote = max(1, tamanho_lote // qtd_meses)
+    gerado = 0
+
+    for inicio in range(0, n_servidores, servidores_por_lote):
+        ids = np.arange(inicio, min(inicio + servidores_por_lote, n_servidores))
+
+        # Atributos fixos de cada servidor, repetidos para cada competência
+        base = rng.integers(2000, 9000, len(ids)).astype(float)
+        descontos = np.round(base * rng.uniform(0.05, 0.2, len(ids)))
+        aumentos = np.cumsum(rng.random((len(ids), qtd_meses)) < 0.05, axis=1) * 100.0
+        vencimentos = (base[:, None] + aumentos).ravel()
+
+        lote = pd.DataFrame({
+            "nome": np.repeat(np.char.add("Servidor ", ids.astype(str)), qtd_meses),
+            "cpf": np.repeat([f"{i % 1000:03d}.{i // 1000 % 1000:03d}.{i // 1000000 % 1000:03d}-{i % 97:02d}" for i in ids], qtd_meses),
+            "matricula": np.repeat(np.char.add("A-", (ids + 1000).astype(str)), qtd_meses),
+            "orgao": np.repeat(ORGAOS[ids % len(ORGAOS)], qtd_meses),
+            "cargo": np.repeat(CARGOS[(ids // len(ORGAOS)) % len(CARGOS)], qtd_meses),
+            "competencia": np.tile(meses, len(ids)),
+            "vencimentos": vencimentos,
+            "descontos": np.repeat(descontos, qtd_meses),
+        })
+        lote["liquido"] = lote["vencimentos"] - lote["descontos"]
+
+        # Corta o último lote para respeitar o total pedido
+        lote = lote.iloc[: n_linhas - gerado]
+        gerado += len(lote)
+        yield lote[COLUNAS]
+
+
+def gera_csv_sintetico(caminho: str, n_linhas: int, **kwargs) -> str:
+    """Grava um CSV sintético no formato do arquivo de exemplo."""
+    for i, lote in enumerate(gera_folha_sintetica(n_linhas, **kwargs)):
+        lote.to_csv(caminho, mode="w" if i == 0 else "a", header=i == 0, index=False)
+    return caminho
+
+
+def gera_banco_sintetico(db_file: str, n_linhas: int, **kwargs) -> str:
+    """Cria um banco SQLite completo (schema, índices e tabelas derivadas) com dados sintéticos."""
+    if os.path.exists(db_file):
+        os.remove(db_file)
+
+    conn, _ = cria_db.cria_database(db_file, str(RAIZ / cria_db.SQL_FILE))
+    for lote in gera_folha_sintetica(n_linhas, **kwargs):
+        servidores = lote.drop_duplicates("matricula")
+        with conn:
+            conn.executemany(
+                "INSERT INTO tb_servidores (nome, cpf, matricula, orgao, cargo) VALUES (?, ?, ?, ?, ?)",
+                servidores[["nome", "cpf", "matricula", "orgao", "cargo"]].itertuples(index=False),
+            )
+            conn.executemany(
+                "INSERT INTO tb_folha_pagamento (matricula, competencia, vencimentos, descontos, liquido) VALUES (?, ?, ?, ?, ?)",
+                lote[["matricula", "competencia", "vencimentos", "descontos", "liquido"]].itertuples(index=False),
+            )
+
+    cria_db.atualiza_dados_derivados(conn)
+    conn.execute("ANALYZE")
+    conn.commit()
+    conn.close()
+    return db_file
@@ -22,9 +22,47 @@ AGENTICOPS_API_KEY: Optional[str] = os.getenv("AGENTICOPS_API_KEY")
 # ==========================================
 
 DATABASE_PATH: str = os.getenv("DATABASE_PATH", "folha_pagamento.db")
-DATABASE_TIMEOUT: int = 30
+DATABASE_TIMEOUT: int = int(os.getenv("DATABASE_TIMEOUT", "30"))
 DATABASE_MAX_RETRIES: int = 3
 
+# Motor usado pela ferramenta de consulta: "sqlite" (padrão) ou "duckdb" (colunar, sobre os arquivos Parquet)
+QUERY_BACKEND: str = os.getenv("QUERY_BACKEND", "sqlite").lower()
+PARQUET_DIR: str = os.getenv("PARQUET_DIR", "parquet")
+
+# Ajustes das conexões somente leitura usadas pela ferramenta de consulta
+DATABASE_MMAP_SIZE: int = int(os.getenv("DATABASE_MMAP_SIZE", str(256 * 1024 * 1024)))
+DATABASE_CACHE_SIZE_KB: int = int(os.getenv("DATABASE_CACHE_SIZE_KB", "65536"))
+
+# Orçamento de execução das consultas geradas pelos agentes:
+# tempo de parede (DATABASE_TIMEOUT, em segundos) e instruções da VM do SQLite
+DATABASE_MAX_VM_STEPS: int = int(os.getenv("DATABASE_MAX_VM_STEPS", "500000000"))
+DATABASE_PROGRESS_INTERVAL: int = int(os.getenv("DATABASE_PROGRESS_INTERVAL", "10000"))
+
+# Avaliação do plano (EXPLAIN QUERY PLAN) antes de executar o SQL dos agentes:
+# "rejeitar" bloqueia planos acima de PLAN_REJECT_ROWS, "avisar" apenas anexa alertas, "desligado" não avalia
+PLAN_GATE_MODE: str = os.getenv("PLAN_GATE_MODE", "rejeitar").lower()
+PLAN_WARN_ROWS: int = int(os.getenv("PLAN_WARN_ROWS", "100000"))
+PLAN_REJECT_ROWS: int = int(os.getenv("PLAN_REJECT_ROWS", "5000000"))
+
+# Cache em memória dos resultados já formatados da ferramenta de consulta (0 desativa)
+RESULT_CACHE_MAX_BYTES: int = int(os.getenv("RESULT_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+RESULT_CACHE_TTL_SECONDS: int = int(os.getenv("RESULT_CACHE_TTL_SECONDS", "600"))
+
+# Resultado entregue ao agente: orçamento aproximado de tokens das linhas exibidas, teto de linhas buscadas
+# e limite das linhas restantes contadas e resumidas (acima dele, exibe "N+")
+RESULT_TOKEN_BUDGET: int = int(os.getenv("RESULT_TOKEN_BUDGET", "200"))
+RESULT_MAX_ROWS: int = int(os.getenv("RESULT_MAX_ROWS", "100"))
+RESULT_COUNT_CAP: int = int(os.getenv("RESULT_COUNT_CAP", "100000"))
+
+# Valores mais frequentes exibidos por coluna de texto no resumo das linhas omitidas
+RESULT_SUMMARY_TOP_K: int = int(os.getenv("RESULT_SUMMARY_TOP_K", "5"))
+
+# Valores distintos contados por coluna no resumo (memória limitada); acima disso a coluna informa apenas o excesso
+RESULT_SUMMARY_MAX_DISTINCT: int = int(os.getenv("RESULT_SUMMARY_MAX_DISTINCT", "1000"))
+
+# Servidores buscados pela ferramenta de busca aproximada por nome, órgão ou cargo (índice de texto)
+LOOKUP_MAX_RESULTS: int = int(os.getenv("LOOKUP_MAX_RESULTS", "20"))
+
 # ==========================================
 # Configurações de Aplicação
 # ==========================================
@@ -58,6 +96,9 @@ AGENT_TIMEOUT_SECONDS: int = 60
 ENABLE_MEMORY_AGENT: bool = True
 ENABLE_ANALYSIS_AGENT: bool = True
 
+# Threads do pool que executa em paralelo as chamadas de ferramenta de um mesmo turno do agente
+TOOL_MAX_WORKERS: int = int(os.getenv("TOOL_MAX_WORKERS", "4"))
+
 # ==========================================
 # Configurações de AgenticOps
 # ==========================================
@@ -0,0 +1,1074 @@
+# Projeto 7 - Gerenciamento de Memória e Contexto - Sistema de Multi-Agentes de IA com LangGraph Para Automação da Folha e Consulta a Banco de Dados
+# Módulo de Consulta ao Banco de Dados (somente leitura)
+
+# Imports
+import asyncio
+import csv
+import io
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+import weakref
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from pathlib import Path
+from typing import Optional
+
+from config.config import (
+    DATABASE_CACHE_SIZE_KB,
+    DATABASE_MAX_VM_STEPS,
+    DATABASE_MMAP_SIZE,
+    DATABASE_PATH,
+    DATABASE_PROGRESS_INTERVAL,
+    DATABASE_TIMEOUT,
+    LOOKUP_MAX_RESULTS,
+    PLAN_GATE_MODE,
+    PLAN_REJECT_ROWS,
+    PLAN_WARN_ROWS,
+    PARQUET_DIR,
+    QUERY_BACKEND,
+    RESULT_CACHE_MAX_BYTES,
+    RESULT_CACHE_TTL_SECONDS,
+    RESULT_COUNT_CAP,
+    RESULT_MAX_ROWS,
+    RESULT_SUMMARY_MAX_DISTINCT,
+    RESULT_SUMMARY_TOP_K,
+    RESULT_TOKEN_BUDGET,
+    TOOL_MAX_WORKERS,
+)
+from cria_db import anexa_particoes, arquivo_manifesto, arquivos_particoes, banco_atual, ponteiro_snapshot, versao_conteudo
+
+# Separa literais entre aspas simples ou duplas do restante do texto SQL
+_LITERAIS_SQL = re.compile(r"""('(?:[^']|'')*'|"(?:[^"]|"")*")""")
+
+# Captura "FROM/JOIN/, tabela [AS] apelido" para associar os apelidos do plano às tabelas
+_TABELAS_SQL = re.compile(r"(?:\bfrom|\bjoin|,)\s*([a-z_]\w*)(?:\s+(?:as\s+)?([a-z_]\w*))?", re.IGNORECASE)
+
+# Colunas de identificação ou de período (id, matrícula, CPF, ano, competências): o resumo informa a faixa
+# e os valores distintos, nunca soma ou média
+_COLUNAS_IDENTIFICADORAS = re.compile(r"^(id|matricula|cpf|ano)$|^id_|_id$|competencia", re.IGNORECASE)
+
+# Colunas de valores monetários (e agregados como total_liquido ou SUM(vencimentos)), exibidas com 2 casas
+_COLUNAS_MONETARIAS = re.compile(r"vencimentos|descontos|liquido", re.IGNORECASE)
+
+# Palavras (letras e números) do texto digitado na busca aproximada
+_PALAVRAS_BUSCA = re.compile(r"[^\W_]+")
+
+# Palavras que podem seguir o nome da tabela e não são apelidos
+_NAO_APELIDOS = {
+    "select", "from", "where", "on", "join", "inner", "left", "right", "full", "cross", "natural", "group",
+    "order", "limit", "union", "except", "intersect", "using", "having", "window",
+}
+
+
+# Fecha uma conexão SQLite ignorando erros (conexão já fechada ou banco indisponível)
+def _fecha_conexao(conn: sqlite3.Connection) -> None:
+    try:
+        conn.close()
+    except sqlite3.Error:
+        pass
+
+
+# Conexão de uma thread e o estado associado, guardados no threading.local do gerenciador. Quando a thread
+# termina, o threading.local descarta o registro e o finalizador fecha a conexão (e libera o arquivo do banco,
+# inclusive de snapshots já removidos)
+class _ConexaoThread:
+    """Conexão somente leitura de uma thread, fechada quando a thread termina ou pelo gerenciador."""
+
+    def __init__(self, conn: sqlite3.Connection, assinatura: tuple):
+        self.conn = conn
+        self.assinatura = assinatura
+        self.data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+        # (chave, versão do conteúdo segundo o manifesto), recalculada só quando a chave muda
+        self.versao_conteudo = None
+        self.fecha = weakref.finalize(self, _fecha_conexao, conn)
+
+
+# Gerencia conexões SQLite somente leitura, mantendo uma conexão "aquecida" por thread
+class GerenciadorConexoes:
+    """Entrega conexões somente leitura reaproveitadas por thread para o banco da Folha."""
+
+    # Identificação do motor e exceções de banco tratadas pela ferramenta
+    nome = "sqlite"
+    erros = (sqlite3.Error,)
+
+    def __init__(self, db_file: str = DATABASE_PATH):
+        self.db_file = db_file
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        # Referências fracas: o registro de uma thread encerrada é coletado e sua conexão, fechada
+        self._conexoes: weakref.WeakSet = weakref.WeakSet()
+        self._geracao = 0
+
+    # Identifica os arquivos físicos do banco publicado (o snapshot indicado pelo ponteiro) e de seus anos;
+    # muda quando um novo snapshot é publicado ou quando algum arquivo é substituído ou gravado
+    def _assinatura_arquivo(self) -> tuple:
+        caminho = banco_atual(self.db_file)
+        info = os.stat(caminho)
+        particoes = tuple((p.name, p.stat().st_ino, p.stat().st_mtime_ns) for p in arquivos_particoes(caminho))
+        return (caminho, info.st_dev, info.st_ino, info.st_mtime_ns, particoes)
+
+    # Abre uma nova conexão em modo URI somente leitura e aplica os pragmas de desempenho
+    def _abre_conexao(self, caminho: Optional[str] = None) -> sqlite3.Connection:
+        uri = Path(caminho or banco_atual(self.db_file)).resolve().as_uri() + "?mode=ro"
+        conn = sqlite3.connect(uri, uri=True, timeout=DATABASE_TIMEOUT, check_same_thread=False)
+        conn.execute("PRAGMA temp_store = MEMORY")
+
+        # Anexa os arquivos anuais da folha, se o banco for particionado (antes de travar a conexão em leitura)
+        anexa_particoes(conn, somente_leitura=True)
+
+        # Aplica mmap e cache ao banco principal e a cada arquivo anexado
+        for _, esquema, _ in conn.execute("PRAGMA database_list").fetchall():
+            if esquema != "temp":
+                conn.execute(f"PRAGMA {esquema}.mmap_size = {int(DATABASE_MMAP_SIZE)}")
+                conn.execute(f"PRAGMA {esquema}.cache_size = -{int(DATABASE_CACHE_SIZE_KB)}")
+        conn.execute("PRAGMA query_only = ON")
+        return conn
+
+    # Fecha a conexão da thread atual e a remove do registro interno
+    def _descarta(self, registro: _ConexaoThread) -> None:
+        with self._lock:
+            self._conexoes.discard(registro)
+        registro.fecha()
+        self._local.conexao = None
+
+    # Identifica o manifesto e o ponteiro do snapshot (inode, mtime e tamanho) junto com a assinatura dos arquivos
+    # abertos: enquanto nada disso muda, a versão do conteúdo registrada no manifesto continua a mesma
+    def _chave_versao(self, assinatura: tuple) -> tuple:
+        chave = [assinatura]
+        for arquivo in (arquivo_manifesto(self.db_file), ponteiro_snapshot(self.db_file)):
+            try:
+                info = os.stat(arquivo)
+                chave.append((info.st_ino, info.st_mtime_ns, info.st_size))
+            except FileNotFoundError:
+                chave.append(None)
+        return tuple(chave)
+
+    # Verifica se a conexão ainda responde
+    @staticmethod
+    def _conexao_saudavel(conn: sqlite3.Connection) -> bool:
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def obter_conexao(self) -> sqlite3.Connection:
+        """
+        Retorna a conexão da thread atual, reabrindo-a se o arquivo do banco
+        foi trocado (inclusive por um novo snapshot publicado) ou se a conexão deixou de responder.
+        Lança FileNotFoundError se o banco não existir.
+        """
+        assinatura = self._assinatura_arquivo()
+        registro = getattr(self._local, "conexao", None)
+
+        # Descarta a conexão se o arquivo mudou ou se ela não passou na checagem de saúde
+        if registro is not None and (registro.assinatura != assinatura or not self._conexao_saudavel(registro.conn)):
+            self._descarta(registro)
+            registro = None
+
+        if registro is None:
+            registro = _ConexaoThread(self._abre_conexao(assinatura[0]), assinatura)
+            self._local.conexao = registro
+            with self._lock:
+                self._conexoes.add(registro)
+
+        return registro.conn
+
+    def versao_dados(self, conn: sqlite3.Connection) -> tuple:
+        """
+        Retorna um identificador da versão dos dados visível pela conexão da thread atual.
+        Muda quando o arquivo é trocado ou quando outra conexão grava no banco
+        (detectado por PRAGMA data_version). Se o manifesto da carga ainda descreve o
+        arquivo aberto, usa a versão do conteúdo registrada nele: republicar um banco
+        com os mesmos dados mantém válidos os resultados em cache.
+        """
+        data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+
+        registro = self._local.conexao
+
+        # Uma gravação externa invalida a versão para todas as threads
+        if data_version != registro.data_version:
+            with self._lock:
+                self._geracao += 1
+        registro.data_version = data_version
+
+        # Relê o manifesto só quando ele, o ponteiro ou os arquivos do banco mudaram (um acerto do cache custa dois stat)
+        chave = self._chave_versao(registro.assinatura)
+        if registro.versao_conteudo is None or registro.versao_conteudo[0] != chave:
+            registro.versao_conteudo = (chave, versao_conteudo(self.db_file, registro.assinatura[0]))
+
+        conteudo = registro.versao_conteudo[1]
+        return (conteudo or registro.assinatura, self._geracao)
+
+    def valida_consulta(self, sql_query: str) -> Optional[str]:
+        """Retorna uma mensagem de erro se a consulta não for permitida; o SQLite já recusa múltiplos comandos."""
+        return None
+
+    def avalia(self, conn: sqlite3.Connection, sql_query: str) -> Optional[dict]:
+        """Avalia o plano de execução da consulta (ver avalia_plano)."""
+        return avalia_plano(conn, sql_query)
+
+    def cria_orcamento(self, cursor: sqlite3.Cursor) -> "OrcamentoExecucao":
+        """Cria o orçamento de tempo e instruções para a execução no cursor."""
+        return OrcamentoExecucao(cursor.connection)
+
+    def fecha_todas(self) -> None:
+        """Fecha todas as conexões abertas por qualquer thread."""
+        with self._lock:
+            registros, self._conexoes = list(self._conexoes), weakref.WeakSet()
+        for registro in registros:
+            registro.fecha()
+        self._local = threading.local()
+
+
+# Executa as consultas dos agentes no DuckDB sobre os arquivos Parquet exportados por cria_db.py
+class GerenciadorDuckDB:
+    """
+    Motor colunar alternativo: cada arquivo '<tabela>.parquet' ou diretório '<tabela>/'
+    (dataset particionado) em parquet_dir vira uma view com o nome da tabela.
+    Mantém as mesmas garantias do SQLite: somente um comando, somente SELECT, e nenhum
+    acesso a arquivos fora de parquet_dir (funções como read_csv ou URLs são recusadas).
+    """
+
+    nome = "duckdb"
+
+    def __init__(self, parquet_dir: str = PARQUET_DIR):
+        try:
+            import duckdb
+        except ImportError as e:
+            raise ImportError("O motor 'duckdb' requer o pacote duckdb (pip install duckdb).") from e
+
+        self._duckdb = duckdb
+        self.erros = (duckdb.Error,)
+        self.db_file = parquet_dir
+        self._raiz = os.path.realpath(parquet_dir)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._base = None
+        self._assinatura = None
+
+    # Assinatura do diretório Parquet: muda quando arquivos ou partições são criados, trocados ou removidos
+    def _assinatura_diretorio(self) -> tuple:
+        if not os.path.isdir(self.db_file):
+            raise FileNotFoundError(self.db_file)
+        assinatura = []
+        for raiz, _, arquivos in os.walk(self.db_file):
+            assinatura.append((raiz, os.stat(raiz).st_mtime_ns))
+            for arquivo in arquivos:
+                if raiz == self.db_file:
+                    info = os.stat(os.path.join(raiz, arquivo))
+                    assinatura.append((arquivo, info.st_mtime_ns, info.st_size))
+        return tuple(sorted(assinatura))
+
+    # Abre a base em memória restrita ao diretório Parquet: sem acesso a outros arquivos nem a URLs, sem
+    # instalar ou carregar extensões e com a configuração travada (nem um SET posterior a libera)
+    def _abre_base(self):
+        conn = self._duckdb.connect(
+            ":memory:", config={"autoinstall_known_extensions": False, "autoload_known_extensions": False}
+        )
+        conn.execute("SET allowed_directories = ?", [[self._raiz + os.sep]])
+        conn.execute("SET enable_external_access = false")
+        conn.execute("SET lock_configuration = true")
+        return conn
+
+    # Cria (ou recria) uma view por tabela exportada
+    def _cria_visoes(self, conn) -> None:
+        for entrada in sorted(os.scandir(self._raiz), key=lambda e: e.name):
+            caminho = entrada.path.replace("'", "''")
+            if entrada.is_file() and entrada.name.endswith(".parquet"):
+                tabela = entrada.name[: -len(".parquet")]
+                origem = f"read_parquet('{caminho}')"
+            elif entrada.is_dir() and "." not in entrada.name:
+                tabela = entrada.name
+                origem = f"read_parquet('{caminho}/**/*.parquet', hive_partitioning = true, hive_types_autocast = false)"
+            else:
+                continue
+            conn.execute(f'CREATE OR REPLACE VIEW "{tabela}" AS SELECT {self._colunas_expostas(conn, origem)} FROM {origem}')
+
+    # Colunas a expor na view: as da tabela original, gravadas nos metadados 'colunas' do dataset
+    @staticmethod
+    def _colunas_expostas(conn, origem: str) -> str:
+        arquivo = conn.execute(f"SELECT filename FROM {origem[:-1]}, filename = true) LIMIT 1").fetchone()
+        if arquivo is None:
+            return "*"
+        metadados = conn.execute(
+            "SELECT value FROM parquet_kv_metadata(?) WHERE key = 'colunas'", (arquivo[0],)
+        ).fetchone()
+        if metadados is None:
+            return "*"
+        return ", ".join(f'"{c}"' for c in json.loads(metadados[0]))
+
+    def obter_conexao(self):
+        """Retorna o cursor DuckDB da thread atual, recriando as views se o diretório mudou."""
+        assinatura = self._assinatura_diretorio()
+
+        with self._lock:
+            if self._base is None:
+                self._base = self._abre_base()
+            if assinatura != self._assinatura:
+                self._cria_visoes(self._base)
+                self._assinatura = assinatura
+
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._base.cursor()
+            self._local.conn = conn
+        return conn
+
+    def versao_dados(self, conn) -> tuple:
+        """Versão dos dados: a assinatura do diretório Parquet."""
+        return self._assinatura
+
+    def valida_consulta(self, sql_query: str) -> Optional[str]:
+        """Aceita apenas um único comando do tipo SELECT."""
+        try:
+            comandos = self._duckdb.extract_statements(sql_query)
+        except self._duckdb.Error as e:
+            return f"Erro ao executar a consulta SQL: {e}. Verifique a sintaxe da sua consulta e os nomes das tabelas/colunas."
+        if len(comandos) != 1 or comandos[0].type != self._duckdb.StatementType.SELECT:
+            return "Erro: Esta ferramenta só pode executar uma única consulta SELECT."
+        return None
+
+    def avalia(self, conn, sql_query: str) -> Optional[dict]:
+        """O motor colunar não passa pela avaliação de plano baseada no SQLite."""
+        return None
+
+    def cria_orcamento(self, cursor) -> "OrcamentoDuckDB":
+        """Cria o orçamento de tempo de parede para a execução no cursor."""
+        return OrcamentoDuckDB(cursor)
+
+    def fecha_todas(self) -> None:
+        """Fecha a base DuckDB e os cursores de todas as threads."""
+        with self._lock:
+            if self._base is not None:
+                self._base.close()
+            self._base = None
+            self._assinatura = None
+        self._local = threading.local()
+
+
+# Lê a folha do dataset Parquet particionado, abrindo apenas as partições do ano/competência pedidos.
+# Os arquivos são mapeados em memória e as colunas órgão/cargo chegam como dicionário (pyarrow.Table)
+def carrega_folha_parquet(competencia: str = None, ano: str = None, colunas: list = None, parquet_dir: str = PARQUET_DIR):
+
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    from pyarrow import fs
+
+    caminho = os.path.join(parquet_dir, "tb_folha_pagamento")
+    if not os.path.isdir(caminho):
+        raise FileNotFoundError(caminho)
+
+    # Chaves de partição como texto, no mesmo formato de tb_folha_pagamento.competencia
+    particionamento = ds.partitioning(pa.schema([("ano", pa.string()), ("competencia", pa.string())]), flavor="hive")
+    dataset = ds.dataset(caminho, format="parquet", partitioning=particionamento, filesystem=fs.LocalFileSystem(use_mmap=True))
+
+    # Filtros nas colunas de partição descartam os diretórios sem abrir os arquivos
+    filtro = None
+    if competencia is not None:
+        filtro = ds.field("competencia") == str(competencia)
+    if ano is not None:
+        filtro_ano = ds.field("ano") == str(ano)
+        filtro = filtro_ano if filtro is None else filtro & filtro_ano
+
+    return dataset.to_table(columns=colunas, filter=filtro)
+
+
+# Normaliza o texto SQL para uso como chave de cache
+def normaliza_sql(sql_query: str) -> str:
+    """
+    Colapsa espaços, remove o ';' final e converte para minúsculas tudo o que
+    estiver fora de literais entre aspas, preservando o conteúdo dos literais.
+    """
+    partes = _LITERAIS_SQL.split(sql_query.strip().rstrip(";").strip())
+    for i in range(0, len(partes), 2):
+        partes[i] = " ".join(partes[i].lower().split())
+    return "".join(partes)
+
+
+# Cache LRU com expiração e orçamento de memória para os resultados já formatados
+class CacheResultados:
+    """Guarda resultados formatados da ferramenta, associados à versão dos dados do banco."""
+
+    def __init__(self, max_bytes: int = RESULT_CACHE_MAX_BYTES, ttl_segundos: float = RESULT_CACHE_TTL_SECONDS):
+        self.max_bytes = max_bytes
+        self.ttl_segundos = ttl_segundos
+        self._entradas: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes_usados = 0
+        self.hits = 0
+        self.misses = 0
+
+    # Remove uma entrada e devolve seu espaço ao orçamento
+    def _remove(self, chave: str) -> None:
+        _, _, _, tamanho = self._entradas.pop(chave)
+        self.bytes_usados -= tamanho
+
+    def obter(self, chave: str, versao: tuple) -> Optional[str]:
+        """Retorna o resultado em cache ou None se ausente, expirado ou de outra versão dos dados."""
+        with self._lock:
+            entrada = self._entradas.get(chave)
+            if entrada is None:
+                self.misses += 1
+                return None
+
+            resultado, versao_entrada, expira_em, _ = entrada
+            if versao_entrada != versao or expira_em < time.monotonic():
+                self._remove(chave)
+                self.misses += 1
+                return None
+
+            # Marca a entrada como usada mais recentemente
+            self._entradas.move_to_end(chave)
+            self.hits += 1
+            return resultado
+
+    def guardar(self, chave: str, versao: tuple, resultado: str) -> None:
+        """Armazena um resultado, descartando as entradas menos usadas se o orçamento estourar."""
+        tamanho = sys.getsizeof(chave) + sys.getsizeof(resultado)
+        if tamanho > self.max_bytes:
+            return
+
+        with self._lock:
+            if chave in self._entradas:
+                self._remove(chave)
+            self._entradas[chave] = (resultado, versao, time.monotonic() + self.ttl_segundos, tamanho)
+            self.bytes_usados += tamanho
+
+            while self.bytes_usados > self.max_bytes:
+                self._remove(next(iter(self._entradas)))
+
+    def limpa(self) -> None:
+        """Remove todas as entradas do cache."""
+        with self._lock:
+            self._entradas.clear()
+            self.bytes_usados = 0
+
+    def estatisticas(self) -> dict:
+        """Retorna os contadores de acertos, falhas e ocupação do cache."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entradas": len(self._entradas),
+                "bytes": self.bytes_usados,
+            }
+
+
+# Limita o custo de uma consulta por tempo de parede e por instruções da VM do SQLite
+class OrcamentoExecucao:
+    """
+    Instala um progress handler na conexão durante a execução da consulta e a
+    interrompe quando o tempo ou o número de instruções ultrapassa o orçamento.
+    """
+
+    def __init__(self, conn: sqlite3.Connection, max_segundos: float = None,
+                 max_instrucoes: int = None, intervalo: int = None):
+        self.conn = conn
+        self.max_segundos = DATABASE_TIMEOUT if max_segundos is None else max_segundos
+        self.max_instrucoes = DATABASE_MAX_VM_STEPS if max_instrucoes is None else max_instrucoes
+        self.intervalo = DATABASE_PROGRESS_INTERVAL if intervalo is None else intervalo
+        self.instrucoes = 0
+        self.motivo: Optional[str] = None
+
+    # Chamado pelo SQLite a cada 'intervalo' instruções; retornar 1 interrompe a consulta
+    def _verifica(self) -> int:
+        self.instrucoes += self.intervalo
+        if self.instrucoes > self.max_instrucoes:
+            self.motivo = f"excedeu o limite de {self.max_instrucoes} instruções"
+            return 1
+        if time.monotonic() - self._inicio > self.max_segundos:
+            self.motivo = f"excedeu o limite de {self.max_segundos} segundos"
+            return 1
+        return 0
+
+    def __enter__(self):
+        self._inicio = time.monotonic()
+        self.conn.set_progress_handler(self._verifica, self.intervalo)
+        return self
+
+    def __exit__(self, *exc):
+        self.conn.set_progress_handler(None, 0)
+        return False
+
+    @property
+    def estourou(self) -> bool:
+        return self.motivo is not None
+
+
+# Limita o tempo de parede de uma consulta DuckDB, interrompendo o cursor quando o prazo vence
+class OrcamentoDuckDB:
+    """Equivalente ao OrcamentoExecucao para o DuckDB, que não expõe contagem de instruções."""
+
+    def __init__(self, cursor, max_segundos: float = None):
+        self.cursor = cursor
+        self.max_segundos = DATABASE_TIMEOUT if max_segundos is None else max_segundos
+        self.motivo: Optional[str] = None
+
+    def _interrompe(self) -> None:
+        self.motivo = f"excedeu o limite de {self.max_segundos} segundos"
+        self.cursor.interrupt()
+
+    def __enter__(self):
+        self._timer = threading.Timer(self.max_segundos, self._interrompe)
+        self._timer.daemon = True
+        self._timer.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._timer.cancel()
+        return False
+
+    @property
+    def estourou(self) -> bool:
+        return self.motivo is not None
+
+
+# Estima o número de linhas de cada tabela pelas estatísticas do ANALYZE (ou pelo maior rowid).
+# Tabelas de bancos anexados entram como 'esquema.tabela'; as views temporárias sobre as partições
+# anuais recebem a soma das tabelas homônimas de todos os arquivos
+def _tamanhos_tabelas(conn: sqlite3.Connection) -> dict:
+    tamanhos = {}
+    esquemas = [nome for _, nome, _ in conn.execute("PRAGMA database_list").fetchall() if nome != "temp"]
+
+    for esquema in esquemas:
+        prefixo = "" if esquema == "main" else f"{esquema}."
+        try:
+            for tabela, linhas in conn.execute(
+                f"SELECT tbl, MAX(CAST(stat AS INTEGER)) FROM {esquema}.sqlite_stat1 GROUP BY tbl"
+            ):
+                tamanhos[prefixo + tabela.lower()] = linhas or 0
+        except sqlite3.OperationalError:
+            pass
+
+        for (tabela,) in conn.execute(f"SELECT name FROM {esquema}.sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'"):
+            if prefixo + tabela.lower() not in tamanhos:
+                try:
+                    tamanhos[prefixo + tabela.lower()] = conn.execute(f'SELECT MAX(rowid) FROM {esquema}."{tabela}"').fetchone()[0] or 0
+                except sqlite3.OperationalError:
+                    tamanhos[prefixo + tabela.lower()] = 0
+
+    for (visao,) in conn.execute("SELECT name FROM temp.sqlite_master WHERE type = 'view'").fetchall():
+        partes = [linhas for tabela, linhas in tamanhos.items() if tabela.endswith(f".{visao.lower()}")]
+        if partes:
+            tamanhos[visao.lower()] = sum(partes) + tamanhos.get(visao.lower(), 0)
+    return tamanhos
+
+
+# Classifica uma estimativa de linhas em relação aos limites configurados
+def _nivel_custo(linhas: int) -> Optional[str]:
+    if linhas >= PLAN_REJECT_ROWS:
+        return "rejeitar"
+    if linhas >= PLAN_WARN_ROWS:
+        return "avisar"
+    return None
+
+
+def avalia_plano(conn: sqlite3.Connection, sql_query: str) -> dict:
+    """
+    Inspeciona o EXPLAIN QUERY PLAN da consulta e aponta varreduras completas de tabelas
+    grandes, ordenações em B-tree temporária sobre muitas linhas e subconsultas
+    correlacionadas que varrem tabelas. Retorna o plano resumido, os alertas
+    (nível, descrição) e se a consulta deve ser rejeitada.
+    """
+    tamanhos = _tamanhos_tabelas(conn)
+
+    # Associa nomes e apelidos usados na consulta às tabelas reais
+    apelidos = {}
+    for tabela, apelido in _TABELAS_SQL.findall(sql_query):
+        if tabela.lower() in tamanhos:
+            apelidos[tabela.lower()] = tabela.lower()
+            if apelido and apelido.lower() not in _NAO_APELIDOS:
+                apelidos[apelido.lower()] = tabela.lower()
+
+    nos = {no_id: (pai, detalhe) for no_id, pai, _, detalhe in conn.execute(f"EXPLAIN QUERY PLAN {sql_query}")}
+
+    # Percorre os ancestrais de um nó do plano até a raiz
+    def ancestrais(no_id):
+        pai = nos[no_id][0]
+        while pai in nos:
+            yield pai
+            pai = nos[pai][0]
+
+    # Subconsultas e views já avaliadas pelos próprios nós internos (ex.: a união das partições anuais)
+    subconsultas = {
+        detalhe.split()[1].lower() for _, detalhe in nos.values() if detalhe.startswith(("CO-ROUTINE ", "MATERIALIZE "))
+    }
+
+    plano, alertas, varreduras = [], [], []
+    for no_id, (pai, detalhe) in nos.items():
+        plano.append("  " * len(list(ancestrais(no_id))) + detalhe)
+
+        # Varredura completa: "SCAN apelido" com ou sem índice
+        if detalhe.startswith("SCAN "):
+            nome = detalhe.split()[1].lower().removeprefix("main.")
+            tabela = apelidos.get(nome, nome)
+            if tabela in tamanhos and nome not in subconsultas and tabela not in subconsultas:
+                correlacionada = any("CORRELATED" in nos[a][1] for a in ancestrais(no_id))
+                cobertura = "COVERING INDEX" in detalhe
+                varreduras.append((tabela, tamanhos[tabela], correlacionada, cobertura, pai))
+
+    # Linhas da varredura externa que alimenta ordenações e subconsultas correlacionadas
+    linhas_externas = max([v[1] for v in varreduras if not v[2]], default=1)
+
+    for tabela, linhas, correlacionada, cobertura, _ in varreduras:
+        if correlacionada:
+            nivel = _nivel_custo(linhas * linhas_externas)
+            descricao = f"subconsulta correlacionada varre {tabela} (~{linhas} linhas) para cada uma de ~{linhas_externas} linhas externas"
+        else:
+            nivel = _nivel_custo(linhas)
+            # Varreduras só de índice de cobertura são baratas demais para rejeitar
+            if cobertura and nivel == "rejeitar":
+                nivel = "avisar"
+            descricao = f"varredura completa de {tabela} (~{linhas} linhas)"
+        if nivel:
+            alertas.append((nivel, descricao))
+
+    # Duas ou mais varreduras no mesmo SELECT formam um laço aninhado sem índice
+    # (varreduras em ramos diferentes de um UNION ALL não se multiplicam)
+    por_select = {}
+    for varredura in varreduras:
+        if not varredura[2]:
+            por_select.setdefault(varredura[4], []).append(varredura)
+    for externas in por_select.values():
+        if len(externas) < 2:
+            continue
+        combinacoes = 1
+        for _, linhas, _, _, _ in externas:
+            combinacoes *= max(linhas, 1)
+        nivel = _nivel_custo(combinacoes)
+        if nivel:
+            tabelas = " x ".join(tabela for tabela, _, _, _, _ in externas)
+            alertas.append((nivel, f"junção sem índice entre {tabelas} (~{combinacoes} combinações)"))
+
+    for _, detalhe in nos.values():
+        if detalhe.startswith("USE TEMP B-TREE"):
+            nivel = _nivel_custo(linhas_externas) if varreduras else None
+            if nivel:
+                alertas.append((nivel, f"{detalhe.lower()} sobre ~{linhas_externas} linhas"))
+
+    return {
+        "plano": plano,
+        "alertas": alertas,
+        "rejeitar": any(nivel == "rejeitar" for nivel, _ in alertas),
+    }
+
+
+# Conta as linhas restantes do cursor em lotes, sem guardá-las, parando no limite informado; cada lote
+# passa pelo resumo incremental antes de ser descartado
+def _conta_restantes(cursor: sqlite3.Cursor, limite: int, resumo: "ResumoIncremental", tamanho_lote: int = 1000) -> tuple:
+    """Retorna (linhas contadas, True se o limite foi atingido antes do fim do cursor)."""
+    contadas = 0
+    while contadas < limite:
+        lote = cursor.fetchmany(min(tamanho_lote, limite - contadas))
+        if not lote:
+            return contadas, False
+        resumo.adiciona(lote)
+        contadas += len(lote)
+    return contadas, cursor.fetchone() is not None
+
+
+# Resumo das linhas de um resultado acumulado lote a lote, com memória limitada: contagem, soma, mínimo
+# e máximo das colunas numéricas; valores distintos (até RESULT_SUMMARY_MAX_DISTINCT) e mais frequentes
+# das colunas de texto; faixa e valores distintos das colunas de identificação ou período
+class ResumoIncremental:
+    """Acumula estatísticas por coluna sem guardar as linhas."""
+
+    def __init__(self, colunas: list, top_k: int = None, max_distintos: int = None):
+        self.colunas = colunas
+        self.top_k = RESULT_SUMMARY_TOP_K if top_k is None else top_k
+        self.max_distintos = RESULT_SUMMARY_MAX_DISTINCT if max_distintos is None else max_distintos
+        self.linhas = 0
+        self._n = [0] * len(colunas)
+        self._soma = [0.0] * len(colunas)
+        self._min = [None] * len(colunas)
+        self._max = [None] * len(colunas)
+        self._texto = [False] * len(colunas)
+        # Contagem por valor; None quando a coluna passou de max_distintos valores distintos
+        self._contagens = [Counter() for _ in colunas]
+
+    def adiciona(self, linhas: list) -> None:
+        """Acumula um lote de linhas (tuplas na ordem das colunas)."""
+        self.linhas += len(linhas)
+        for i, valores in enumerate(zip(*linhas)):
+            valores = [v for v in valores if v is not None]
+            if not valores:
+                continue
+            self._n[i] += len(valores)
+
+            # Colunas numéricas (inclusive Decimal do DuckDB); textos como '202401' continuam sendo texto
+            if not self._texto[i] and all(isinstance(v, (int, float, Decimal)) and not isinstance(v, bool) for v in valores):
+                self._soma[i] += float(sum(valores))
+            else:
+                self._texto[i] = True
+
+            # Faixa de valores; tipos que não se comparam (texto e número na mesma coluna) não têm faixa
+            try:
+                menor, maior = min(valores), max(valores)
+                self._min[i] = menor if self._min[i] is None else min(self._min[i], menor)
+                self._max[i] = maior if self._max[i] is None else max(self._max[i], maior)
+            except TypeError:
+                self._min[i] = self._max[i] = None
+
+            if self._contagens[i] is not None:
+                self._contagens[i].update(map(str, valores))
+                if len(self._contagens[i]) > self.max_distintos:
+                    self._contagens[i] = None
+
+    def texto(self, limite_atingido: bool = False) -> str:
+        """Retorna o resumo acumulado, uma linha por coluna."""
+        titulo = (
+            f"Resumo das primeiras {self.linhas} linhas (contagem limitada):" if limite_atingido
+            else f"Resumo de todas as {self.linhas} linhas:"
+        )
+        resumo = [titulo]
+
+        for i, nome in enumerate(self.colunas):
+            n, contagens = self._n[i], self._contagens[i]
+            identificadora = bool(_COLUNAS_IDENTIFICADORAS.search(nome))
+
+            if not n:
+                resumo.append(f"{nome}: sem valores")
+
+            elif not self._texto[i] and not identificadora:
+                m = coluna_monetaria(nome)
+                resumo.append(
+                    f"{nome}: n={n} soma={formata_valor(self._soma[i], m)} min={formata_valor(float(self._min[i]), m)} "
+                    f"max={formata_valor(float(self._max[i]), m)} média={formata_valor(self._soma[i] / n, m)}"
+                )
+
+            else:
+                faixa = f" (de {self._min[i]} a {self._max[i]})" if identificadora and self._min[i] is not None else ""
+                if contagens is None:
+                    resumo.append(f"{nome}: mais de {self.max_distintos} valores distintos{faixa}")
+                elif max(contagens.values()) == 1:
+                    resumo.append(f"{nome}: {len(contagens)} valores distintos{faixa}, todos únicos")
+                else:
+                    frequentes = ", ".join(f"{valor} ({qtd})" for valor, qtd in contagens.most_common(self.top_k))
+                    resumo.append(f"{nome}: {len(contagens)} valores distintos{faixa}; mais frequentes: {frequentes}")
+
+        return "\n".join(resumo)
+
+
+# Resume um conjunto de linhas já em memória (ver ResumoIncremental)
+def resume_resultado(colunas: list, linhas: list, limite_atingido: bool = False, top_k: int = None) -> str:
+    resumo = ResumoIncremental(colunas, top_k)
+    resumo.adiciona(linhas)
+    return resumo.texto(limite_atingido)
+
+
+# Estima a quantidade de tokens de um texto (aproximação de ~4 caracteres por token)
+def estima_tokens(texto: str) -> int:
+    return (len(texto) + 3) // 4
+
+
+# Formata um valor para o agente: valores monetários com 2 casas, demais números decimais (médias, razões,
+# percentuais) com até 15 algarismos significativos, sem o ruído de arredondamento do float, e nulos como vazio
+def formata_valor(valor, monetaria: bool = False) -> str:
+    if valor is None:
+        return ""
+    if isinstance(valor, (float, Decimal)):
+        return f"{valor:.2f}" if monetaria else f"{valor:.15g}"
+    return str(valor)
+
+
+# Indica se a coluna guarda valores monetários (vencimentos, descontos, líquido e seus agregados)
+def coluna_monetaria(nome: str) -> bool:
+    return bool(_COLUNAS_MONETARIAS.search(nome))
+
+
+# Codifica o resultado na forma mais barata em tokens para o formato dos dados
+def codifica_resultado(colunas: list, linhas: list, total: str, omitidos_extra: int = 0,
+                       limite_atingido: bool = False, orcamento_tokens: int = None, resumo=None) -> str:
+    """
+    Retorna o resultado como escalar ("coluna = valor"), lista chave/valor (uma linha)
+    ou tabela CSV. Na tabela, colunas com o mesmo valor em todas as linhas exibidas saem
+    uma única vez em "Valores constantes", e as linhas param ao atingir o orçamento de tokens
+    (no mínimo uma linha é exibida). 'omitidos_extra' são as linhas contadas e não buscadas.
+    Quando há linhas omitidas, 'resumo' (função sem argumentos) é chamado e seu texto é anexado.
+    """
+    orcamento_tokens = RESULT_TOKEN_BUDGET if orcamento_tokens is None else orcamento_tokens
+    mais = "+" if limite_atingido else ""
+    monetarias = [coluna_monetaria(c) for c in colunas]
+    valores = [[formata_valor(v, m) for v, m in zip(linha, monetarias)] for linha in linhas]
+
+    # Escalar: uma linha e uma coluna
+    if len(valores) == 1 and len(colunas) == 1 and not omitidos_extra:
+        return f"Resultado: {colunas[0]} = {valores[0][0]}"
+
+    # Chave/valor: uma única linha com várias colunas
+    if len(valores) == 1 and not omitidos_extra:
+        return "Resultado (1 linha):\n" + "\n".join(f"{c}: {v}" for c, v in zip(colunas, valores[0]))
+
+    # Tabela: separa as colunas constantes, desde que sobre ao menos uma coluna variável
+    constantes = [i for i in range(len(colunas)) if len({linha[i] for linha in valores}) == 1] if len(valores) > 1 else []
+    if len(constantes) == len(colunas):
+        constantes = []
+    variaveis = [i for i in range(len(colunas)) if i not in constantes]
+
+    saida = io.StringIO()
+    escritor = csv.writer(saida, lineterminator="\n")
+    cabecalho = f"Resultados da consulta ({total} encontrados):\n"
+    if constantes:
+        cabecalho += "Valores constantes: " + "; ".join(f"{colunas[i]}={valores[0][i]}" for i in constantes) + "\n"
+    escritor.writerow([colunas[i] for i in variaveis])
+
+    # Adiciona linhas enquanto couberem no orçamento de tokens
+    exibidas = 0
+    tokens = estima_tokens(cabecalho + saida.getvalue())
+    for linha in valores:
+        inicio = saida.tell()
+        escritor.writerow([linha[i] for i in variaveis])
+        tokens += estima_tokens(saida.getvalue()[inicio:])
+        if exibidas and tokens > orcamento_tokens:
+            saida.truncate(inicio)
+            saida.seek(inicio)
+            break
+        exibidas += 1
+
+    texto = cabecalho + saida.getvalue().rstrip("\n")
+    omitidos = len(valores) - exibidas + omitidos_extra
+    if omitidos:
+        texto += f"\n... (mais {omitidos}{mais} resultados omitidos)"
+        if resumo is not None:
+            texto += "\n" + resumo()
+    return texto
+
+
+# Cria o gerenciador do motor de consulta configurado
+def cria_gerenciador(backend: str = QUERY_BACKEND):
+    """Retorna o gerenciador de conexões para o motor 'sqlite' ou 'duckdb'."""
+    if backend == "sqlite":
+        return GerenciadorConexoes(DATABASE_PATH)
+    if backend == "duckdb":
+        return GerenciadorDuckDB(PARQUET_DIR)
+    raise ValueError(f"Motor de consulta desconhecido: '{backend}'. Use 'sqlite' ou 'duckdb'.")
+
+
+# Instância compartilhada usada pela ferramenta dos agentes
+gerenciador_conexoes = cria_gerenciador()
+
+# Instância usada pela busca aproximada, que depende do índice de texto do SQLite
+gerenciador_busca = gerenciador_conexoes if isinstance(gerenciador_conexoes, GerenciadorConexoes) else GerenciadorConexoes(DATABASE_PATH)
+
+# Cache compartilhado de resultados da ferramenta dos agentes
+cache_resultados = CacheResultados()
+
+
+# Executa uma consulta SELECT e devolve o resultado formatado para o agente
+def executa_consulta_folha(sql_query: str, gerenciador: GerenciadorConexoes = None, cache: CacheResultados = None) -> str:
+    """
+    Executa uma consulta SQL SOMENTE do tipo SELECT no banco da Folha de Pagamento
+    e retorna os resultados formatados como texto.
+    Resultados repetidos são servidos do cache enquanto os dados do banco não mudarem.
+    """
+    gerenciador = gerenciador or gerenciador_conexoes
+    cache = cache if cache is not None else cache_resultados
+
+    # Exibe no console a query recebida para fins de debug
+    print(f"--- Ferramenta query_folha_database recebendo SQL: {sql_query} ---")
+
+    # Verifica se a consulta começa com SELECT, garantindo segurança
+    if not sql_query.strip().upper().startswith("SELECT"):
+        print("!!! ERRO DE SEGURANÇA: Tentativa de executar SQL não-SELECT !!!")
+        return "Erro: Esta ferramenta só pode executar consultas SELECT."
+
+    cursor = None
+    orcamento = None
+
+    try:
+
+        # Obtém a conexão aquecida da thread atual
+        try:
+            conn = gerenciador.obter_conexao()
+        except FileNotFoundError:
+            return f"Erro: Arquivo do banco de dados '{gerenciador.db_file}' não encontrado. Execute o script 'cria_db.py' primeiro."
+
+        # Aplica as verificações adicionais do motor (ex.: comando único no DuckDB)
+        erro = gerenciador.valida_consulta(sql_query)
+        if erro:
+            print(f"!!! CONSULTA RECUSADA PELO MOTOR {gerenciador.nome}: {sql_query} !!!")
+            return erro
+
+        # Consulta o cache pela forma normalizada do SQL e pela versão atual dos dados
+        chave = normaliza_sql(sql_query)
+        versao = gerenciador.versao_dados(conn)
+        resultado = cache.obter(chave, versao)
+        if resultado is not None:
+            print("--- Resultado servido pelo cache ---")
+            return resultado
+
+        # Avalia o plano de execução antes de gastar tempo de banco com a consulta
+        avisos = ""
+        avaliacao = gerenciador.avalia(conn, sql_query) if PLAN_GATE_MODE != "desligado" else None
+        if avaliacao:
+            resumo = "\n".join(f"- {descricao}" for _, descricao in avaliacao["alertas"])
+            plano = "\n".join(avaliacao["plano"])
+
+            if avaliacao["rejeitar"] and PLAN_GATE_MODE == "rejeitar":
+                print(f"!!! CONSULTA REJEITADA PELO PLANO: {sql_query} !!!")
+                return (
+                    f"Erro: consulta rejeitada pelo plano de execução, custo estimado alto demais:\n{resumo}\n"
+                    f"Plano:\n{plano}\n"
+                    "Reformule usando filtros indexados (matricula, competencia, orgao, cargo, nome) ou agregações."
+                )
+            if avaliacao["alertas"]:
+                avisos = f"Aviso do plano de execução:\n{resumo}\n"
+
+        # Executa a consulta SQL recebida dentro do orçamento de tempo e instruções
+        cursor = conn.cursor()
+        orcamento = gerenciador.cria_orcamento(cursor)
+        with orcamento:
+            cursor.execute(sql_query)
+
+            # Busca no máximo as linhas que podem ser exibidas
+            results = cursor.fetchmany(RESULT_MAX_ROWS)
+
+            # Conta as linhas não exibidas, até o limite de contagem, acumulando o resumo sem guardá-las
+            resumo = ResumoIncremental([description[0] for description in cursor.description])
+            resumo.adiciona(results)
+            omitidos, limite_atingido = _conta_restantes(cursor, RESULT_COUNT_CAP, resumo) if results else (0, False)
+
+        # Caso não haja resultados, informa ao usuário
+        if not results:
+            output = avisos + "Nenhum resultado encontrado para a consulta."
+            cache.guardar(chave, versao, output)
+            return output
+
+        # Obtém os nomes das colunas a partir da descrição do cursor
+        column_names = [description[0] for description in cursor.description]
+
+        # Total de linhas encontradas ('+' indica que a contagem parou no limite)
+        total = f"{len(results) + omitidos}{'+' if limite_atingido else ''}"
+
+        # Codifica o resultado no formato mais compacto, dentro do orçamento de tokens
+        # Quando há linhas omitidas, anexa o resumo estatístico de todas as linhas contadas
+        output = avisos + codifica_resultado(
+            column_names, results, total, omitidos, limite_atingido,
+            resumo=lambda: resumo.texto(limite_atingido),
+        )
+
+        cache.guardar(chave, versao, output)
+        return output
+
+    # Captura erros específicos do motor de banco
+    except gerenciador.erros as e:
+
+        # Consulta interrompida pelo orçamento: devolve uma orientação curta para o agente reformular
+        if orcamento is not None and orcamento.estourou:
+            print(f"!!! CONSULTA CANCELADA: {orcamento.motivo} ao executar '{sql_query}' !!!")
+            return (
+                f"Erro: consulta muito custosa, cancelada ({orcamento.motivo}). "
+                "Tente filtrar por competencia, orgao ou matricula, usar agregações (SUM, COUNT) em vez de listar linhas "
+                "e trocar subconsultas correlacionadas por JOIN com GROUP BY."
+            )
+
+        print(f"!!! ERRO SQL: {e} ao executar '{sql_query}' !!!")
+        return f"Erro ao executar a consulta SQL: {e}. Verifique a sintaxe da sua consulta e os nomes das tabelas/colunas."
+
+    # Captura quaisquer outras exceções inesperadas
+    except Exception as e:
+        print(f"!!! ERRO Inesperado na ferramenta: {e} !!!")
+        return f"Ocorreu um erro inesperado na ferramenta de banco de dados: {e}"
+
+    # Fecha apenas o cursor; a conexão permanece aberta para a próxima consulta
+    finally:
+        if cursor is not None:
+            cursor.close()
+
+
+# Converte o texto digitado pelo usuário em uma expressão MATCH do FTS5
+def expressao_busca(termo: str) -> Optional[str]:
+    """
+    Cada palavra vira um termo entre aspas (o texto do usuário nunca é lido como operador do FTS5),
+    todas obrigatórias. A última palavra, com 3 letras ou mais, também casa por prefixo
+    ("fazend" encontra "Fazenda"); números casam exatamente ("servidor 2" não encontra "Servidor 20").
+    Retorna None se não houver palavras.
+    """
+    palavras = _PALAVRAS_BUSCA.findall(termo)
+    if not palavras:
+        return None
+    termos = [f'"{p}"' for p in palavras]
+    if len(palavras[-1]) >= 3 and not palavras[-1].isdigit():
+        termos[-1] += "*"
+    return " ".join(termos)
+
+
+# Resolve um nome, órgão ou cargo digitado de forma aproximada nas matrículas dos servidores
+def busca_servidores(termo: str, limite: int = LOOKUP_MAX_RESULTS, gerenciador: GerenciadorConexoes = None,
+                     cache: CacheResultados = None) -> str:
+    """
+    Busca 'termo' no índice de texto tb_busca_servidores (sem acentos e sem diferenciar maiúsculas)
+    e retorna matricula, nome, orgao e cargo dos servidores mais relevantes, no mesmo formato
+    compacto da ferramenta de consulta. Usa sempre o banco SQLite, qualquer que seja o motor de consulta.
+    """
+    gerenciador = gerenciador or gerenciador_busca
+    cache = cache if cache is not None else cache_resultados
+
+    print(f"--- Ferramenta busca_servidor recebendo termo: {termo} ---")
+
+    expressao = expressao_busca(termo)
+    if expressao is None:
+        return "Erro: informe ao menos uma palavra (nome, órgão ou cargo) para a busca."
+
+    try:
+        try:
+            conn = gerenciador.obter_conexao()
+        except FileNotFoundError:
+            return f"Erro: Arquivo do banco de dados '{gerenciador.db_file}' não encontrado. Execute o script 'cria_db.py' primeiro."
+
+        # Resultados repetidos são servidos do cache enquanto os dados não mudarem
+        chave = f"busca:{limite}:{expressao.lower()}"
+        versao = gerenciador.versao_dados(conn)
+        resultado = cache.obter(chave, versao)
+        if resultado is not None:
+            return resultado
+
+        # Servidores mais relevantes primeiro (bm25) e total de servidores encontrados
+        cursor = conn.execute(
+            "SELECT matricula, nome, orgao, cargo FROM tb_busca_servidores WHERE tb_busca_servidores MATCH ? "
+            "ORDER BY rank LIMIT ?",
+            (expressao, limite),
+        )
+        linhas = cursor.fetchall()
+        colunas = [d[0] for d in cursor.description]
+
+        if not linhas:
+            output = f"Nenhum servidor, órgão ou cargo encontrado para '{termo}'."
+        else:
+            total = conn.execute("SELECT COUNT(*) FROM tb_busca_servidores WHERE tb_busca_servidores MATCH ?", (expressao,)).fetchone()[0]
+            output = codifica_resultado(colunas, linhas, str(total), total - len(linhas))
+
+        cache.guardar(chave, versao, output)
+        return output
+
+    except sqlite3.Error as e:
+        print(f"!!! ERRO NA BUSCA: {e} ao buscar '{termo}' !!!")
+        return f"Erro ao executar a busca: {e}. Se o índice de busca não existir, execute 'python cria_db.py --migrar'."
+
+
+# Pool de threads compartilhado pelas execuções paralelas; cada thread mantém sua própria conexão somente leitura
+_pool_consultas = None
+_pool_lock = threading.Lock()
+
+
+# Obtém (criando na primeira chamada) o pool limitado a TOOL_MAX_WORKERS threads
+def obter_pool_consultas() -> ThreadPoolExecutor:
+    global _pool_consultas
+    with _pool_lock:
+        if _pool_consultas is None:
+            _pool_consultas = ThreadPoolExecutor(max_workers=TOOL_MAX_WORKERS, thread_name_prefix="consulta_folha")
+        return _pool_consultas
+
+
+# Variante assíncrona da consulta: executa no pool sem bloquear o loop de eventos
+async def executa_consulta_folha_async(sql_query: str, gerenciador: GerenciadorConexoes = None, cache: CacheResultados = None) -> str:
+    """Versão assíncrona de executa_consulta_folha, executada no pool limitado de consultas."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(obter_pool_consultas(), executa_consulta_folha, sql_query, gerenciador, cache)
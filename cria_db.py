@@ -2,31 +2,805 @@
 # Módulo de Criação do Banco de Dados
 
 # Imports
+import argparse
+import glob
+import json
 import os
+import re
 import sqlite3
+import numpy as np
 import pandas as pd
+import xxhash
+from pathlib import Path
 from datetime import datetime, timedelta
 
 # Define o nome do arquivo de banco de dados SQLite
 DB_FILE = "folha_pagamento.db"
 SQL_FILE = "criacao_banco.sql"
+CSV_FILE = "folha_pe_200linhas.csv"
+PARQUET_DIR = "parquet"
+
+# Linhas lidas e gravadas por lote na carga de arquivos grandes
+TAMANHO_LOTE_CARGA = 50_000
+
+# Planilhas de exportação (nome do arquivo, sem extensão, e a consulta que o alimenta) e formatos disponíveis.
+# No layout compacto a folha não tem id (NULL na view): a chave natural mantém a ordem estável entre execuções
+PLANILHAS_EXPORTACAO = {
+    "servidores": "SELECT nome, cpf, matricula, orgao, cargo FROM tb_servidores ORDER BY id",
+    "folha": "SELECT matricula, CAST(competencia AS INTEGER) AS competencia, vencimentos, descontos, liquido FROM tb_folha_pagamento "
+             "ORDER BY id, matricula, competencia",
+}
+FORMATOS_EXPORTACAO = ("xlsx", "csv")
+
+# Diretório dos arquivos de quarentena: linhas recusadas pela validação da carga, com os motivos
+QUARENTENA_DIR = "quarentena"
+
+# Snapshots do banco mantidos após cada publicação (o atual e o anterior, ainda em uso por leitores antigos)
+SNAPSHOTS_MANTIDOS = 2
+
+# Letras acentuadas do português (maiúsculas e minúsculas) e a letra base usada nas chaves de busca.
+# A lista é curta de propósito: cada letra é um replace() aninhado e o parser do SQLite limita o aninhamento
+ACENTOS = {
+    "a": "áàâãÁÀÂÃ",
+    "e": "éêÉÊ",
+    "i": "íÍ",
+    "o": "óôõÓÔÕ",
+    "u": "úüÚÜ",
+    "c": "çÇ",
+}
+
+# Expressão SQL que dobra um texto para busca (sem acentos, minúsculo, sem espaços nas pontas),
+# escrita só com funções nativas para funcionar em qualquer conexão (usada em colunas geradas)
+def sql_dobra_texto(expressao):
+    for base, acentuadas in ACENTOS.items():
+        for letra in acentuadas:
+            expressao = f"replace({expressao}, '{letra}', '{base}')"
+    return f"lower(trim({expressao}))"
+
+# Migrações do schema físico, aplicadas em ordem sobre o schema base de 'criacao_banco.sql'
+# A versão atual fica registrada em PRAGMA user_version
+MIGRACOES = {
+    # Versão 1: schema base com as tabelas tb_servidores e tb_folha_pagamento
+    1: "",
+
+    # Versão 2: índices para os joins por matrícula, filtros por órgão/cargo/nome e faixas de competência
+    2: """
+        CREATE INDEX IF NOT EXISTS idx_folha_matricula_competencia ON tb_folha_pagamento (matricula, competencia);
+        CREATE INDEX IF NOT EXISTS idx_folha_competencia ON tb_folha_pagamento (competencia);
+        CREATE INDEX IF NOT EXISTS idx_servidores_orgao_cargo ON tb_servidores (orgao, cargo);
+        CREATE INDEX IF NOT EXISTS idx_servidores_cargo ON tb_servidores (cargo);
+        CREATE INDEX IF NOT EXISTS idx_servidores_nome ON tb_servidores (nome);
+    """,
+
+    # Versão 3: agregados materializados da folha por órgão x cargo x competência e por ano
+    3: """
+        CREATE TABLE IF NOT EXISTS tb_resumo_folha_mensal (
+            orgao TEXT,
+            cargo TEXT,
+            competencia TEXT,
+            total_vencimentos REAL,
+            total_descontos REAL,
+            total_liquido REAL,
+            qtd_servidores INTEGER,
+            PRIMARY KEY (orgao, cargo, competencia)
+        );
+        CREATE INDEX IF NOT EXISTS idx_resumo_mensal_competencia ON tb_resumo_folha_mensal (competencia);
+
+        CREATE TABLE IF NOT EXISTS tb_resumo_folha_anual (
+            orgao TEXT,
+            cargo TEXT,
+            ano TEXT,
+            total_vencimentos REAL,
+            total_descontos REAL,
+            total_liquido REAL,
+            qtd_servidores INTEGER,
+            qtd_competencias INTEGER,
+            PRIMARY KEY (orgao, cargo, ano)
+        );
+        CREATE INDEX IF NOT EXISTS idx_resumo_anual_ano ON tb_resumo_folha_anual (ano);
+    """,
+
+    # Versão 4: eventos da folha (variação mês a mês, admissões, lacunas) e situação de cada servidor
+    4: """
+        CREATE TABLE IF NOT EXISTS tb_eventos_folha (
+            matricula TEXT,
+            competencia TEXT,
+            competencia_anterior TEXT,
+            vencimentos REAL,
+            vencimentos_anterior REAL,
+            variacao_vencimentos REAL,
+            lacuna_meses INTEGER,
+            tipo_evento TEXT,
+            PRIMARY KEY (matricula, competencia)
+        );
+        CREATE INDEX IF NOT EXISTS idx_eventos_tipo_competencia ON tb_eventos_folha (tipo_evento, competencia);
+
+        CREATE TABLE IF NOT EXISTS tb_situacao_servidor (
+            matricula TEXT PRIMARY KEY,
+            primeira_competencia TEXT,
+            ultima_competencia TEXT,
+            qtd_competencias INTEGER,
+            qtd_lacunas INTEGER,
+            meses_ausente INTEGER,
+            qtd_aumentos INTEGER,
+            variacao_total_vencimentos REAL,
+            desligado INTEGER
+        );
+        CREATE INDEX IF NOT EXISTS idx_situacao_desligado ON tb_situacao_servidor (desligado, ultima_competencia);
+        CREATE INDEX IF NOT EXISTS idx_situacao_aumentos ON tb_situacao_servidor (qtd_aumentos);
+    """,
+
+    # Versão 5: catálogo dos arquivos anuais da folha (um banco SQLite por ano, anexado nas conexões)
+    5: """
+        CREATE TABLE IF NOT EXISTS tb_particoes_folha (
+            ano TEXT PRIMARY KEY,
+            arquivo TEXT NOT NULL,
+            fechado INTEGER NOT NULL DEFAULT 0
+        );
+    """,
+
+    # Versão 6: órgão e cargo em tabelas de dimensão com chave inteira e chave de busca dobrada (coluna gerada);
+    # tb_servidores vira uma view (mesmas colunas + orgao_busca/cargo_busca) sobre tb_servidores_base,
+    # com gatilhos INSTEAD OF que resolvem as dimensões nas inserções, atualizações e exclusões
+    6: f"""
+        CREATE TABLE tb_orgaos (
+            id INTEGER PRIMARY KEY,
+            nome TEXT NOT NULL UNIQUE,
+            chave_busca TEXT GENERATED ALWAYS AS ({sql_dobra_texto("nome")}) STORED
+        );
+        CREATE INDEX idx_orgaos_chave_busca ON tb_orgaos (chave_busca);
+        CREATE TABLE tb_cargos (
+            id INTEGER PRIMARY KEY,
+            nome TEXT NOT NULL UNIQUE,
+            chave_busca TEXT GENERATED ALWAYS AS ({sql_dobra_texto("nome")}) STORED
+        );
+        CREATE INDEX idx_cargos_chave_busca ON tb_cargos (chave_busca);
+
+        INSERT INTO tb_orgaos (nome) SELECT DISTINCT orgao FROM tb_servidores WHERE orgao IS NOT NULL ORDER BY orgao;
+        INSERT INTO tb_cargos (nome) SELECT DISTINCT cargo FROM tb_servidores WHERE cargo IS NOT NULL ORDER BY cargo;
+
+        CREATE TABLE tb_servidores_base (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            nome TEXT,
+            cpf TEXT,
+            matricula TEXT UNIQUE,
+            orgao_id INTEGER REFERENCES tb_orgaos (id),
+            cargo_id INTEGER REFERENCES tb_cargos (id)
+        );
+        INSERT INTO tb_servidores_base (id, nome, cpf, matricula, orgao_id, cargo_id)
+        SELECT s.id, s.nome, s.cpf, s.matricula, o.id, c.id
+        FROM tb_servidores s
+        LEFT JOIN tb_orgaos o ON o.nome = s.orgao
+        LEFT JOIN tb_cargos c ON c.nome = s.cargo;
+
+        DROP TABLE tb_servidores;
+        CREATE INDEX idx_servidores_orgao_cargo ON tb_servidores_base (orgao_id, cargo_id);
+        CREATE INDEX idx_servidores_cargo ON tb_servidores_base (cargo_id);
+        CREATE INDEX idx_servidores_nome ON tb_servidores_base (nome);
+
+        CREATE VIEW tb_servidores AS
+        SELECT tb_servidores_base.id, tb_servidores_base.nome, cpf, matricula,
+               tb_orgaos.nome AS orgao, tb_cargos.nome AS cargo,
+               tb_orgaos.chave_busca AS orgao_busca, tb_cargos.chave_busca AS cargo_busca
+        FROM tb_servidores_base
+        LEFT JOIN tb_orgaos ON tb_orgaos.id = tb_servidores_base.orgao_id
+        LEFT JOIN tb_cargos ON tb_cargos.id = tb_servidores_base.cargo_id;
+
+        CREATE TRIGGER trg_servidores_insere INSTEAD OF INSERT ON tb_servidores
+        BEGIN
+            INSERT OR IGNORE INTO tb_orgaos (nome) VALUES (NEW.orgao);
+            INSERT OR IGNORE INTO tb_cargos (nome) VALUES (NEW.cargo);
+            INSERT INTO tb_servidores_base (id, nome, cpf, matricula, orgao_id, cargo_id)
+            VALUES (NEW.id, NEW.nome, NEW.cpf, NEW.matricula,
+                    (SELECT id FROM tb_orgaos WHERE nome = NEW.orgao), (SELECT id FROM tb_cargos WHERE nome = NEW.cargo));
+        END;
+
+        CREATE TRIGGER trg_servidores_atualiza INSTEAD OF UPDATE ON tb_servidores
+        BEGIN
+            INSERT OR IGNORE INTO tb_orgaos (nome) VALUES (NEW.orgao);
+            INSERT OR IGNORE INTO tb_cargos (nome) VALUES (NEW.cargo);
+            UPDATE tb_servidores_base
+            SET nome = NEW.nome, cpf = NEW.cpf, matricula = NEW.matricula,
+                orgao_id = (SELECT id FROM tb_orgaos WHERE nome = NEW.orgao),
+                cargo_id = (SELECT id FROM tb_cargos WHERE nome = NEW.cargo)
+            WHERE id = OLD.id;
+        END;
+
+        CREATE TRIGGER trg_servidores_exclui INSTEAD OF DELETE ON tb_servidores
+        BEGIN
+            DELETE FROM tb_servidores_base WHERE id = OLD.id;
+        END;
+    """,
+
+    # Versão 7: índice de texto (FTS5) sobre nome, órgão e cargo, sem acentos e sem diferenciar maiúsculas,
+    # para resolver nomes digitados de forma aproximada em matrículas; mantido por gatilhos nas tabelas base
+    7: """
+        CREATE VIRTUAL TABLE tb_busca_servidores USING fts5(
+            matricula UNINDEXED, nome, orgao, cargo,
+            tokenize = 'unicode61 remove_diacritics 2', prefix = '3'
+        );
+        INSERT INTO tb_busca_servidores (rowid, matricula, nome, orgao, cargo)
+        SELECT id, matricula, nome, orgao, cargo FROM tb_servidores;
+
+        CREATE TRIGGER trg_busca_servidores_insere AFTER INSERT ON tb_servidores_base
+        BEGIN
+            INSERT INTO tb_busca_servidores (rowid, matricula, nome, orgao, cargo)
+            VALUES (NEW.id, NEW.matricula, NEW.nome,
+                    (SELECT nome FROM tb_orgaos WHERE id = NEW.orgao_id), (SELECT nome FROM tb_cargos WHERE id = NEW.cargo_id));
+        END;
+
+        CREATE TRIGGER trg_busca_servidores_atualiza AFTER UPDATE ON tb_servidores_base
+        BEGIN
+            DELETE FROM tb_busca_servidores WHERE rowid = OLD.id;
+            INSERT INTO tb_busca_servidores (rowid, matricula, nome, orgao, cargo)
+            VALUES (NEW.id, NEW.matricula, NEW.nome,
+                    (SELECT nome FROM tb_orgaos WHERE id = NEW.orgao_id), (SELECT nome FROM tb_cargos WHERE id = NEW.cargo_id));
+        END;
+
+        CREATE TRIGGER trg_busca_servidores_exclui AFTER DELETE ON tb_servidores_base
+        BEGIN
+            DELETE FROM tb_busca_servidores WHERE rowid = OLD.id;
+        END;
+
+        CREATE TRIGGER trg_busca_orgaos_renomeia AFTER UPDATE OF nome ON tb_orgaos
+        BEGIN
+            UPDATE tb_busca_servidores SET orgao = NEW.nome
+            WHERE rowid IN (SELECT id FROM tb_servidores_base WHERE orgao_id = NEW.id);
+        END;
+
+        CREATE TRIGGER trg_busca_cargos_renomeia AFTER UPDATE OF nome ON tb_cargos
+        BEGIN
+            UPDATE tb_busca_servidores SET cargo = NEW.nome
+            WHERE rowid IN (SELECT id FROM tb_servidores_base WHERE cargo_id = NEW.id);
+        END;
+    """,
+}
+
+# Versão mais recente do schema
+VERSAO_SCHEMA = max(MIGRACOES)
+
+# Layout compacto da folha: competência inteira AAAAMM, valores em centavos (somas exatas) e tabela
+# STRICT WITHOUT ROWID agrupada por (matricula, competencia). tb_folha_pagamento vira uma view com as
+# colunas originais, e um gatilho INSTEAD OF converte as inserções feitas pela view
+SCHEMA_FOLHA_COMPACTA = """
+    CREATE TABLE tb_folha_compacta (
+        matricula TEXT NOT NULL,
+        competencia INTEGER NOT NULL,
+        vencimentos_centavos INTEGER NOT NULL,
+        descontos_centavos INTEGER NOT NULL,
+        liquido_centavos INTEGER NOT NULL,
+        PRIMARY KEY (matricula, competencia)
+    ) STRICT, WITHOUT ROWID;
+
+    INSERT INTO tb_folha_compacta
+    SELECT matricula, CAST(competencia AS INTEGER), CAST(ROUND(vencimentos * 100) AS INTEGER),
+           CAST(ROUND(descontos * 100) AS INTEGER), CAST(ROUND(liquido * 100) AS INTEGER)
+    FROM tb_folha_pagamento;
+
+    DROP TABLE tb_folha_pagamento;
+
+    CREATE INDEX idx_folha_compacta_competencia ON tb_folha_compacta (competencia);
+
+    CREATE VIEW tb_folha_pagamento AS
+    SELECT NULL AS id, matricula, competencia,
+           vencimentos_centavos / 100.0 AS vencimentos,
+           descontos_centavos / 100.0 AS descontos,
+           liquido_centavos / 100.0 AS liquido
+    FROM tb_folha_compacta;
+
+    CREATE TRIGGER trg_folha_pagamento_insere INSTEAD OF INSERT ON tb_folha_pagamento
+    BEGIN
+        INSERT INTO tb_folha_compacta
+        VALUES (NEW.matricula, CAST(NEW.competencia AS INTEGER), CAST(ROUND(NEW.vencimentos * 100) AS INTEGER),
+                CAST(ROUND(NEW.descontos * 100) AS INTEGER), CAST(ROUND(NEW.liquido * 100) AS INTEGER));
+    END;
+"""
+
+# Aplica as migrações pendentes e atualiza as estatísticas do otimizador
+def migra_schema(conn):
+
+    # Lê a versão atual registrada no banco
+    versao_atual = conn.execute("PRAGMA user_version").fetchone()[0]
+
+    # Aplica, em ordem, cada migração ainda não aplicada
+    for versao in sorted(v for v in MIGRACOES if v > versao_atual):
+        if MIGRACOES[versao]:
+            conn.executescript(MIGRACOES[versao])
+        conn.execute(f"PRAGMA user_version = {versao}")
+        print(f"Migração do schema para a versão {versao} aplicada.")
+
+    # Recalcula as tabelas derivadas criadas pelas migrações a partir dos dados já existentes
+    if versao_atual < VERSAO_SCHEMA:
+        anexa_particoes(conn)
+        atualiza_dados_derivados(conn)
+
+    # Recalcula as estatísticas usadas pelo planejador de consultas
+    conn.execute("ANALYZE")
+    conn.commit()
+
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+# Recalcula os agregados mensais e anuais apenas das competências informadas (todas, se None)
+def atualiza_resumos(conn, competencias=None):
+
+    # Sem lista explícita, considera todas as competências carregadas
+    if competencias is None:
+        competencias = [c for (c,) in conn.execute("SELECT DISTINCT competencia FROM tb_folha_pagamento")]
+
+    competencias = sorted({str(c) for c in competencias})
+    if not competencias:
+        return
+    anos = sorted({c[:4] for c in competencias})
+
+    # Parâmetros passados como listas JSON para evitar limites de variáveis do SQLite
+    competencias_json = json.dumps(competencias)
+    anos_json = json.dumps(anos)
+
+    with conn:
+
+        # Remove e recalcula os agregados mensais das competências afetadas
+        conn.execute("DELETE FROM tb_resumo_folha_mensal WHERE competencia IN (SELECT value FROM json_each(?))", (competencias_json,))
+        conn.execute("""
+            INSERT INTO tb_resumo_folha_mensal
+                (orgao, cargo, competencia, total_vencimentos, total_descontos, total_liquido, qtd_servidores)
+            SELECT s.orgao, s.cargo, f.competencia,
+                   SUM(f.vencimentos), SUM(f.descontos), SUM(f.liquido), COUNT(DISTINCT f.matricula)
+            FROM tb_folha_pagamento f
+            JOIN tb_servidores s ON s.matricula = f.matricula
+            WHERE f.competencia IN (SELECT value FROM json_each(?))
+            GROUP BY s.orgao, s.cargo, f.competencia
+        """, (competencias_json,))
+
+        # Remove e recalcula os agregados anuais dos anos afetados
+        conn.execute("DELETE FROM tb_resumo_folha_anual WHERE ano IN (SELECT value FROM json_each(?))", (anos_json,))
+        conn.execute("""
+            INSERT INTO tb_resumo_folha_anual
+                (orgao, cargo, ano, total_vencimentos, total_descontos, total_liquido, qtd_servidores, qtd_competencias)
+            SELECT s.orgao, s.cargo, a.value,
+                   SUM(f.vencimentos), SUM(f.descontos), SUM(f.liquido),
+                   COUNT(DISTINCT f.matricula), COUNT(DISTINCT f.competencia)
+            FROM json_each(?) a
+            JOIN tb_folha_pagamento f ON f.competencia BETWEEN a.value || '01' AND a.value || '12'
+            JOIN tb_servidores s ON s.matricula = f.matricula
+            GROUP BY s.orgao, s.cargo, a.value
+        """, (anos_json,))
+
+    print(f"Agregados da folha atualizados para {len(competencias)} competência(s).")
+
+# Recalcula, em uma única passada com funções de janela, os eventos e a situação dos servidores
+# que têm folha nas competências informadas (todos, se None)
+def atualiza_eventos(conn, competencias=None):
+
+    # A primeira folha de cada matrícula é 'admissao' ou 'inicio' conforme a competência mínima global;
+    # se a carga moveu esse mínimo (competência anterior às já processadas), todas as matrículas são refeitas
+    if competencias is not None:
+        (minimo_eventos,) = conn.execute("SELECT MIN(competencia) FROM tb_eventos_folha").fetchone()
+        (minimo_folha,) = conn.execute("SELECT MIN(competencia) FROM tb_folha_pagamento").fetchone()
+        if minimo_eventos is not None and minimo_eventos != minimo_folha:
+            competencias = None
+
+    # Seleciona as matrículas afetadas pelas competências carregadas
+    if competencias is None:
+        matriculas = [m for (m,) in conn.execute("SELECT DISTINCT matricula FROM tb_folha_pagamento")]
+    else:
+        matriculas = [m for (m,) in conn.execute(
+            "SELECT DISTINCT matricula FROM tb_folha_pagamento WHERE competencia IN (SELECT value FROM json_each(?))",
+            (json.dumps(sorted({str(c) for c in competencias})),),
+        )]
+
+    matriculas_json = json.dumps(matriculas)
+
+    with conn:
+
+        # Recalcula o histórico completo de eventos das matrículas afetadas
+        conn.execute("DELETE FROM tb_eventos_folha WHERE matricula IN (SELECT value FROM json_each(?))", (matriculas_json,))
+        conn.execute("""
+            INSERT INTO tb_eventos_folha
+                (matricula, competencia, competencia_anterior, vencimentos, vencimentos_anterior,
+                 variacao_vencimentos, lacuna_meses, tipo_evento)
+            WITH base AS (
+                SELECT matricula, competencia, vencimentos,
+                       CAST(substr(competencia, 1, 4) AS INTEGER) * 12 + CAST(substr(competencia, 5, 2) AS INTEGER) AS ordinal
+                FROM tb_folha_pagamento
+                WHERE matricula IN (SELECT value FROM json_each(?))
+            ),
+            janelas AS (
+                SELECT matricula, competencia, vencimentos, ordinal,
+                       LAG(competencia) OVER w AS competencia_anterior,
+                       LAG(vencimentos) OVER w AS vencimentos_anterior,
+                       LAG(ordinal) OVER w AS ordinal_anterior
+                FROM base
+                WINDOW w AS (PARTITION BY matricula ORDER BY competencia)
+            )
+            SELECT matricula, competencia, competencia_anterior, vencimentos, vencimentos_anterior,
+                   vencimentos - vencimentos_anterior,
+                   COALESCE(ordinal - ordinal_anterior - 1, 0),
+                   CASE
+                       WHEN competencia_anterior IS NULL THEN
+                           CASE WHEN competencia > (SELECT MIN(competencia) FROM tb_folha_pagamento)
+                                THEN 'admissao' ELSE 'inicio' END
+                       WHEN vencimentos > vencimentos_anterior THEN 'aumento'
+                       WHEN vencimentos < vencimentos_anterior THEN 'reducao'
+                       ELSE 'sem_alteracao'
+                   END
+            FROM janelas
+        """, (matriculas_json,))
+
+        # Consolida a situação das matrículas afetadas a partir dos eventos
+        conn.execute("DELETE FROM tb_situacao_servidor WHERE matricula IN (SELECT value FROM json_each(?))", (matriculas_json,))
+        conn.execute("""
+            INSERT INTO tb_situacao_servidor
+                (matricula, primeira_competencia, ultima_competencia, qtd_competencias, qtd_lacunas,
+                 meses_ausente, qtd_aumentos, variacao_total_vencimentos, desligado)
+            SELECT matricula, MIN(competencia), MAX(competencia), COUNT(*), SUM(lacuna_meses > 0),
+                   SUM(lacuna_meses), SUM(tipo_evento = 'aumento'), COALESCE(SUM(variacao_vencimentos), 0), 0
+            FROM tb_eventos_folha
+            WHERE matricula IN (SELECT value FROM json_each(?))
+            GROUP BY matricula
+        """, (matriculas_json,))
+
+        # Servidores sem folha na competência mais recente são considerados desligados
+        conn.execute("""
+            UPDATE tb_situacao_servidor
+            SET desligado = ultima_competencia < (SELECT MAX(competencia) FROM tb_folha_pagamento)
+        """)
+
+    print(f"Eventos da folha atualizados para {len(matriculas)} servidor(es).")
+
+# Atualiza todas as tabelas derivadas da folha para as competências informadas (todas, se None)
+def atualiza_dados_derivados(conn, competencias=None):
+    atualiza_resumos(conn, competencias)
+    atualiza_eventos(conn, competencias)
+
+# Nome do arquivo anual da folha: '<banco>_<ano>.db', no mesmo diretório do banco principal
+def arquivo_particao(db_file, ano):
+    return f"{os.path.splitext(db_file)[0]}_{ano}.db"
+
+# Arquivos anuais existentes ao lado do banco principal
+def arquivos_particoes(db_file):
+    return sorted(Path(db_file).parent.glob(Path(arquivo_particao(db_file, "[0-9][0-9][0-9][0-9]")).name))
+
+# Caminho do arquivo do banco principal de uma conexão
+def _arquivo_principal(conn):
+    return next(arquivo for _, nome, arquivo in conn.execute("PRAGMA database_list") if nome == "main")
+
+# Arquivo ponteiro com o nome do snapshot publicado: '<banco>.atual', ao lado do banco
+def ponteiro_snapshot(db_file):
+    return f"{db_file}.atual"
+
+# Nome de um snapshot do banco: '<banco>.<versão>.db', com a versão AAAAMMDDTHHMMSSffffff (ordem cronológica)
+def arquivo_snapshot(db_file, versao):
+    return f"{os.path.splitext(db_file)[0]}.{versao}.db"
+
+# Snapshots existentes ao lado do banco, do mais antigo ao mais recente
+def snapshots(db_file):
+    base = Path(os.path.splitext(db_file)[0])
+    padrao = re.compile(re.escape(base.name) + r"\.\d{8}T\d{12}\.db")
+    return sorted(p for p in base.parent.glob(f"{base.name}.*.db") if padrao.fullmatch(p.name))
+
+# Arquivo do banco que os leitores devem abrir: o snapshot indicado pelo ponteiro ou, antes da
+# primeira publicação, o próprio db_file
+def banco_atual(db_file=DB_FILE):
+    try:
+        with open(ponteiro_snapshot(db_file), encoding="utf-8") as f:
+            nome = f.read().strip()
+    except FileNotFoundError:
+        return db_file
+    return os.path.join(os.path.dirname(db_file), nome)
+
+# Remove um arquivo de banco e seus arquivos anuais. Retorna False se algum arquivo estiver em uso
+# (no Windows, um arquivo aberto por um leitor não pode ser removido); a remoção é tentada de novo depois
+def _remove_banco(db_file):
+    try:
+        for particao in arquivos_particoes(db_file):
+            os.remove(particao)
+        if os.path.exists(db_file):
+            os.remove(db_file)
+    except OSError:
+        return False
+    return True
+
+# Remove os snapshots antigos, mantendo os 'manter' mais recentes e o publicado. Os leitores que ainda estão
+# em um snapshot antigo passam ao atual na próxima consulta. O banco fixo de antes dos snapshots também sai
+def remove_snapshots_antigos(db_file=DB_FILE, manter=SNAPSHOTS_MANTIDOS):
+    atual = Path(banco_atual(db_file))
+    existentes = snapshots(db_file)
+    antigos = [p for p in (existentes[:-manter] if manter > 0 else existentes) if p.name != atual.name]
+    if os.path.exists(ponteiro_snapshot(db_file)) and os.path.exists(db_file):
+        antigos.insert(0, Path(db_file))
+
+    removidos = [str(p) for p in antigos if _remove_banco(str(p))]
+    if len(removidos) < len(antigos):
+        print(f"Aviso: {len(antigos) - len(removidos)} snapshot(s) em uso não removido(s); nova tentativa na próxima publicação.")
+    return removidos
+
+# Publica o banco montado em 'origem' como um novo snapshot de db_file: o arquivo (e seus anuais, com o
+# catálogo de partições ajustado) é renomeado para '<banco>.<versão>.db' e o ponteiro é trocado de uma vez
+# (os.replace). Nenhum arquivo aberto pelos leitores é removido ou sobrescrito durante a troca.
+# Retorna o caminho do snapshot publicado
+def publica_snapshot(origem, db_file=DB_FILE, manter=SNAPSHOTS_MANTIDOS):
+
+    destino = arquivo_snapshot(db_file, datetime.now().strftime("%Y%m%dT%H%M%S%f"))
+
+    # Os arquivos anuais acompanham o nome do snapshot; o catálogo guarda apenas o nome do arquivo
+    conn = sqlite3.connect(origem)
+    try:
+        particoes = []
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'tb_particoes_folha'").fetchone():
+            particoes = conn.execute("SELECT ano, arquivo FROM tb_particoes_folha").fetchall()
+        with conn:
+            for ano, _ in particoes:
+                conn.execute(
+                    "UPDATE tb_particoes_folha SET arquivo = ? WHERE ano = ?",
+                    (os.path.basename(arquivo_particao(destino, ano)), ano),
+                )
+    finally:
+        conn.close()
+    for ano, arquivo in particoes:
+        os.replace(os.path.join(os.path.dirname(origem), arquivo), arquivo_particao(destino, ano))
+    os.replace(origem, destino)
+
+    # Grava o ponteiro em um arquivo temporário e o troca de uma vez: leitores veem o snapshot antigo ou o novo
+    ponteiro = ponteiro_snapshot(db_file)
+    temporario = f"{ponteiro}.tmp-{os.getpid()}"
+    with open(temporario, "w", encoding="utf-8") as f:
+        f.write(os.path.basename(destino))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporario, ponteiro)
+    print(f"Snapshot '{destino}' publicado.")
+
+    remove_snapshots_antigos(db_file, manter)
+    return destino
+
+# Manifesto da carga: '<banco>.manifesto.json', com os hashes xxh3 das entradas (arquivos de carga, schema e
+# opções), das tabelas do banco publicado e das saídas exportadas. Permite pular a recarga e as exportações
+# que não mudaram, e informa aos leitores a versão do conteúdo do banco (ver versao_conteudo)
+def arquivo_manifesto(db_file=DB_FILE):
+    return f"{db_file}.manifesto.json"
+
+# Hash do conteúdo de um arquivo, lido em blocos; um diretório (dataset Parquet) inclui nomes e conteúdo de todos os arquivos
+def hash_arquivo(caminho, tamanho_bloco=1024 * 1024):
+    h = xxhash.xxh3_128()
+    raiz = Path(caminho)
+    for arquivo in sorted(p for p in raiz.rglob("*") if p.is_file()) if raiz.is_dir() else [raiz]:
+        if arquivo != raiz:
+            h.update(arquivo.relative_to(raiz).as_posix().encode())
+        with open(arquivo, "rb") as f:
+            while bloco := f.read(tamanho_bloco):
+                h.update(bloco)
+    return h.hexdigest()
+
+# Hash do schema: o script SQL base, as migrações e o layout compacto
+def hash_schema(sql_file=SQL_FILE):
+    h = xxhash.xxh3_128(hash_arquivo(sql_file).encode())
+    h.update(json.dumps({str(v): m for v, m in MIGRACOES.items()}, sort_keys=True).encode())
+    h.update(SCHEMA_FOLHA_COMPACTA.encode())
+    return h.hexdigest()
+
+# Hash do conteúdo de linhas, independente da ordem: soma (módulo 2^64) dos hashes de cada linha, calculados
+# de forma vetorizada pelo pandas, mais a quantidade de linhas. Aceita um DataFrame ou uma sequência de lotes
+def hash_dados(lotes):
+    linhas = 0
+    soma = 0
+    for lote in [lotes] if isinstance(lotes, pd.DataFrame) else lotes:
+        linhas += len(lote)
+        # A soma entre lotes é feita em int do Python para não emitir avisos de estouro do escalar uint64
+        soma = (soma + int(pd.util.hash_pandas_object(lote, index=False).to_numpy().sum(dtype=np.uint64))) % 2**64
+    return f"{linhas}:{soma:016x}"
+
+# Hash do conteúdo de uma tabela ou view do banco, lida em lotes
+def hash_tabela(conn, tabela, tamanho_lote=500_000):
+    return hash_dados(pd.read_sql_query(f'SELECT * FROM "{tabela}"', conn, chunksize=tamanho_lote))
+
+# Tamanho e data de modificação do banco e de seus arquivos anuais: mudam com qualquer gravação no lugar
+def assinatura_banco(caminho):
+    return [[p.name, p.stat().st_size, p.stat().st_mtime_ns] for p in [Path(caminho), *arquivos_particoes(caminho)]]
+
+# Lê o manifesto do banco (vazio se ainda não existe ou está ilegível)
+def le_manifesto(db_file=DB_FILE):
+    try:
+        with open(arquivo_manifesto(db_file), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+# Grava o manifesto com troca atômica
+def grava_manifesto(manifesto, db_file=DB_FILE):
+    destino = arquivo_manifesto(db_file)
+    temporario = f"{destino}.tmp-{os.getpid()}"
+    with open(temporario, "w", encoding="utf-8") as f:
+        json.dump(manifesto, f, ensure_ascii=False, indent=2)
+    os.replace(temporario, destino)
+
+# Registra no manifesto o banco publicado em 'caminho' (nome e assinatura dos arquivos)
+def registra_banco(manifesto, caminho):
+    manifesto["banco"] = {"arquivo": os.path.basename(caminho), "arquivos": assinatura_banco(caminho)}
+    manifesto["atualizado_em"] = datetime.now().isoformat(timespec="seconds")
+
+# Indica se o manifesto ainda descreve o arquivo do banco em 'caminho' (nenhuma gravação desde o registro)
+def manifesto_valido(manifesto, caminho):
+    banco = manifesto.get("banco") or {}
+    return (
+        banco.get("arquivo") == os.path.basename(caminho)
+        and os.path.exists(caminho)
+        and banco.get("arquivos") == assinatura_banco(caminho)
+    )
+
+# Versão do conteúdo do banco em 'caminho' (o publicado, por padrão) segundo o manifesto: um hash das tabelas
+# que só muda quando os dados mudam, mesmo que o snapshot seja republicado. None se o manifesto não descreve
+# mais esse arquivo (gravado no lugar depois do manifesto, por exemplo)
+def versao_conteudo(db_file=DB_FILE, caminho=None):
+    manifesto = le_manifesto(db_file)
+    if not manifesto_valido(manifesto, caminho or banco_atual(db_file)):
+        return None
+    return manifesto.get("conteudo")
+
+# Indica se a saída registrada no manifesto ('anterior') tem os mesmos dados (hash 'versao') e se o arquivo
+# em disco ainda é o que foi gravado
+def saida_inalterada(anterior, arquivo, versao):
+    return bool(anterior) and anterior["dados"] == versao and os.path.exists(arquivo) and hash_arquivo(arquivo) == anterior["arquivo"]
+
+# Executa 'grava(arquivo)' só se os dados da saída mudaram (hash 'versao') ou se o arquivo foi alterado ou
+# removido desde a última exportação; registra no manifesto os hashes dos dados e do arquivo gravado.
+# Sem manifesto, sempre grava. Retorna True se o arquivo foi gravado
+def exporta_se_alterada(manifesto, arquivo, versao, grava):
+    if saida_inalterada((manifesto or {}).get("saidas", {}).get(arquivo), arquivo, versao):
+        print(f"Saída '{arquivo}' inalterada; exportação ignorada.")
+        return False
+    grava(arquivo)
+    if manifesto is not None and os.path.exists(arquivo):
+        manifesto.setdefault("saidas", {})[arquivo] = {"dados": versao, "arquivo": hash_arquivo(arquivo)}
+    return True
+
+# Anexa os arquivos anuais listados em tb_particoes_folha (como 'p_<ano>') e cria a view temporária
+# tb_folha_pagamento, que une as partições e a tabela de carga do banco principal.
+# Em modo somente leitura, os anos fechados são abertos com immutable=1 (sem travas nem checagem de mudanças).
+# Retorna os anos anexados (lista vazia se o banco não é particionado)
+def anexa_particoes(conn, somente_leitura=False):
+
+    # Bancos sem o catálogo (ou sem partições) usam a tabela do banco principal diretamente
+    if not conn.execute("SELECT 1 FROM main.sqlite_master WHERE name = 'tb_particoes_folha'").fetchone():
+        return []
+    particoes = conn.execute("SELECT ano, arquivo, fechado FROM main.tb_particoes_folha ORDER BY ano").fetchall()
+    if not particoes:
+        return []
+
+    diretorio = os.path.dirname(_arquivo_principal(conn))
+    anexados = {nome for _, nome, _ in conn.execute("PRAGMA database_list")}
+
+    for ano, arquivo, fechado in particoes:
+        if f"p_{ano}" in anexados:
+            continue
+        caminho = os.path.join(diretorio, arquivo)
+        if somente_leitura:
+            caminho = Path(caminho).resolve().as_uri() + ("?mode=ro&immutable=1" if fechado else "?mode=ro")
+        conn.execute(f"ATTACH DATABASE ? AS p_{ano}", (caminho,))
+
+    # A view temporária tem precedência sobre a tabela homônima do banco principal
+    uniao = " UNION ALL ".join(f"SELECT * FROM p_{ano}.tb_folha_pagamento" for ano, _, _ in particoes)
+    conn.execute("DROP VIEW IF EXISTS temp.tb_folha_pagamento")
+    conn.execute(f"CREATE TEMP VIEW tb_folha_pagamento AS {uniao} UNION ALL SELECT * FROM main.tb_folha_pagamento")
+
+    return [ano for ano, _, _ in particoes]
+
+# Move as linhas da tabela de carga (main.tb_folha_pagamento) para os arquivos anuais, criando as
+# partições que faltam com o mesmo schema e índices da tabela principal. Todos os anos anteriores
+# ao mais recente são fechados: compactados, analisados e marcados como imutáveis
+def particiona_folha(conn):
+
+    # O layout compacto substitui a tabela da folha por uma view, que não pode ser copiada para os arquivos anuais
+    if conn.execute("SELECT type FROM main.sqlite_master WHERE name = 'tb_folha_pagamento'").fetchone()[0] != "table":
+        raise ValueError("O particionamento por ano requer o layout padrão da folha (não o compacto).")
+
+    principal = _arquivo_principal(conn)
+    anos = [a for (a,) in conn.execute("SELECT DISTINCT substr(competencia, 1, 4) FROM main.tb_folha_pagamento ORDER BY 1")]
+    catalogo = dict(conn.execute("SELECT ano, fechado FROM main.tb_particoes_folha").fetchall())
+
+    # Anos fechados não recebem novas linhas
+    fechados = [ano for ano in anos if catalogo.get(ano)]
+    if fechados:
+        raise ValueError(f"Partição(ões) fechada(s) para o(s) ano(s) {', '.join(fechados)}: anos fechados são imutáveis.")
+
+    # DDL da tabela e dos índices da folha, reaplicada em cada partição nova
+    ddl = [sql for (sql,) in conn.execute(
+        "SELECT sql FROM main.sqlite_master WHERE tbl_name = 'tb_folha_pagamento' AND sql IS NOT NULL ORDER BY type DESC"
+    )]
+    anexados = {nome for _, nome, _ in conn.execute("PRAGMA database_list")}
+
+    # Anexa (criando, se preciso) o arquivo de cada ano; ATTACH não pode ocorrer dentro de uma transação
+    conn.commit()
+    for ano in anos:
+        if f"p_{ano}" not in anexados:
+            conn.execute(f"ATTACH DATABASE ? AS p_{ano}", (arquivo_particao(principal, ano),))
+            anexados.add(f"p_{ano}")
+
+    with conn:
+        for ano in anos:
+            esquema = f"p_{ano}"
+            if not conn.execute(f"SELECT 1 FROM {esquema}.sqlite_master WHERE name = 'tb_folha_pagamento'").fetchone():
+                for comando in ddl:
+                    conn.execute(re.sub(
+                        r"^(CREATE\s+(?:UNIQUE\s+)?(?:TABLE|INDEX)\s+(?:IF\s+NOT\s+EXISTS\s+)?)",
+                        rf"\1{esquema}.", comando, count=1, flags=re.IGNORECASE,
+                    ))
+
+            # Copia as linhas do ano (mantendo os ids) e registra a partição no catálogo
+            conn.execute(
+                f"INSERT INTO {esquema}.tb_folha_pagamento SELECT * FROM main.tb_folha_pagamento WHERE competencia BETWEEN ? AND ?",
+                (f"{ano}01", f"{ano}12"),
+            )
+            conn.execute(
+                "INSERT OR IGNORE INTO main.tb_particoes_folha (ano, arquivo) VALUES (?, ?)",
+                (ano, os.path.basename(arquivo_particao(principal, ano))),
+            )
+            catalogo.setdefault(ano, 0)
+
+        conn.execute("DELETE FROM main.tb_folha_pagamento")
+
+    # Fecha os anos anteriores ao mais recente; apenas o ano corrente continua gravável
+    ano_corrente = max(catalogo, default=None)
+    for ano in sorted(a for a, fechado in catalogo.items() if not fechado and a != ano_corrente):
+        esquema = f"p_{ano}"
+        if esquema not in anexados:
+            conn.execute(f"ATTACH DATABASE ? AS {esquema}", (arquivo_particao(principal, ano),))
+            anexados.add(esquema)
+        conn.execute(f"ANALYZE {esquema}")
+        conn.commit()
+        conn.execute(f"VACUUM {esquema}")
+        conn.execute("UPDATE main.tb_particoes_folha SET fechado = 1 WHERE ano = ?", (ano,))
+        conn.commit()
+        print(f"Partição do ano {ano} fechada (somente leitura, imutável).")
+
+    # Atualiza as estatísticas do ano corrente e da tabela de carga, agora vazia
+    if ano_corrente:
+        conn.execute(f"ANALYZE p_{ano_corrente}")
+    conn.execute("ANALYZE main")
+    conn.commit()
+
+    anexa_particoes(conn)
+    print(f"Folha particionada por ano: {', '.join(sorted(catalogo))}.")
+
+# Converte a folha para o layout compacto (SCHEMA_FOLHA_COMPACTA), preservando os dados carregados
+def compacta_folha(conn):
+
+    # Já convertido: tb_folha_pagamento é a view de compatibilidade
+    tipo = conn.execute("SELECT type FROM main.sqlite_master WHERE name = 'tb_folha_pagamento'").fetchone()
+    if tipo and tipo[0] == "view":
+        return
+
+    # Os arquivos anuais copiam a tabela da folha e exigem o layout padrão
+    if conn.execute("SELECT COUNT(*) FROM main.tb_particoes_folha").fetchone()[0]:
+        raise ValueError("O layout compacto não pode ser aplicado a um banco particionado por ano.")
+
+    try:
+        conn.executescript(f"BEGIN; {SCHEMA_FOLHA_COMPACTA} COMMIT;")
+    except sqlite3.Error:
+        conn.rollback()
+        raise
+
+    conn.execute("ANALYZE")
+    conn.commit()
+    print("Folha convertida para o layout compacto (competência inteira, centavos, WITHOUT ROWID).")
 
 # Declara a função responsável por criar e conectar ao banco de dados SQLite
-def cria_database():
+def cria_database(db_file=DB_FILE, sql_file=SQL_FILE):
 
     # Verifica se o arquivo SQL existe no diretório atual
-    if not os.path.exists(SQL_FILE):
-        print(f"Erro: O arquivo de script SQL '{SQL_FILE}' não foi encontrado.")
-        return
+    if not os.path.exists(sql_file):
+        print(f"Erro: O arquivo de script SQL '{sql_file}' não foi encontrado.")
+        return None, None
 
-    # Remove o banco de dados existente para garantir uma recriação limpa
-    if os.path.exists(DB_FILE):
+    # Remove o banco de dados existente (e seus arquivos anuais) para garantir uma recriação limpa
+    if os.path.exists(db_file):
         try:
-            os.remove(DB_FILE)
-            print(f"Banco de dados antigo '{DB_FILE}' removido com sucesso.")
+            for particao in arquivos_particoes(db_file):
+                os.remove(particao)
+            os.remove(db_file)
+            print(f"Banco de dados antigo '{db_file}' removido com sucesso.")
         except PermissionError:
-            print(f"Erro: Permissão negada ao tentar remover '{DB_FILE}'. Feche qualquer programa que esteja usando o banco de dados.")
-            return
+            print(f"Erro: Permissão negada ao tentar remover '{db_file}'. Feche qualquer programa que esteja usando o banco de dados.")
+            return None, None
 
     # Inicializa a variável de conexão como None
     conn = None
@@ -35,17 +809,17 @@ def cria_database():
     try:
 
         # Conecta-se ao arquivo de banco de dados SQLite ou cria se não existir
-        conn = sqlite3.connect(DB_FILE)
+        conn = sqlite3.connect(db_file)
         
         # Cria um cursor para executar comandos SQL
         cursor = conn.cursor()
 
         # Exibe mensagem de conexão bem-sucedida
-        print(f"Conectado ao banco de dados: {DB_FILE}")
+        print(f"Conectado ao banco de dados: {db_file}")
 
         # Lê o conteúdo do arquivo SQL
         # encoding='utf-8' é importante para caracteres especiais
-        with open(SQL_FILE, 'r', encoding='utf-8') as f:
+        with open(sql_file, 'r', encoding='utf-8') as f:
             sql_script = f.read()
             
         print("Executando o script SQL...")
@@ -54,10 +828,10 @@ def cria_database():
         cursor.executescript(sql_script)
         
         conn.commit()
-        print(f"Sucesso! O banco de dados '{DB_FILE}' foi criado e populado com os dados de '{SQL_FILE}'.")
+        print(f"Sucesso! O banco de dados '{db_file}' foi criado com o schema de '{sql_file}'.")
 
-        # Aplica as alterações no banco de dados
-        conn.commit()
+        # Aplica as migrações até a versão mais recente do schema (índices e estatísticas)
+        migra_schema(conn)
 
         # Informa que a estrutura do banco está pronta
         print("Estrutura do banco de dados pronta.")
@@ -78,16 +852,18 @@ def cria_database():
         return None, None
 
 # Declara a função que popula as tabelas com dados de exemplo
-def popula_tabelas(conn, cursor):
+def popula_tabelas(conn, cursor, csv_file=CSV_FILE, quarentena=None):
 
     # Informa início do processo de inserção de dados de exemplo
     print("Populando com dados de exemplo de Folha de Pagamento...")
 
     # Bloco de tratamento de erros para inserção de dados
     try:
-        df = pd.read_csv("folha_pe_200linhas.csv")
+        df = pd.read_csv(csv_file)
 
-        conn = sqlite3.connect("folha_pagamento.db")
+        # Separa em quarentena as linhas que não passam na validação
+        quarentena = quarentena if quarentena is not None else Quarentena()
+        df = quarentena.filtra(df, csv_file)
 
         # Popular tabela de servidores
         df_servidores = df[["nome","cpf","matricula","orgao","cargo"]].drop_duplicates()
@@ -97,40 +873,995 @@ def popula_tabelas(conn, cursor):
         df_folha = df[["matricula","competencia","vencimentos","descontos","liquido"]]
         df_folha.to_sql("tb_folha_pagamento", conn, if_exists="append", index=False)
 
-        df_servidores.to_excel("servidores.xlsx", index=False)
-        df_servidores.to_csv('servidores.csv', index=False, sep=';')
-        df_folha.to_excel("folha.xlsx", index=False)
-        df_folha.to_csv('folha.csv', index=False, sep=';')  
+        # Em bancos particionados, enxerga o histórico dos arquivos anuais junto com a carga nova
+        conn.commit()
+        anexa_particoes(conn)
+
+        # Mantém os agregados atualizados para as competências carregadas
+        atualiza_dados_derivados(conn, df_folha["competencia"].unique().tolist())
 
         # Aplica as alterações
         conn.commit()
-        print(f"Dados de exemplo do arquivo 'folha_pe_200linhas.csv' inseridos com sucesso.")
+
+        # Atualiza as estatísticas do otimizador com os dados carregados
+        conn.execute("ANALYZE")
+        conn.commit()
+        print(f"Dados de exemplo do arquivo '{csv_file}' inseridos com sucesso.")
+        quarentena.relatorio()
 
     except sqlite3.Error as e:
         print(f"Erro ao popular tabelas: {e}")
 
+# Colunas de cada tabela no arquivo de carga
+COLUNAS_SERVIDORES = ["nome", "cpf", "matricula", "orgao", "cargo"]
+COLUNAS_FOLHA = ["matricula", "competencia", "vencimentos", "descontos", "liquido"]
+
+# Marca as linhas de 'novos' que não existem em 'atuais' (pela chave) ou que têm alguma coluna diferente.
+# Valores numéricos são comparados em centavos; nulos dos dois lados contam como iguais.
+# Retorna (linhas inseridas, linhas atualizadas, quantidade de inalteradas)
+def _separa_alteracoes(novos, atuais, chave):
+    juncao = novos.merge(atuais, on=chave, how="left", suffixes=("", "_atual"), indicator=True)
+    inseridos = juncao["_merge"] == "left_only"
+
+    diferente = pd.Series(False, index=juncao.index)
+    for coluna in (c for c in novos.columns if c not in chave):
+        novo, atual = juncao[coluna], juncao[f"{coluna}_atual"]
+        if pd.api.types.is_numeric_dtype(novo) and pd.api.types.is_numeric_dtype(atual):
+            diferente |= ~np.isclose(novo, atual, rtol=0, atol=0.005, equal_nan=True)
+        else:
+            diferente |= (novo != atual) & ~(novo.isna() & atual.isna())
+    atualizados = ~inseridos & diferente
+
+    return juncao.loc[inseridos, novos.columns], juncao.loc[atualizados, novos.columns], int((~inseridos & ~diferente).sum())
+
+# Converte um DataFrame em tuplas para executemany, trocando NaN por NULL
+def _tuplas(df, colunas):
+    return list(df[colunas].astype(object).where(df[colunas].notna(), None).itertuples(index=False, name=None))
+
+# Carga incremental: grava apenas os servidores e as linhas de folha (matricula, competencia) novos ou
+# alterados em relação ao banco, em uma única transação, sem recriar o arquivo. Depois recalcula os dados
+# derivados somente das competências afetadas. Retorna as contagens de inseridos/atualizados/inalterados
+def carga_incremental(conn, csv_file=CSV_FILE, quarentena=None):
+
+    print(f"Carga incremental do arquivo '{csv_file}'...")
+
+    df = pd.read_csv(csv_file, dtype={"matricula": str, "cpf": str, "competencia": str})
+
+    # Linhas inválidas ou com chave (matricula, competencia) repetida vão para a quarentena
+    quarentena = quarentena if quarentena is not None else Quarentena()
+    df = quarentena.filtra(df, csv_file)
+    quarentena.relatorio()
+
+    # A última ocorrência de cada servidor no arquivo prevalece
+    servidores = df[COLUNAS_SERVIDORES].drop_duplicates("matricula", keep="last")
+    folha = df[COLUNAS_FOLHA]
+
+    # Em bancos particionados, compara também com as linhas dos arquivos anuais
+    conn.commit()
+    anexa_particoes(conn)
+
+    # Estado atual apenas das matrículas e competências presentes no arquivo
+    servidores_atuais = pd.read_sql(
+        "SELECT nome, cpf, matricula, orgao, cargo FROM tb_servidores WHERE matricula IN (SELECT value FROM json_each(?))",
+        conn, params=(json.dumps(servidores["matricula"].tolist()),),
+    )
+    folha_atual = pd.read_sql(
+        "SELECT matricula, CAST(competencia AS TEXT) AS competencia, vencimentos, descontos, liquido FROM tb_folha_pagamento "
+        "WHERE competencia IN (SELECT value FROM json_each(?))",
+        conn, params=(json.dumps(sorted(folha["competencia"].unique().tolist())),),
+    )
+
+    servidores_novos, servidores_alterados, servidores_iguais = _separa_alteracoes(servidores, servidores_atuais, ["matricula"])
+    folha_nova, folha_alterada, folha_igual = _separa_alteracoes(folha, folha_atual, ["matricula", "competencia"])
+
+    # Anos fechados dos bancos particionados são imutáveis
+    catalogo = dict(conn.execute("SELECT ano, fechado FROM main.tb_particoes_folha").fetchall())
+    anos = set(folha_nova["competencia"].str[:4]) | set(folha_alterada["competencia"].str[:4])
+    fechados = sorted(ano for ano in anos if catalogo.get(ano))
+    if fechados:
+        raise ValueError(f"Partição(ões) fechada(s) para o(s) ano(s) {', '.join(fechados)}: anos fechados são imutáveis.")
+
+    # No layout compacto a folha é uma view: INSERT OR REPLACE passa pelo gatilho e substitui a linha pela chave
+    compacto = conn.execute("SELECT type FROM main.sqlite_master WHERE name = 'tb_folha_pagamento'").fetchone()[0] == "view"
+
+    with conn:
+
+        # Servidores novos e alterados, gravados pela view (que resolve órgão e cargo nas dimensões)
+        conn.executemany(
+            "INSERT INTO tb_servidores (nome, cpf, matricula, orgao, cargo) VALUES (?, ?, ?, ?, ?)",
+            _tuplas(servidores_novos, COLUNAS_SERVIDORES),
+        )
+        conn.executemany(
+            "UPDATE tb_servidores SET nome = ?, cpf = ?, orgao = ?, cargo = ? WHERE matricula = ?",
+            _tuplas(servidores_alterados, ["nome", "cpf", "orgao", "cargo", "matricula"]),
+        )
+
+        # Linhas novas vão para a tabela de carga do banco principal (ou para a view compacta)
+        conn.executemany(
+            "INSERT INTO main.tb_folha_pagamento (matricula, competencia, vencimentos, descontos, liquido) VALUES (?, ?, ?, ?, ?)",
+            _tuplas(folha_nova, COLUNAS_FOLHA),
+        )
+
+        # Linhas alteradas são atualizadas onde estão gravadas: view compacta, arquivo anual ou banco principal
+        if compacto:
+            conn.executemany(
+                "INSERT OR REPLACE INTO main.tb_folha_pagamento (matricula, competencia, vencimentos, descontos, liquido) "
+                "VALUES (?, ?, ?, ?, ?)",
+                _tuplas(folha_alterada, COLUNAS_FOLHA),
+            )
+            folha_atualizada = len(folha_alterada)
+        else:
+            # Em um ano já particionado, a linha pode estar no arquivo anual ou ainda na tabela de carga do banco
+            # principal (inserida depois do particionamento): o UPDATE vai aos dois e só um deles a encontra
+            folha_atualizada = 0
+            for ano, linhas in folha_alterada.groupby(folha_alterada["competencia"].str[:4]):
+                for esquema in ([f"p_{ano}", "main"] if ano in catalogo else ["main"]):
+                    cursor = conn.executemany(
+                        f"UPDATE {esquema}.tb_folha_pagamento SET vencimentos = ?, descontos = ?, liquido = ? "
+                        "WHERE matricula = ? AND competencia = ?",
+                        _tuplas(linhas, ["vencimentos", "descontos", "liquido", "matricula", "competencia"]),
+                    )
+                    folha_atualizada += cursor.rowcount
+
+    # Competências afetadas: as das linhas gravadas e, se o órgão ou cargo de um servidor mudou, todo o seu histórico
+    afetadas = set(folha_nova["competencia"]) | set(folha_alterada["competencia"])
+    if len(servidores_alterados):
+        atuais = servidores_atuais.set_index("matricula").loc[servidores_alterados["matricula"], ["orgao", "cargo"]]
+        mudaram = servidores_alterados.set_index("matricula")[["orgao", "cargo"]].ne(atuais).any(axis=1)
+        afetadas |= {c for (c,) in conn.execute(
+            "SELECT DISTINCT CAST(competencia AS TEXT) FROM tb_folha_pagamento WHERE matricula IN (SELECT value FROM json_each(?))",
+            (json.dumps(mudaram[mudaram].index.tolist()),),
+        )}
+
+    if afetadas:
+        atualiza_dados_derivados(conn, sorted(afetadas))
+
+    # Atualiza as estatísticas apenas se o volume alterado justificar (mais barato que ANALYZE completo)
+    conn.execute("PRAGMA optimize")
+    conn.commit()
+
+    contagens = {
+        "servidores": {"inseridos": len(servidores_novos), "atualizados": len(servidores_alterados), "inalterados": servidores_iguais},
+        "folha": {"inseridos": len(folha_nova), "atualizados": folha_atualizada, "inalterados": folha_igual},
+    }
+    for tabela, c in contagens.items():
+        print(f"{tabela}: {c['inseridos']} inserido(s), {c['atualizados']} atualizado(s), {c['inalterados']} inalterado(s).")
+
+    return contagens
+
+# Coluna como texto; números (competência lida da planilha, por exemplo) passam por inteiro, sem o '.0'
+def _como_texto(serie):
+    if pd.api.types.is_numeric_dtype(serie):
+        serie = serie.astype("Int64")
+    return serie.astype("string")
+
+# Ajusta os tipos de um lote lido do arquivo: matrícula, CPF e competência como texto (a planilha
+# devolve a competência como número) e valores como float
+def _normaliza_lote(df):
+    ausentes = [c for c in COLUNAS_SERVIDORES + COLUNAS_FOLHA if c not in df.columns]
+    if ausentes:
+        raise ValueError(f"Coluna(s) ausente(s) no arquivo de carga: {', '.join(dict.fromkeys(ausentes))}.")
+    for coluna in ("matricula", "cpf", "competencia"):
+        df[coluna] = _como_texto(df[coluna])
+    for coluna in ("vencimentos", "descontos", "liquido"):
+        df[coluna] = pd.to_numeric(df[coluna])
+    return df
+
+# Lê o arquivo de carga (CSV ou XLSX) em lotes de 'tamanho_lote' linhas, sem carregá-lo inteiro na memória.
+# A planilha é lida em modo somente leitura do openpyxl (linha a linha), a partir da primeira aba
+def le_lotes(arquivo, tamanho_lote=TAMANHO_LOTE_CARGA):
+
+    if str(arquivo).lower().endswith((".xlsx", ".xlsm")):
+        from openpyxl import load_workbook
+
+        livro = load_workbook(arquivo, read_only=True, data_only=True)
+        try:
+            linhas = livro.worksheets[0].iter_rows(values_only=True)
+            cabecalho = [str(c) for c in next(linhas)]
+            lote = []
+            inicio = 0
+
+            # O índice segue contínuo entre os lotes, como no CSV (posição da linha no arquivo)
+            for linha in linhas:
+                lote.append(linha)
+                if len(lote) == tamanho_lote:
+                    yield _normaliza_lote(pd.DataFrame(lote, columns=cabecalho, index=range(inicio, inicio + len(lote))))
+                    inicio += len(lote)
+                    lote = []
+            if lote:
+                yield _normaliza_lote(pd.DataFrame(lote, columns=cabecalho, index=range(inicio, inicio + len(lote))))
+        finally:
+            livro.close()
+        return
+
+    for lote in pd.read_csv(arquivo, chunksize=tamanho_lote, dtype={"matricula": str, "cpf": str, "competencia": str}):
+        yield _normaliza_lote(lote)
+
+# Formatos aceitos na validação da carga: CPF com ou sem pontuação e competência AAAAMM com mês válido
+_CPF_VALIDO = r"\d{3}\.?\d{3}\.?\d{3}-?\d{2}"
+_COMPETENCIA_VALIDA = r"\d{4}(?:0[1-9]|1[0-2])"
+
+# Diferença máxima aceita entre o líquido e vencimentos - descontos (meio centavo)
+TOLERANCIA_LIQUIDO = 0.005
+
+# Valida um lote coluna a coluna, sem laços por linha: cada motivo de recusa é uma máscara booleana
+# sobre o lote inteiro. Retorna um DataFrame de máscaras (uma coluna por motivo) com o índice do lote
+def valida_lote(lote):
+    matricula = _como_texto(lote["matricula"]).str.strip()
+    valores = {c: pd.to_numeric(lote[c], errors="coerce").to_numpy(dtype=float) for c in ("vencimentos", "descontos", "liquido")}
+
+    # Valores ausentes também contam como líquido divergente (a comparação com NaN é falsa)
+    diferenca = np.abs(valores["liquido"] - (valores["vencimentos"] - valores["descontos"]))
+
+    return pd.DataFrame(
+        {
+            "matricula_ausente": matricula.fillna("").eq("").to_numpy(dtype=bool),
+            "cpf_invalido": ~_como_texto(lote["cpf"]).str.fullmatch(_CPF_VALIDO).fillna(False).to_numpy(dtype=bool),
+            "competencia_invalida": ~_como_texto(lote["competencia"]).str.fullmatch(_COMPETENCIA_VALIDA).fillna(False).to_numpy(dtype=bool),
+            "liquido_divergente": ~(diferenca <= TOLERANCIA_LIQUIDO),
+        },
+        index=lote.index,
+    )
+
+# Separa as linhas válidas de cada lote da carga e grava as recusadas, com os motivos, em um CSV de
+# quarentena. Também recusa chaves (matricula, competencia) repetidas no lote ou em lotes anteriores da
+# mesma carga (vale a primeira ocorrência); as chaves aceitas ficam em um vetor ordenado de hashes de 64 bits.
+# relatorio() imprime o resumo e o grava em JSON ao lado da quarentena
+class Quarentena:
+    """Valida os lotes da carga e guarda as linhas recusadas em quarentena."""
+
+    def __init__(self, destino=QUARENTENA_DIR):
+        self.arquivo = os.path.join(destino, f"carga-{datetime.now():%Y%m%dT%H%M%S%f}.csv")
+        self.linhas = 0
+        self.rejeitadas = 0
+        self.motivos = {}
+        self._chaves = np.empty(0, dtype=np.uint64)
+
+    # Devolve as linhas válidas do lote; 'origem' identifica o arquivo de carga na quarentena
+    def filtra(self, lote, origem):
+        motivos = valida_lote(lote)
+
+        # Repetições de chave só entre as linhas que passaram nas demais verificações
+        candidatas = np.flatnonzero(~motivos.to_numpy().any(axis=1))
+        chaves = pd.util.hash_pandas_object(
+            pd.DataFrame({c: _como_texto(lote[c].iloc[candidatas]) for c in ("matricula", "competencia")}), index=False
+        ).to_numpy()
+
+        # Com as chaves do lote ordenadas (de forma estável, a primeira ocorrência vem antes), as repetidas no
+        # lote são vizinhas iguais e a busca binária nas já aceitas percorre o vetor em sequência
+        ordem = np.argsort(chaves, kind="stable")
+        ordenadas = chaves[ordem]
+        repetidas_ordenadas = np.zeros(len(ordenadas), dtype=bool)
+        repetidas_ordenadas[1:] = ordenadas[1:] == ordenadas[:-1]
+        if len(self._chaves):
+            posicoes = np.minimum(np.searchsorted(self._chaves, ordenadas), len(self._chaves) - 1)
+            repetidas_ordenadas |= self._chaves[posicoes] == ordenadas
+        repetidas = np.empty(len(chaves), dtype=bool)
+        repetidas[ordem] = repetidas_ordenadas
+        duplicada = np.zeros(len(lote), dtype=bool)
+        duplicada[candidatas] = repetidas
+        motivos["chave_duplicada"] = duplicada
+
+        # As chaves aceitas entram no vetor ordenado; a ordenação estável apenas intercala as duas sequências já ordenadas
+        self._chaves = np.sort(np.concatenate([self._chaves, ordenadas[~repetidas_ordenadas]]), kind="stable")
+
+        recusadas = motivos.to_numpy().any(axis=1)
+        self.linhas += len(lote)
+        self.rejeitadas += int(recusadas.sum())
+        for motivo, quantidade in motivos.sum().items():
+            if quantidade:
+                self.motivos[motivo] = self.motivos.get(motivo, 0) + int(quantidade)
+
+        if recusadas.any():
+            self._grava(lote[recusadas], motivos[recusadas], origem)
+        return lote[~recusadas]
+
+    # Acrescenta as linhas recusadas ao CSV de quarentena, com o arquivo e a linha de origem (o cabeçalho é a linha 1)
+    def _grava(self, recusadas, motivos, origem):
+        os.makedirs(os.path.dirname(self.arquivo) or ".", exist_ok=True)
+        saida = recusadas.copy()
+        saida.insert(0, "linha", recusadas.index + 2)
+        saida.insert(0, "arquivo", str(origem))
+        saida["motivos"] = motivos.dot(motivos.columns + ";").str.rstrip(";")
+        saida.to_csv(self.arquivo, mode="a", header=not os.path.exists(self.arquivo), index=False)
+
+    # Resumo da validação; com linhas recusadas, também é gravado em '<quarentena>.json'
+    def relatorio(self):
+        resumo = {
+            "linhas": self.linhas,
+            "validas": self.linhas - self.rejeitadas,
+            "rejeitadas": self.rejeitadas,
+            "motivos": self.motivos,
+            "quarentena": self.arquivo if self.rejeitadas else None,
+        }
+        if self.rejeitadas:
+            with open(os.path.splitext(self.arquivo)[0] + ".json", "w", encoding="utf-8") as f:
+                json.dump(resumo, f, ensure_ascii=False, indent=2)
+            detalhes = ", ".join(f"{motivo}: {quantidade:,}" for motivo, quantidade in self.motivos.items())
+            print(f"Validação: {self.rejeitadas:,} de {self.linhas:,} linha(s) em quarentena em '{self.arquivo}' ({detalhes}).")
+        else:
+            print(f"Validação: todas as {self.linhas:,} linha(s) aceitas.")
+        return resumo
+
+# Grava de uma vez os servidores de um lote que ainda não existem, resolvendo órgão e cargo nas dimensões.
+# Equivale a inserir pela view tb_servidores, mas com um único INSERT ... SELECT a partir de uma tabela
+# temporária: o gatilho da view, executado linha a linha, descarrega o índice de texto a cada servidor
+def _insere_servidores_lote(conn, servidores):
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS tmp_servidores_lote (nome, cpf, matricula, orgao, cargo)")
+    conn.execute("DELETE FROM temp.tmp_servidores_lote")
+    conn.executemany("INSERT INTO temp.tmp_servidores_lote VALUES (?, ?, ?, ?, ?)", _tuplas(servidores, COLUNAS_SERVIDORES))
+
+    conn.execute("INSERT OR IGNORE INTO tb_orgaos (nome) SELECT DISTINCT orgao FROM temp.tmp_servidores_lote WHERE orgao IS NOT NULL")
+    conn.execute("INSERT OR IGNORE INTO tb_cargos (nome) SELECT DISTINCT cargo FROM temp.tmp_servidores_lote WHERE cargo IS NOT NULL")
+    conn.execute("""
+        INSERT OR IGNORE INTO tb_servidores_base (nome, cpf, matricula, orgao_id, cargo_id)
+        SELECT s.nome, s.cpf, s.matricula, tb_orgaos.id, tb_cargos.id
+        FROM temp.tmp_servidores_lote s
+        LEFT JOIN tb_orgaos ON tb_orgaos.nome = s.orgao
+        LEFT JOIN tb_cargos ON tb_cargos.nome = s.cargo
+    """)
+
+# Grava um lote já normalizado (servidores novos e linhas de folha) em uma transação
+def _grava_lote(conn, lote):
+    with conn:
+        _insere_servidores_lote(conn, lote[COLUNAS_SERVIDORES].drop_duplicates("matricula"))
+        conn.executemany(
+            "INSERT INTO tb_folha_pagamento (matricula, competencia, vencimentos, descontos, liquido) VALUES (?, ?, ?, ?, ?)",
+            _tuplas(lote, COLUNAS_FOLHA),
+        )
+
+# Conclui uma carga em lotes: recalcula os dados derivados das competências carregadas e as estatísticas
+def _finaliza_carga(conn, competencias):
+    conn.execute("DROP TABLE IF EXISTS temp.tmp_servidores_lote")
+
+    # Em bancos particionados, enxerga o histórico dos arquivos anuais junto com a carga nova
+    anexa_particoes(conn)
+
+    # Mantém os agregados atualizados para as competências carregadas
+    atualiza_dados_derivados(conn, sorted(competencias))
+
+    # Atualiza as estatísticas do otimizador com os dados carregados
+    conn.execute("ANALYZE")
+    conn.commit()
+
+# Carga em lotes para arquivos grandes: cada lote é gravado com executemany em sua própria transação,
+# com memória constante qualquer que seja o tamanho do arquivo. Servidores repetidos entre lotes são
+# descartados pela matrícula única do banco (INSERT OR IGNORE), sem manter o conjunto em memória.
+# Os dados derivados são recalculados ao final, para as competências carregadas. As linhas que não passam
+# na validação vão para a quarentena. Retorna as linhas gravadas
+def carga_em_lotes(conn, arquivo=CSV_FILE, tamanho_lote=TAMANHO_LOTE_CARGA, quarentena=None):
+
+    print(f"Carga em lotes de {tamanho_lote:,} linhas do arquivo '{arquivo}'...")
+
+    quarentena = quarentena if quarentena is not None else Quarentena()
+    competencias = set()
+    total = 0
+
+    for numero, lote in enumerate(le_lotes(arquivo, tamanho_lote), start=1):
+        lote = quarentena.filtra(lote, arquivo)
+        _grava_lote(conn, lote)
+        competencias.update(lote["competencia"].dropna())
+        total += len(lote)
+        print(f"Lote {numero}: {total:,} linha(s) gravada(s).")
+
+    _finaliza_carga(conn, competencias)
+    print(f"Arquivo '{arquivo}' carregado: {total:,} linha(s) de folha.")
+    quarentena.relatorio()
+
+    return total
+
+# Arquivos de carga (CSV e XLSX) de um diretório ou de um padrão glob, em ordem de nome
+def arquivos_carga(origem):
+    if os.path.isdir(origem):
+        return sorted(str(p) for p in Path(origem).iterdir() if p.suffix.lower() in (".csv", ".xlsx", ".xlsm"))
+    return sorted(glob.glob(origem))
+
+# Envia um item ao gravador pela fila limitada, tentando de novo enquanto ela estiver cheia. Retorna False
+# se o gravador pediu a parada (falhou e não vai mais consumir a fila)
+def _envia_lote(fila, item, parar):
+    import queue
+
+    while not parar.is_set():
+        try:
+            fila.put(item, timeout=0.5)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+# Executado nos processos do pool: lê, converte e valida um arquivo, enviando cada lote ao gravador pela
+# fila limitada (a fila cheia pausa a leitura). Termina com ("fim", arquivo, linhas) ou ("erro", arquivo, mensagem),
+# ou em silêncio se o gravador sinalizou 'parar'
+def _prepara_arquivo(arquivo, tamanho_lote, fila, parar):
+    linhas = 0
+    try:
+        for lote in le_lotes(arquivo, tamanho_lote):
+            if not _envia_lote(fila, ("lote", arquivo, lote), parar):
+                return
+            linhas += len(lote)
+    except Exception as e:
+        _envia_lote(fila, ("erro", arquivo, f"{type(e).__name__}: {e}"), parar)
+        return
+    _envia_lote(fila, ("fim", arquivo, linhas), parar)
+
+# Carga paralela de vários arquivos (um por competência ou por órgão, por exemplo): a leitura e a conversão de
+# tipos rodam em um pool de processos, e um único gravador (esta conexão) valida e grava os lotes de uma
+# fila limitada. Arquivos com erro são informados e não interrompem os demais (os lotes já gravados de um
+# arquivo que falha no meio permanecem). Retorna as linhas gravadas por arquivo, os erros e o resumo da quarentena
+def carga_paralela(conn, arquivos, tamanho_lote=TAMANHO_LOTE_CARGA, processos=None, tamanho_fila=None, quarentena=None):
+
+    import multiprocessing
+    import queue
+    from concurrent.futures import ProcessPoolExecutor
+
+    processos = max(1, min(processos or os.cpu_count() or 1, len(arquivos)))
+    print(f"Carga paralela de {len(arquivos)} arquivo(s) com {processos} processo(s)...")
+
+    quarentena = quarentena if quarentena is not None else Quarentena()
+    linhas = {}
+    erros = {}
+    competencias = set()
+
+    with multiprocessing.Manager() as gerente, ProcessPoolExecutor(max_workers=processos) as pool:
+
+        # Fila limitada: no máximo dois lotes em espera por processo leitor. 'parar' libera os leitores
+        # bloqueados na fila cheia quando o gravador falha
+        fila = gerente.Queue(maxsize=tamanho_fila or 2 * processos)
+        parar = gerente.Event()
+        tarefas = [pool.submit(_prepara_arquivo, arquivo, tamanho_lote, fila, parar) for arquivo in arquivos]
+
+        try:
+
+            # O gravador consome os lotes na ordem de chegada até todos os arquivos terminarem
+            pendentes = len(arquivos)
+            while pendentes:
+                try:
+                    tipo, arquivo, dados = fila.get(timeout=1)
+                except queue.Empty:
+
+                    # Um processo que morreu sem avisar deixaria o gravador esperando para sempre
+                    for tarefa in tarefas:
+                        if tarefa.done() and tarefa.exception():
+                            raise tarefa.exception()
+                    continue
+
+                # A validação fica no gravador, que enxerga as chaves repetidas entre arquivos
+                if tipo == "lote":
+                    dados = quarentena.filtra(dados, arquivo)
+                    _grava_lote(conn, dados)
+                    competencias.update(dados["competencia"].dropna())
+                    linhas[arquivo] = linhas.get(arquivo, 0) + len(dados)
+                elif tipo == "fim":
+                    pendentes -= 1
+                    print(f"Arquivo '{arquivo}' carregado: {dados:,} linha(s).")
+                else:
+                    pendentes -= 1
+                    erros[arquivo] = dados
+                    print(f"Erro ao carregar '{arquivo}': {dados}")
+
+        # Falha do gravador (validação, disco cheio, banco travado...): sem quem consuma a fila, os leitores
+        # ficariam presos no put e o encerramento do pool esperaria por eles para sempre
+        except BaseException:
+            parar.set()
+            while True:
+                try:
+                    fila.get_nowait()
+                except queue.Empty:
+                    break
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise
+
+    _finaliza_carga(conn, competencias)
+    print(f"Carga paralela concluída: {sum(linhas.values()):,} linha(s) de {len(arquivos) - len(erros)} arquivo(s).")
+
+    return {"linhas": linhas, "erros": erros, "quarentena": quarentena.relatorio()}
+
+# Carga rápida (bulk) de um banco novo: monta o banco em um arquivo temporário sem journal e sem fsync,
+# grava em lotes grandes com executemany e só depois cria os índices secundários e o índice de texto,
+# recalcula os dados derivados e as estatísticas. O resultado é compactado com VACUUM INTO e gravado
+# no lugar de db_file com uma troca atômica (os.replace): quem abre db_file nunca vê um banco pela metade.
+# Em main(), db_file é o banco de trabalho, que só passa aos leitores quando publica_snapshot troca o ponteiro
+# Retorna linhas carregadas, segundos, linhas por segundo e o resumo da quarentena
+def carga_rapida(db_file=DB_FILE, arquivo=CSV_FILE, sql_file=SQL_FILE, tamanho_lote=TAMANHO_LOTE_CARGA, quarentena=None):
+
+    import time
+
+    inicio = time.perf_counter()
+    print(f"Carga rápida do arquivo '{arquivo}' para '{db_file}'...")
+
+    # Arquivos de trabalho no mesmo diretório do destino, para que a troca final seja atômica
+    temporario = f"{db_file}.carga-{os.getpid()}"
+    compactado = f"{temporario}.vacuum"
+    for caminho in (temporario, compactado):
+        if os.path.exists(caminho):
+            os.remove(caminho)
+
+    conn = sqlite3.connect(temporario)
+    try:
+
+        # Sem journal nem fsync: uma falha no meio apenas descarta o arquivo temporário
+        conn.execute("PRAGMA journal_mode = OFF")
+        conn.execute("PRAGMA synchronous = OFF")
+        conn.execute("PRAGMA locking_mode = EXCLUSIVE")
+        conn.execute("PRAGMA temp_store = MEMORY")
+        conn.execute("PRAGMA cache_size = -262144")
+
+        with open(sql_file, "r", encoding="utf-8") as f:
+            conn.executescript(f.read())
+        migra_schema(conn)
+
+        # Adia os índices secundários e a sincronização linha a linha do índice de texto para depois da carga
+        indices = conn.execute("""
+            SELECT name, sql FROM sqlite_master
+            WHERE type = 'index' AND sql IS NOT NULL AND tbl_name IN ('tb_folha_pagamento', 'tb_servidores_base')
+        """).fetchall()
+        gatilho_busca = conn.execute(
+            "SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = 'trg_busca_servidores_insere'"
+        ).fetchone()
+        for nome, _ in indices:
+            conn.execute(f"DROP INDEX {nome}")
+        if gatilho_busca:
+            conn.execute("DROP TRIGGER trg_busca_servidores_insere")
+
+        # Grava os lotes válidos do arquivo; os demais vão para a quarentena
+        quarentena = quarentena if quarentena is not None else Quarentena()
+        total = 0
+        competencias = set()
+        for lote in le_lotes(arquivo, tamanho_lote):
+            lote = quarentena.filtra(lote, arquivo)
+            _grava_lote(conn, lote)
+            competencias.update(lote["competencia"].dropna())
+            total += len(lote)
+        carregado = time.perf_counter()
+        print(f"{total:,} linha(s) gravada(s) em {carregado - inicio:.1f}s; criando índices...")
+
+        # Recria os índices e preenche o índice de texto de uma vez
+        with conn:
+            for _, sql in indices:
+                conn.execute(sql)
+            if gatilho_busca:
+                conn.execute("""
+                    INSERT INTO tb_busca_servidores (rowid, matricula, nome, orgao, cargo)
+                    SELECT id, matricula, nome, orgao, cargo FROM tb_servidores
+                """)
+                conn.execute(gatilho_busca[0])
+
+        # Dados derivados e estatísticas sobre o banco já indexado
+        _finaliza_carga(conn, competencias)
+
+        # Compacta em um arquivo novo (páginas contíguas, sem espaço livre), que substitui db_file com troca atômica
+        conn.execute("VACUUM INTO ?", (compactado,))
+    except BaseException:
+        if os.path.exists(compactado):
+            os.remove(compactado)
+        raise
+    finally:
+        conn.close()
+        os.remove(temporario)
+
+    os.replace(compactado, db_file)
+
+    # Os arquivos anuais pertenciam ao banco substituído
+    for particao in arquivos_particoes(db_file):
+        os.remove(particao)
+
+    segundos = time.perf_counter() - inicio
+    taxa = total / segundos if segundos else 0.0
+    print(f"Banco '{db_file}' montado: {total:,} linha(s) em {segundos:.1f}s ({taxa:,.0f} linhas/s).")
+
+    return {"linhas": total, "segundos": segundos, "linhas_por_segundo": taxa, "quarentena": quarentena.relatorio()}
+
+
+# Exporta tb_folha_pagamento como dataset Parquet particionado por ano e competência,
+# com órgão e cargo do servidor desnormalizados e codificados em dicionário
+def exporta_folha_particionada(conn, destino=PARQUET_DIR, tamanho_lote=500_000):
+
+    import shutil
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    # Colunas expostas às consultas dos agentes; órgão, cargo e ano ficam disponíveis para análises
+    colunas_sql = [c[1] for c in conn.execute("PRAGMA table_info(tb_folha_pagamento)")]
+    schema = pa.schema(
+        [
+            ("id", pa.int64()),
+            ("matricula", pa.string()),
+            ("vencimentos", pa.float64()),
+            ("descontos", pa.float64()),
+            ("liquido", pa.float64()),
+            ("orgao", pa.dictionary(pa.int32(), pa.string())),
+            ("cargo", pa.dictionary(pa.int32(), pa.string())),
+            ("ano", pa.string()),
+            ("competencia", pa.string()),
+        ],
+        metadata={"colunas": json.dumps(colunas_sql)},
+    )
+
+    # Grava em diretório temporário e troca ao final
+    final = os.path.join(destino, "tb_folha_pagamento")
+    temporario = final + ".tmp"
+    shutil.rmtree(temporario, ignore_errors=True)
+    particionamento = ds.partitioning(pa.schema([("ano", pa.string()), ("competencia", pa.string())]), flavor="hive")
+
+    # Lê a folha já unida ao servidor, em lotes; cada lote é gravado nesta mesma thread,
+    # pois a conexão SQLite não pode ser usada pelas threads de escrita do pyarrow
+    cursor = conn.execute("""
+        SELECT f.id, f.matricula, f.vencimentos, f.descontos, f.liquido, s.orgao, s.cargo,
+               substr(f.competencia, 1, 4) AS ano, CAST(f.competencia AS TEXT) AS competencia
+        FROM tb_folha_pagamento f
+        LEFT JOIN tb_servidores s ON s.matricula = f.matricula
+        ORDER BY f.competencia, f.id, f.matricula
+    """)
+    numero_lote = 0
+    while True:
+        linhas = cursor.fetchmany(tamanho_lote)
+        if not linhas:
+            break
+        colunas = list(zip(*linhas))
+        lote = pa.Table.from_arrays(
+            [pa.array(valores).cast(campo.type) for valores, campo in zip(colunas, schema)],
+            schema=schema,
+        )
+        ds.write_dataset(
+            lote,
+            temporario,
+            format="parquet",
+            partitioning=particionamento,
+            basename_template=f"parte-{numero_lote}-{{i}}.parquet",
+            existing_data_behavior="overwrite_or_ignore",
+        )
+        numero_lote += 1
+
+    antigo = final + ".old"
+    if os.path.exists(final):
+        os.replace(final, antigo)
+    os.replace(temporario, final)
+    shutil.rmtree(antigo, ignore_errors=True)
+
+# Tabelas e views visíveis aos agentes, exportadas em Parquet (a folha compacta e os servidores saem pelas
+# views de compatibilidade; o índice de texto e suas tabelas internas ficam de fora)
+def tabelas_exportadas(conn):
+    return [t for (t,) in conn.execute("""
+        SELECT name FROM main.sqlite_master
+        WHERE type IN ('table', 'view') AND name LIKE 'tb_%' AND name NOT IN ('tb_particoes_folha', 'tb_folha_compacta', 'tb_servidores_base')
+          AND name NOT LIKE 'tb_busca_servidores%'
+        ORDER BY name
+    """)]
+
+# Grava uma tabela em um arquivo Parquet, lendo-a em lotes para manter a memória constante.
+# Grava em arquivo temporário e troca ao final, para que leitores nunca vejam um arquivo pela metade
+def _exporta_tabela_parquet(conn, tabela, arquivo, tamanho_lote=500_000):
+
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    temporario = arquivo + ".tmp"
+    writer = None
+    for lote in pd.read_sql_query(f'SELECT * FROM "{tabela}"', conn, chunksize=tamanho_lote):
+        tabela_arrow = pa.Table.from_pandas(lote, preserve_index=False)
+        if writer is None:
+            writer = pq.ParquetWriter(temporario, tabela_arrow.schema)
+        writer.write_table(tabela_arrow.cast(writer.schema))
+
+    # Tabela vazia: nenhum arquivo é gravado
+    if writer is None:
+        return
+    writer.close()
+    os.replace(temporario, arquivo)
+
+# Exporta as tabelas do banco para Parquet: a folha como dataset particionado
+# ('<destino>/tb_folha_pagamento/ano=AAAA/competencia=AAAAMM/') e as demais como '<destino>/<tabela>.parquet'.
+# Com um manifesto, as tabelas cujo conteúdo (hash) não mudou desde a última exportação são puladas.
+# Retorna as tabelas exportadas
+def exporta_parquet(conn, destino=PARQUET_DIR, tamanho_lote=500_000, manifesto=None):
+
+    os.makedirs(destino, exist_ok=True)
+    tabelas = tabelas_exportadas(conn)
+
+    # Hashes do conteúdo atual de cada tabela, guardados no manifesto
+    versoes = {}
+    if manifesto is not None:
+        versoes = {tabela: hash_tabela(conn, tabela, tamanho_lote) for tabela in tabelas}
+        manifesto["tabelas"] = versoes
+
+    exportadas = []
+    for tabela in tabelas:
+
+        # A folha exportada leva órgão e cargo do servidor: muda também quando os servidores mudam
+        if tabela == "tb_folha_pagamento":
+            alvo = os.path.join(destino, "tb_folha_pagamento")
+            versao = f"{versoes.get(tabela)}+{versoes.get('tb_servidores')}"
+            grava = lambda _: exporta_folha_particionada(conn, destino, tamanho_lote)
+        else:
+            alvo = os.path.join(destino, f"{tabela}.parquet")
+            versao = versoes.get(tabela)
+            grava = lambda arquivo, tabela=tabela: _exporta_tabela_parquet(conn, tabela, arquivo, tamanho_lote)
+        if exporta_se_alterada(manifesto, alvo, versao, grava):
+            exportadas.append(tabela)
+
+    print(f"{len(exportadas)} de {len(tabelas)} tabela(s) exportada(s) em Parquet para '{destino}'.")
+    return exportadas
+
+# Abre o banco em 'caminho' somente para leitura, com os arquivos anuais anexados (exportações após a publicação)
+def _conexao_leitura(caminho):
+    conn = sqlite3.connect(Path(caminho).resolve().as_uri() + "?mode=ro", uri=True)
+    anexa_particoes(conn, somente_leitura=True)
+    return conn
+
+# Grava as linhas do cursor em uma planilha XLSX no modo write-only do openpyxl (linhas vão direto para o
+# arquivo, com memória constante)
+def _grava_xlsx(cursor, colunas, arquivo, tamanho_lote):
+    from openpyxl import Workbook
+
+    livro = Workbook(write_only=True)
+    aba = livro.create_sheet()
+    aba.append(colunas)
+    while linhas := cursor.fetchmany(tamanho_lote):
+        for linha in linhas:
+            aba.append(linha)
+    livro.save(arquivo)
+
+# Grava as linhas do cursor em CSV separado por ';', lote a lote
+def _grava_csv(cursor, colunas, arquivo, tamanho_lote):
+    import csv
+
+    with open(arquivo, "w", newline="", encoding="utf-8") as f:
+        # Fim de linha '\n', como o to_csv do pandas usado antes (o padrão do csv.writer é '\r\n')
+        escritor = csv.writer(f, delimiter=";", lineterminator="\n")
+        escritor.writerow(colunas)
+        while linhas := cursor.fetchmany(tamanho_lote):
+            escritor.writerows(linhas)
+
+# Executado nos processos do pool: exporta uma planilha em um formato a partir de uma conexão somente leitura
+# própria. Pula a gravação se os dados (hash da consulta) e o arquivo são os registrados em 'anterior'.
+# Grava em arquivo temporário e troca ao final. Retorna (arquivo, hash dos dados, hash do arquivo ou None se pulada)
+def _exporta_planilha(banco, nome, formato, destino, anterior, tamanho_lote):
+    arquivo = os.path.normpath(os.path.join(destino, f"{nome}.{formato}"))
+    consulta = PLANILHAS_EXPORTACAO[nome]
+    conn = _conexao_leitura(banco)
+    try:
+        versao = hash_dados(pd.read_sql_query(consulta, conn, chunksize=tamanho_lote))
+        if saida_inalterada(anterior, arquivo, versao):
+            return arquivo, versao, None
+
+        cursor = conn.execute(consulta)
+        colunas = [d[0] for d in cursor.description]
+        temporario = f"{arquivo}.tmp-{os.getpid()}"
+        try:
+            (_grava_xlsx if formato == "xlsx" else _grava_csv)(cursor, colunas, temporario, tamanho_lote)
+            os.replace(temporario, arquivo)
+        finally:
+            if os.path.exists(temporario):
+                os.remove(temporario)
+        return arquivo, versao, hash_arquivo(arquivo)
+    finally:
+        conn.close()
+
+# Exporta as planilhas (PLANILHAS_EXPORTACAO) do banco em 'banco' nos formatos pedidos, lendo do SQLite em
+# lotes (memória constante) e gravando cada arquivo em um processo do pool. Com manifesto, as saídas cujos
+# dados não mudaram são puladas e as gravadas são registradas. Retorna {arquivo: True se gravado}
+def exporta_planilhas(banco, formatos=FORMATOS_EXPORTACAO, destino=".", manifesto=None, processos=None, tamanho_lote=TAMANHO_LOTE_CARGA):
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    os.makedirs(destino, exist_ok=True)
+    saidas = (manifesto or {}).get("saidas", {})
+    tarefas = [(nome, formato) for nome in PLANILHAS_EXPORTACAO for formato in formatos]
+    processos = max(1, min(processos or os.cpu_count() or 1, len(tarefas)))
+
+    gravados = {}
+    with ProcessPoolExecutor(max_workers=processos) as pool:
+        futuros = [
+            pool.submit(_exporta_planilha, banco, nome, formato, destino,
+                        saidas.get(os.path.normpath(os.path.join(destino, f"{nome}.{formato}"))), tamanho_lote)
+            for nome, formato in tarefas
+        ]
+        for futuro in futuros:
+            arquivo, versao, hash_gravado = futuro.result()
+            gravados[arquivo] = hash_gravado is not None
+            if hash_gravado is None:
+                print(f"Saída '{arquivo}' inalterada; exportação ignorada.")
+            else:
+                print(f"Planilha '{arquivo}' exportada.")
+                if manifesto is not None:
+                    manifesto.setdefault("saidas", {})[arquivo] = {"dados": versao, "arquivo": hash_gravado}
+
+    return gravados
+
+# Inicia exporta_planilhas em segundo plano e retorna imediatamente um Future (resultado com .result()):
+# o banco já publicado continua consultável enquanto as planilhas são gravadas
+def exporta_planilhas_em_segundo_plano(banco, formatos=FORMATOS_EXPORTACAO, destino=".", manifesto=None, processos=None, tamanho_lote=TAMANHO_LOTE_CARGA):
+
+    from concurrent.futures import ThreadPoolExecutor
+
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="exportacao")
+    futuro = executor.submit(exporta_planilhas, banco, formatos, destino, manifesto, processos, tamanho_lote)
+    executor.shutdown(wait=False)
+    return futuro
+
+# Etapa de exportação sobre o banco já publicado em 'banco': as planilhas pedidas (--xlsx/--csv) são gravadas
+# em segundo plano, em processos do pool, enquanto esta thread exporta o Parquet (--parquet). As saídas
+# inalteradas são puladas pelo manifesto, gravado ao final
+def _etapa_exportacao(banco, args, manifesto):
+    formatos = [formato for formato in FORMATOS_EXPORTACAO if getattr(args, formato)]
+    if not formatos and not args.parquet:
+        return
+
+    planilhas = exporta_planilhas_em_segundo_plano(banco, formatos, manifesto=manifesto, processos=args.processos) if formatos else None
+    if args.parquet:
+        conn = _conexao_leitura(banco)
+        exporta_parquet(conn, manifesto=manifesto)
+        conn.close()
+    if planilhas:
+        planilhas.result()
+
+    grava_manifesto(manifesto, DB_FILE)
 
 # Função principal do script, executa criação e população do banco
 def main():
 
-    # Verifica se o arquivo de banco já existe
-    if os.path.exists(DB_FILE):
-        print(f"Banco de dados '{DB_FILE}' já existe.")
+    # Lê os argumentos da linha de comando
+    parser = argparse.ArgumentParser(description="Cria e popula o banco de dados da Folha de Pagamento.")
+    parser.add_argument("--migrar", action="store_true", help="Apenas aplica as migrações pendentes no banco existente, sem recriá-lo.")
+    parser.add_argument("--particionar", action="store_true", help="Grava a folha em um arquivo SQLite por ano ('<banco>_<ano>.db'), anexados nas conexões.")
+    parser.add_argument("--compacto", action="store_true", help="Grava a folha no layout compacto (competência inteira, centavos, WITHOUT ROWID).")
+    parser.add_argument("--parquet", action="store_true", help=f"Exporta as tabelas em Parquet para '{PARQUET_DIR}' (usado pelo motor DuckDB).")
+    parser.add_argument("--xlsx", action="store_true", help="Exporta as planilhas 'servidores.xlsx' e 'folha.xlsx' após a publicação do banco.")
+    parser.add_argument("--csv", action="store_true", help="Exporta 'servidores.csv' e 'folha.csv' (separados por ';') após a publicação do banco.")
+    parser.add_argument("--arquivo", default=CSV_FILE, help=f"Arquivo de carga, CSV ou XLSX (padrão: '{CSV_FILE}').")
+    parser.add_argument(
+        "--lote", type=int, nargs="?", const=TAMANHO_LOTE_CARGA, metavar="LINHAS",
+        help=f"Carrega o arquivo em lotes de LINHAS linhas (padrão: {TAMANHO_LOTE_CARGA:,}), com memória constante.",
+    )
+    parser.add_argument(
+        "--arquivos", metavar="ORIGEM",
+        help="Diretório ou padrão glob (ex.: 'cargas/*.csv') com vários arquivos de carga, lidos em paralelo.",
+    )
+    parser.add_argument("--processos", type=int, help="Processos de leitura da carga paralela e de gravação das planilhas (padrão: número de CPUs).")
+    parser.add_argument(
+        "--incremental", nargs="?", const=CSV_FILE, metavar="ARQUIVO",
+        help=f"Grava no banco existente apenas as linhas novas ou alteradas do arquivo (padrão: '{CSV_FILE}'), sem recriá-lo.",
+    )
+    parser.add_argument(
+        "--rapido", action="store_true",
+        help="Carga rápida do arquivo: monta o banco em um arquivo temporário (sem journal, índices ao final) "
+             "e o publica como novo snapshot.",
+    )
+    parser.add_argument(
+        "--forcar", action="store_true",
+        help="Recria o banco e as exportações mesmo que o manifesto indique que os arquivos de carga e o schema não mudaram.",
+    )
+    args = parser.parse_args()
 
-    # Chama a função para criar/conectar ao banco de dados e obtém conexão e cursor
-    conn, cursor = cria_database()
+    # A carga rápida lê um único arquivo: combinada com --arquivos, carregaria um arquivo diferente do pedido
+    if args.rapido and args.arquivos:
+        parser.error("--rapido carrega um único arquivo (--arquivo) e não pode ser combinado com --arquivos.")
 
-    # Se a conexão e o cursor foram obtidos com sucesso, popula as tabelas
-    if conn and cursor:
+    # Banco publicado que os leitores estão usando (snapshot atual ou o arquivo fixo) e o manifesto da última carga
+    atual = banco_atual(DB_FILE)
+    manifesto = le_manifesto(DB_FILE)
 
-        # Executa a função
-        popula_tabelas(conn, cursor)
+    # Carga incremental sobre o banco existente: o arquivo não é recriado e o app continua consultando
+    if args.incremental:
+        if not os.path.exists(atual):
+            print(f"Erro: O banco de dados '{DB_FILE}' não existe. Execute 'cria_db.py' sem --incremental primeiro.")
+            return
+        conn = sqlite3.connect(atual)
+        if conn.execute("PRAGMA user_version").fetchone()[0] < VERSAO_SCHEMA:
+            migra_schema(conn)
 
-        # Fecha a conexão após a população das tabelas
+        # A versão do conteúdo passa a incluir o arquivo incremental, se o manifesto ainda descrevia o banco
+        anterior = versao_conteudo(DB_FILE, atual)
+        carga_incremental(conn, args.incremental)
         conn.close()
 
-        # Mensagem informando que a conexão foi fechada
-        print("Conexão com o banco de dados fechada.")
+        # O banco deixa de corresponder às entradas da última carga completa, que não pode mais ser pulada
+        manifesto["entradas"] = None
+        manifesto["conteudo"] = xxhash.xxh3_128(f"{anterior}+{hash_arquivo(args.incremental)}".encode()).hexdigest() if anterior else None
+        registra_banco(manifesto, atual)
+        grava_manifesto(manifesto, DB_FILE)
+        _etapa_exportacao(atual, args, manifesto)
+        return
+
+    # Atualiza o schema do banco existente sem apagar os dados
+    if args.migrar:
+        if not os.path.exists(atual):
+            print(f"Erro: O banco de dados '{DB_FILE}' não existe.")
+            return
+        conn = sqlite3.connect(atual)
+        versao = migra_schema(conn)
+        if args.particionar:
+            particiona_folha(conn)
+        if args.compacto:
+            compacta_folha(conn)
+        conn.close()
+        print(f"Banco de dados '{atual}' na versão {versao} do schema.")
+        return
+
+    # Arquivos efetivamente carregados: os encontrados em --arquivos ou o arquivo único
+    arquivos = arquivos_carga(args.arquivos) if args.arquivos else [args.arquivo]
+    if not arquivos:
+        print(f"Erro: nenhum arquivo de carga encontrado em '{args.arquivos}'.")
+        raise SystemExit(1)
+
+    # Entradas da carga completa: conteúdo desses arquivos, schema e opções que mudam o banco gerado
+    entradas = {
+        "arquivos": {arquivo: hash_arquivo(arquivo) for arquivo in arquivos if os.path.exists(arquivo)},
+        "schema": hash_schema(SQL_FILE),
+        "opcoes": {"particionar": args.particionar, "compacto": args.compacto},
+    }
+
+    # Nada mudou desde a última carga e o banco publicado não foi alterado: mantém o banco e pula as exportações iguais
+    if not args.forcar and manifesto.get("entradas") == entradas and manifesto_valido(manifesto, atual):
+        print(f"Arquivos de carga e schema inalterados desde a última carga; banco '{atual}' mantido.")
+        _etapa_exportacao(atual, args, manifesto)
+        return
+
+    # Verifica se já existe um banco publicado; ele continua atendendo os leitores até a nova publicação
+    if os.path.exists(atual):
+        print(f"Banco de dados '{atual}' já existe; um novo snapshot será publicado ao final da carga.")
+
+    # Novo manifesto: as saídas anteriores continuam registradas para que as exportações iguais sejam puladas
+    manifesto = {"entradas": entradas, "saidas": {} if args.forcar else manifesto.get("saidas", {})}
+
+    # O banco novo é montado em um arquivo de trabalho ao lado do atual e só então publicado como snapshot
+    novo = f"{os.path.splitext(DB_FILE)[0]}.novo-{os.getpid()}.db"
+
+    conn = None
+    try:
+
+        # Carga rápida: o banco de trabalho sai pronto, e as demais opções são aplicadas sobre ele
+        if args.rapido:
+            carga_rapida(novo, args.arquivo, SQL_FILE, args.lote or TAMANHO_LOTE_CARGA)
+            conn = sqlite3.connect(novo)
+        else:
+
+            # Chama a função para criar/conectar ao banco de dados e obtém conexão e cursor
+            conn, cursor = cria_database(novo)
+            if not conn:
+                return
+
+            # Vários arquivos são lidos em paralelo e gravados por esta conexão
+            if args.arquivos:
+                carga_paralela(conn, arquivos, args.lote or TAMANHO_LOTE_CARGA, args.processos)
+
+            # Arquivos grandes (ou planilhas) são lidos em lotes; o CSV de exemplo segue a carga completa
+            elif args.lote or not args.arquivo.lower().endswith(".csv"):
+                carga_em_lotes(conn, args.arquivo, args.lote or TAMANHO_LOTE_CARGA)
+            else:
+                popula_tabelas(conn, cursor, args.arquivo)
+
+        # Move a folha carregada para os arquivos anuais, se solicitado
+        if args.particionar:
+            particiona_folha(conn)
+
+        # Converte a folha para o layout compacto, se solicitado
+        if args.compacto:
+            compacta_folha(conn)
+
+    # Uma carga interrompida descarta o banco de trabalho; o snapshot publicado segue intacto
+    except BaseException:
+        if conn:
+            conn.close()
+        _remove_banco(novo)
+        raise
+
+    # Fecha a conexão após a população das tabelas
+    conn.close()
+
+    # Mensagem informando que a conexão foi fechada
+    print("Conexão com o banco de dados fechada.")
+
+    # Publica o banco novo; os leitores passam a ele na próxima consulta
+    publicado = publica_snapshot(novo, DB_FILE)
+
+    # O conteúdo de uma carga completa é determinado pelas entradas
+    manifesto["conteudo"] = xxhash.xxh3_128(json.dumps(entradas, sort_keys=True).encode()).hexdigest()
+    registra_banco(manifesto, publicado)
+    grava_manifesto(manifesto, DB_FILE)
+
+    # O banco já está publicado e consultável; as exportações pedidas rodam a partir dele
+    _etapa_exportacao(publicado, args, manifesto)
 
 # Verifica se o script está sendo executado diretamente
 if __name__ == "__main__":
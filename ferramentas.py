@@ -0,0 +1,64 @@
+# Projeto 7 - Gerenciamento de Memória e Contexto - Sistema de Multi-Agentes de IA com LangGraph Para Automação da Folha e Consulta a Banco de Dados
+# Módulo de Execução das Chamadas de Ferramenta dos Agentes (nó de ferramentas do grafo, sem dependência do Streamlit)
+
+# Imports
+import asyncio
+
+from consulta_db import obter_pool_consultas
+
+
+# Conteúdo devolvido ao agente quando a ferramenta pedida não existe
+def ferramenta_desconhecida(nome: str) -> str:
+    return f"Erro: ferramenta '{nome}' não existe."
+
+
+# Executa uma chamada e devolve seu conteúdo; exceções e argumentos inválidos viram uma mensagem de erro
+# para o agente, como no ToolNode, em vez de interromper a execução do grafo
+def _conteudo(executa) -> str:
+    try:
+        return executa()
+    except Exception as e:
+        return f"Erro: {e}"
+
+
+# Executa as chamadas de ferramenta de uma mensagem da IA e devolve os conteúdos na ordem das chamadas
+def executa_chamadas(tool_calls: list, ferramentas: dict, paralelas=()) -> list:
+    """
+    'ferramentas' associa o nome de cada ferramenta a um objeto com invoke(args). Quando há mais de
+    uma chamada às ferramentas em 'paralelas' (consultas ao banco, independentes entre si), elas rodam
+    ao mesmo tempo no pool limitado de consultas; uma chamada isolada e as demais ferramentas rodam
+    na própria thread.
+    """
+    indices = [i for i, tc in enumerate(tool_calls) if tc["name"] in paralelas and tc["name"] in ferramentas]
+    futuros = {}
+    if len(indices) > 1:
+        pool = obter_pool_consultas()
+        futuros = {i: pool.submit(ferramentas[tool_calls[i]["name"]].invoke, tool_calls[i]["args"]) for i in indices}
+
+    conteudos = []
+    for i, tc in enumerate(tool_calls):
+        ferramenta = ferramentas.get(tc["name"])
+        if ferramenta is None:
+            conteudos.append(ferramenta_desconhecida(tc["name"]))
+        elif i in futuros:
+            conteudos.append(_conteudo(futuros[i].result))
+        else:
+            conteudos.append(_conteudo(lambda: ferramenta.invoke(tc["args"])))
+    return conteudos
+
+
+# Versão assíncrona: dispara todas as chamadas pela variante ainvoke de cada ferramenta e aguarda na ordem original
+async def executa_chamadas_async(tool_calls: list, ferramentas: dict) -> list:
+    """Equivalente a executa_chamadas para o grafo executado com ainvoke."""
+
+    async def executa(tc):
+        ferramenta = ferramentas.get(tc["name"])
+        if ferramenta is None:
+            return ferramenta_desconhecida(tc["name"])
+        try:
+            return await ferramenta.ainvoke(tc["args"])
+        except Exception as e:
+            return f"Erro: {e}"
+
+    # asyncio.gather devolve os resultados na ordem em que as chamadas foram passadas
+    return list(await asyncio.gather(*(executa(tc) for tc in tool_calls)))
@@ -91,3 +91,21 @@ def app_config():
         "max_tokens": DEFAULT_MAX_TOKENS,
         "max_iterations": MAX_AGENT_ITERATIONS,
     }
+
+
+@pytest.fixture
+def folha_db(tmp_path, monkeypatch):
+    """Cria o banco da Folha de Pagamento com cria_db a partir do CSV de exemplo."""
+    import cria_db
+
+    raiz = Path(__file__).resolve().parent.parent
+    db_path = tmp_path / "folha_pagamento.db"
+
+    # Executa no diretório temporário para que os arquivos exportados não sujem o repositório
+    monkeypatch.chdir(tmp_path)
+
+    conn, cursor = cria_db.cria_database(str(db_path), str(raiz / cria_db.SQL_FILE))
+    cria_db.popula_tabelas(conn, cursor, str(raiz / cria_db.CSV_FILE))
+    conn.close()
+
+    yield str(db_path)
@@ -0,0 +1,691 @@
+"""
+Testes para o módulo de consulta somente leitura ao banco da Folha.
+"""
+
+import asyncio
+import gc
+import os
+import shutil
+import sqlite3
+import threading
+from decimal import Decimal
+from pathlib import Path
+
+import pytest
+
+from consulta_db import (
+    CacheResultados,
+    GerenciadorConexoes,
+    OrcamentoExecucao,
+    avalia_plano,
+    busca_servidores,
+    codifica_resultado,
+    estima_tokens,
+    executa_consulta_folha,
+    executa_consulta_folha_async,
+    expressao_busca,
+    normaliza_sql,
+    resume_resultado,
+)
+
+
+class TestGerenciadorConexoes:
+    """Testes do gerenciador de conexões somente leitura."""
+
+    @pytest.mark.unit
+    @pytest.mark.db
+    def test_reaproveita_conexao_na_mesma_thread(self, folha_db):
+        """Testa se a mesma thread recebe sempre a mesma conexão aquecida."""
+        gerenciador = GerenciadorConexoes(folha_db)
+
+        assert gerenciador.obter_conexao() is gerenciador.obter_conexao()
+        gerenciador.fecha_todas()
+
+    @pytest.mark.unit
+    @pytest.mark.db
+    def test_conexao_por_thread(self, folha_db):
+        """Testa se threads diferentes recebem conexões diferentes."""
+        gerenciador = GerenciadorConexoes(folha_db)
+        principal = gerenciador.obter_conexao()
+        outras = []
+
+        thread = threading.Thread(target=lambda: outras.append(gerenciador.obter_conexao()))
+        thread.start()
+        thread.join()
+
+        assert outras[0] is not principal
+        gerenciador.fecha_todas()
+
+    @pytest.mark.unit
+    @pytest.mark.db
+    def test_fecha_conexoes_de_threads_encerradas(self, folha_db):
+        """Testa se a conexão de uma thread é fechada quando a thread termina."""
+        gerenciador = GerenciadorConexoes(folha_db)
+        conexoes = []
+
+        for _ in range(20):
+            thread = threading.Thread(target=lambda: conexoes.append(gerenciador.obter_conexao()))
+            thread.start()
+            thread.join()
+        gc.collect()
+
+        assert len(gerenciador._conexoes) == 0
+        for conn in conexoes:
+            with pytest.raises(sqlite3.ProgrammingError):
+                conn.execute("SELECT 1")
+        gerenciador.fecha_todas()
+
+    @pytest.mark.unit
+    @pytest.mark.db
+    def test_conexao_somente_leitura_com_pragmas(self, folha_db):
+        """Testa se a conexão é somente leitura e tem os pragmas aplicados."""
+        gerenciador = GerenciadorConexoes(folha_db)
+        conn = gerenciador.obter_conexao()
+
+        assert conn.execute("PRAGMA query_only").fetchone()[0] == 1
+        assert conn.execute("PRAGMA cache_size").fetchone()[0] < 0
+        with pytest.raises(sqlite3.OperationalError):
+            conn.execute("DELETE FROM tb_servidores")
+        gerenciador.fecha_todas()
+
+    @pytest.mark.unit
+    @pytest.mark.db
+    def test_reconecta_quando_arquivo_e_trocado(self, folha_db, tmp_path):
+        """Testa se a conexão é reaberta quando o arquivo do banco é substituído."""
+        gerenciador = GerenciadorConexoes(folha_db)
+        antiga = gerenciador.obter_conexao()
+
+        # Gera uma nova versão do banco e a publica por cima da atual
+        novo = tmp_path / "novo.db"
+        shutil.copy(folha_db, novo)
+        conn = sqlite3.connect(novo)
+        conn.execute("DELETE FROM tb_folha_pagamento")
+        conn.commit()
+        conn.close()
+        os.replace(novo, folha_db)
+
+        nova = gerenciador.obter_conexao()
+
+        assert nova is not antiga
+        assert nova.execute("SELECT COUNT(*) FROM tb_folha_pagamento").fetchone()[0] == 0
+        gerenciador.fecha_todas()
+
+    @pytest.mark.integration
+    @pytest.mark.db
+    def test_passa_ao_snapshot_publicado(self, folha_db, tmp_path):
+        """Testa se o leitor segue o ponteiro e passa ao snapshot novo na consulta seguinte à publicação."""
+        import cria_db
+
+        db_file = str(tmp_path / "folha.db")
+        shutil.copy(folha_db, tmp_path / "novo1.db")
+        cria_db.publica_snapshot(str(tmp_path / "novo1.db"), db_file)
+        gerenciador = GerenciadorConexoes(db_file)
+        cache = CacheResultados()
+        sql = "SELECT COUNT(*) FROM tb_folha_pagamento"
+        antes = executa_consulta_folha(sql, gerenciador, cache)
+
+        # Publica uma versão sem a folha enquanto o leitor mantém a conexão aberta
+        shutil.copy(folha_db, tmp_path / "novo2.db")
+        conn = sqlite3.connect(tmp_path / "novo2.db")
+        conn.execute("DELETE FROM tb_folha_pagamento")
+        conn.commit()
+        conn.close()
+        publicado = cria_db.publica_snapshot(str(tmp_path / "novo2.db"), db_file)
+
+        assert antes == "Resultado: COUNT(*) = 206"
+        assert executa_consulta_folha(sql, gerenciador, cache) == "Resultado: COUNT(*) = 0"
+        assert gerenciador.obter_conexao().execute("PRAGMA database_list").fetchone()[2] == str(Path(publicado).resolve())
+        gerenciador.fecha_todas()
+
+
+class TestExecutaConsultaFolha:
+    """Testes da execução de consultas pela ferramenta dos agentes."""
+
+    @pytest.mark.unit
+    @pytest.mark.db
+    def test_consulta_select(self, folha_db):
+        """Testa uma consulta SELECT simples."""
+        gerenciador = GerenciadorConexoes(folha_db)
+
+        resultado = executa_consulta_folha("SELECT COUNT(*) AS total FROM tb_servidores", gerenciador)
+
+        assert resultado == "Resultado: total = 200"
+        gerenciador.fecha_todas()
+
+    @pytest.mark.unit
+    @pytest.mark.db
+    def test_exibe_limite_e_conta_restantes(self, folha_db, monkeypatch):
+        """Testa se apenas as primeiras linhas são exibidas e o total é contado."""
+        import consulta_db
+
+        monkeypatch.setattr(consulta_db, "RESULT_MAX_ROWS", 15)
+        monkeypatch.setattr(consulta_db, "RESULT_TOKEN_BUDGET", 10_000)
+        gerenciador = GerenciadorConexoes(folha_db)
+
+        resultado = executa_consulta_folha("SELECT * FROM tb_folha_pagamento", gerenciador, CacheResultados(0))
+        linhas = resultado.splitlines()
+
+        omitidos = linhas.index(f"... (mais {206 - consulta_db.RESULT_MAX_ROWS} resultados omitidos)")
+
+        assert linhas[0] == "Resultados da consulta (206 encontrados):"
+        assert omitidos == 2 + consulta_db.RESULT_MAX_ROWS
+        assert linhas[omitidos + 1] == "Resumo de todas as 206 linhas:"
+        gerenciador.fecha_todas()
+
+    @pytest.mark.unit
+    @pytest.mark.db
+    def test_contagem_limitada(self, folha_db, monkeypatch):
+        """Testa se a contagem para no limite configurado e é marcada com '+'."""
+        import consulta_db
+
+        monkeypatch.setattr(consulta_db, "RESULT_COUNT_CAP", 50)
+        monkeypatch.setattr(consulta_db, "RESULT_TOKEN_BUDGET", 10_000)
+        gerenciador = GerenciadorConexoes(folha_db)
+
+        resultado = executa_consulta_folha("SELECT * FROM tb_folha_pagamento", gerenciador, CacheResultados(0))
+
+        assert f"({consulta_db.RESULT_MAX_ROWS + 50}+ encontrados)" in resultado
+        assert "(mais 50+ resultados omitidos)" in resultado
+        gerenciador.fecha_todas()
+
+    @pytest.mark.unit
+    @pytest.mark.db
+    def test_cancela_consulta_acima_do_orcamento(self, folha_db, monkeypatch):
+        """Testa se uma consulta cara é cancelada com orientação e a conexão continua utilizável."""
+        import consulta_db
+
+        monkeypatch.setattr(consulta_db, "DATABASE_MAX_VM_STEPS", 100_000)
+        monkeypatch.setattr(consulta_db, "DATABASE_PROGRESS_INTERVAL", 1000)
+        monkeypatch.setattr(consulta_db, "PLAN_GATE_MODE", "desligado")
+        gerenciador = GerenciadorConexoes(folha_db)
+        sql = "SELECT COUNT(*) FROM tb_folha_pagamento a, tb_folha_pagamento b, tb_folha_pagamento c"
+
+        resultado = executa_consulta_folha(sql, gerenciador, CacheResultados(0))
+
+        assert resultado.startswith("Erro: consulta muito custosa")
+        assert "instruções" in resultado
+        assert "200" in executa_consulta_folha("SELECT COUNT(*) FROM tb_servidores", gerenciador, CacheResultados(0))
+        gerenciador.fecha_todas()
+
+    @pytest.mark.unit
+    @pytest.mark.db
+    def test_orcamento_por_tempo(self, folha_db):
+        """Testa se o limite de tempo de parede interrompe a consulta."""
+        conn = sqlite3.connect(folha_db)
+        sql = "SELECT COUNT(*) FROM tb_folha_pagamento a, tb_folha_pagamento b, tb_folha_pagamento c"
+
+        with pytest.raises(sqlite3.OperationalError):
+            with OrcamentoExecucao(conn, max_segundos=0, max_instrucoes=10**12, intervalo=1000) as orcamento:
+                conn.execute(sql).fetchall()
+
+        assert "segundos" in orcamento.motivo
+        conn.close()
+
+    @pytest.mark.unit
+    def test_rejeita_sql_nao_select(self, folha_db):
+        """Testa se comandos diferentes de SELECT são rejeitados."""
+        gerenciador = GerenciadorConexoes(folha_db)
+
+        resultado = executa_consulta_folha("DELETE FROM tb_servidores", gerenciador)
+
+        assert resultado.startswith("Erro: Esta ferramenta só pode executar consultas SELECT")
+
+    @pytest.mark.unit
+    def test_banco_inexistente(self, tmp_path):
+        """Testa a mensagem de erro quando o banco não existe."""
+        gerenciador = GerenciadorConexoes(str(tmp_path / "inexistente.db"))
+
+        resultado = executa_consulta_folha("SELECT 1", gerenciador)
+
+        assert "não encontrado" in resultado
+
+
+class TestCodificaResultado:
+    """Testes da codificação compacta do resultado entregue ao agente."""
+
+    @pytest.mark.unit
+    def test_escalar_e_chave_valor(self):
+        """Testa as formas escalar e chave/valor, com valores monetários em 2 casas."""
+        assert codifica_resultado(["total_liquido"], [(2793.0,)], "1") == "Resultado: total_liquido = 2793.00"
+        assert codifica_resultado(["nome", "liquido"], [("Servidor 1", 2364.5)], "1") == (
+            "Resultado (1 linha):\nnome: Servidor 1\nliquido: 2364.50"
+        )
+
+    @pytest.mark.unit
+    def test_numeros_nao_monetarios_sem_arredondar(self):
+        """Testa se médias, razões e percentuais não são arredondados para 2 casas."""
+        linhas = [(0.004, Decimal("12.3456"), 0.1 + 0.2, 1234567.5)]
+
+        resultado = codifica_resultado(["razao", "percentual", "media", "AVG(liquido)"], linhas, "1")
+
+        assert resultado.splitlines()[1:] == ["razao: 0.004", "percentual: 12.3456", "media: 0.3", "AVG(liquido): 1234567.50"]
+
+    @pytest.mark.unit
+    def test_tabela_remove_colunas_constantes(self):
+        """Testa se colunas repetidas em todas as linhas saem uma única vez."""
+        linhas = [("Secretaria da Saúde", "Servidor 1", 10.0), ("Secretaria da Saúde", "Servidor, 2", None)]
+
+        resultado = codifica_resultado(["orgao", "nome", "liquido"], linhas, "2")
+
+        assert resultado.splitlines() == [
+            "Resultados da consulta (2 encontrados):",
+            "Valores constantes: orgao=Secretaria da Saúde",
+            "nome,liquido",
+            "Servidor 1,10.00",
+            '"Servidor, 2",',
+        ]
+
+    @pytest.mark.unit
+    def test_orcamento_de_tokens(self):
+        """Testa se as linhas param no orçamento de tokens e as demais são contadas como omitidas."""
+        linhas = [(i, f"texto {i} " + "x" * 40) for i in range(100)]
+
+        resultado = codifica_resultado(["id", "texto"], linhas, "150", omitidos_extra=50, orcamento_tokens=100)
+        exibidas = resultado.splitlines()[2:-1]
+
+        assert 0 < len(exibidas) < 10
+        assert estima_tokens(resultado) <= 100 + 20
+        assert resultado.endswith(f"(mais {150 - len(exibidas)} resultados omitidos)")
+
+
+class TestResumoResultado:
+    """Testes do resumo estatístico das linhas omitidas."""
+
+    @pytest.mark.unit
+    def test_estatisticas_e_mais_frequentes(self):
+        """Testa estatísticas numéricas, textos mais frequentes e competência tratada como período."""
+        linhas = [("Saúde", "202401", 10.0, Decimal("1")), ("Saúde", "202402", 20.0, None), ("Fazenda", "202401", 30.0, Decimal("3"))]
+
+        resumo = resume_resultado(["orgao", "competencia", "liquido", "qtd"], linhas, top_k=1).splitlines()
+
+        assert resumo == [
+            "Resumo de todas as 3 linhas:",
+            "orgao: 2 valores distintos; mais frequentes: Saúde (2)",
+            "competencia: 2 valores distintos (de 202401 a 202402); mais frequentes: 202401 (2)",
+            "liquido: n=3 soma=60.00 min=10.00 max=30.00 média=20.00",
+            "qtd: n=2 soma=4 min=1 max=3 média=2",
+        ]
+
+    @pytest.mark.unit
+    def test_identificadores_e_memoria_limitada(self):
+        """Testa se ids e competências inteiras não recebem soma nem média e se os distintos contados são limitados."""
+        from consulta_db import ResumoIncremental
+
+        resumo = ResumoIncremental(["id", "competencia", "matricula"], max_distintos=10)
+        for inicio in range(0, 50, 10):
+            resumo.adiciona([(i, 202401 + i % 2, f"A-{i}") for i in range(inicio, inicio + 10)])
+
+        assert resumo.texto().splitlines() == [
+            "Resumo de todas as 50 linhas:",
+            "id: mais de 10 valores distintos (de 0 a 49)",
+            "competencia: 2 valores distintos (de 202401 a 202402); mais frequentes: 202401 (25), 202402 (25)",
+            "matricula: mais de 10 valores distintos (de A-0 a A-9)",
+        ]
+
+    @pytest.mark.integration
+    @pytest.mark.db
+    def test_resumo_cobre_todas_as_linhas(self, folha_db):
+        """Testa se o resumo anexado ao resultado truncado considera todas as linhas da consulta."""
+        gerenciador = GerenciadorConexoes(folha_db)
+        soma = sqlite3.connect(folha_db).execute("SELECT SUM(liquido) FROM tb_folha_pagamento").fetchone()[0]
+
+        resultado = executa_consulta_folha("SELECT matricula, liquido FROM tb_folha_pagamento", gerenciador, CacheResultados(0))
+
+        assert "Resumo de todas as 206 linhas:" in resultado
+        assert f"liquido: n=206 soma={soma:.2f}" in resultado
+        gerenciador.fecha_todas()
+
+
+class TestCacheResultados:
+    """Testes do cache de resultados da ferramenta."""
+
+    @pytest.mark.unit
+    def test_normaliza_sql_preserva_literais(self):
+        """Testa se a normalização ignora espaços e caixa, mas não altera literais."""
+        a = normaliza_sql("SELECT  nome\nFROM tb_servidores WHERE orgao = 'Secretaria da  Saúde';")
+        b = normaliza_sql("select nome from TB_SERVIDORES where orgao = 'Secretaria da  Saúde'")
+        c = normaliza_sql("select nome from tb_servidores where orgao = 'secretaria da saúde'")
+
+        assert a == b
+        assert a != c
+
+    @pytest.mark.unit
+    def test_consulta_repetida_vem_do_cache(self, folha_db):
+        """Testa se a segunda execução de uma consulta equivalente é um acerto de cache."""
+        gerenciador = GerenciadorConexoes(folha_db)
+        cache = CacheResultados(max_bytes=1024 * 1024, ttl_segundos=60)
+        sql = "SELECT SUM(liquido) FROM tb_folha_pagamento WHERE competencia = '202401'"
+
+        primeiro = executa_consulta_folha(sql, gerenciador, cache)
+        segundo = executa_consulta_folha("  " + sql.lower() + " ;", gerenciador, cache)
+
+        assert primeiro == segundo
+        assert cache.estatisticas()["hits"] == 1
+        assert cache.estatisticas()["misses"] == 1
+        gerenciador.fecha_todas()
+
+    @pytest.mark.unit
+    def test_invalida_quando_banco_muda(self, folha_db):
+        """Testa se uma gravação no banco invalida os resultados em cache."""
+        gerenciador = GerenciadorConexoes(folha_db)
+        cache = CacheResultados(max_bytes=1024 * 1024, ttl_segundos=60)
+        sql = "SELECT COUNT(*) FROM tb_folha_pagamento"
+
+        antes = executa_consulta_folha(sql, gerenciador, cache)
+        conn = sqlite3.connect(folha_db)
+        conn.execute("DELETE FROM tb_folha_pagamento WHERE competencia = '202401'")
+        conn.commit()
+        conn.close()
+        depois = executa_consulta_folha(sql, gerenciador, cache)
+
+        assert antes != depois
+        assert cache.estatisticas()["hits"] == 0
+        gerenciador.fecha_todas()
+
+    @pytest.mark.integration
+    @pytest.mark.db
+    def test_republicacao_com_mesmo_conteudo_mantem_cache(self, folha_db, tmp_path):
+        """Testa se um snapshot novo com a mesma versão de conteúdo no manifesto reaproveita o cache."""
+        import cria_db
+
+        db_file = str(tmp_path / "folha.db")
+        gerenciador = GerenciadorConexoes(db_file)
+        cache = CacheResultados(max_bytes=1024 * 1024, ttl_segundos=60)
+        sql = "SELECT COUNT(*) FROM tb_folha_pagamento"
+
+        # Duas publicações dos mesmos dados, cada uma registrada no manifesto com a mesma versão
+        resultados = []
+        for numero in range(2):
+            shutil.copy(folha_db, tmp_path / f"novo{numero}.db")
+            publicado = cria_db.publica_snapshot(str(tmp_path / f"novo{numero}.db"), db_file)
+            manifesto = {"conteudo": "mesmos-dados"}
+            cria_db.registra_banco(manifesto, publicado)
+            cria_db.grava_manifesto(manifesto, db_file)
+            resultados.append(executa_consulta_folha(sql, gerenciador, cache))
+
+        assert resultados[0] == resultados[1]
+        assert cache.estatisticas()["hits"] == 1
+        assert gerenciador.obter_conexao().execute("PRAGMA database_list").fetchone()[2] == str(Path(publicado).resolve())
+        gerenciador.fecha_todas()
+
+    @pytest.mark.integration
+    @pytest.mark.db
+    def test_versao_do_manifesto_relida_so_quando_muda(self, folha_db, tmp_path, monkeypatch):
+        """Testa se a versão do conteúdo só é recalculada quando o manifesto ou o ponteiro mudam."""
+        import consulta_db
+        import cria_db
+
+        db_file = str(tmp_path / "folha.db")
+        shutil.copy(folha_db, tmp_path / "novo.db")
+        publicado = cria_db.publica_snapshot(str(tmp_path / "novo.db"), db_file)
+        manifesto = {"conteudo": "v1"}
+        cria_db.registra_banco(manifesto, publicado)
+        cria_db.grava_manifesto(manifesto, db_file)
+
+        leituras = []
+        monkeypatch.setattr(consulta_db, "versao_conteudo", lambda *a: leituras.append(a) or cria_db.versao_conteudo(*a))
+        gerenciador = GerenciadorConexoes(db_file)
+        conn = gerenciador.obter_conexao()
+
+        versoes = [gerenciador.versao_dados(conn) for _ in range(3)]
+        manifesto["conteudo"] = "v2"
+        cria_db.grava_manifesto(manifesto, db_file)
+        nova = gerenciador.versao_dados(conn)
+
+        assert len(leituras) == 2
+        assert versoes[0] == versoes[2] and versoes[0][0] == "v1"
+        assert nova[0] == "v2"
+        gerenciador.fecha_todas()
+
+    @pytest.mark.unit
+    def test_orcamento_de_memoria(self):
+        """Testa se as entradas menos usadas são descartadas ao estourar o orçamento."""
+        cache = CacheResultados(max_bytes=2000, ttl_segundos=60)
+
+        for i in range(10):
+            cache.guardar(f"consulta {i}", (1,), "x" * 500)
+
+        assert cache.estatisticas()["bytes"] <= 2000
+        assert cache.obter("consulta 9", (1,)) is not None
+        assert cache.obter("consulta 0", (1,)) is None
+
+    @pytest.mark.unit
+    def test_expiracao(self):
+        """Testa se entradas expiradas não são devolvidas."""
+        cache = CacheResultados(max_bytes=1024, ttl_segundos=-1)
+
+        cache.guardar("consulta", (1,), "resultado")
+
+        assert cache.obter("consulta", (1,)) is None
+
+
+class TestAvaliaPlano:
+    """Testes da avaliação do plano de execução antes da consulta."""
+
+    @pytest.fixture(autouse=True)
+    def limites_pequenos(self, monkeypatch):
+        """Reduz os limites para que a base de exemplo dispare os alertas."""
+        import consulta_db
+
+        monkeypatch.setattr(consulta_db, "PLAN_WARN_ROWS", 100)
+        monkeypatch.setattr(consulta_db, "PLAN_REJECT_ROWS", 10_000)
+
+    @pytest.mark.unit
+    @pytest.mark.db
+    def test_consulta_indexada_sem_alertas(self, folha_db):
+        """Testa se uma consulta que usa índices não gera alertas."""
+        conn = sqlite3.connect(folha_db)
+
+        avaliacao = avalia_plano(conn, "SELECT * FROM tb_folha_pagamento WHERE matricula = 'A-1000'")
+
+        assert avaliacao["alertas"] == []
+        assert not avaliacao["rejeitar"]
+        conn.close()
+
+    @pytest.mark.unit
+    @pytest.mark.db
+    def test_varredura_completa_gera_aviso(self, folha_db):
+        """Testa se a varredura de uma tabela acima do limite de aviso é apontada."""
+        conn = sqlite3.connect(folha_db)
+
+        avaliacao = avalia_plano(conn, "SELECT * FROM tb_folha_pagamento f WHERE f.liquido > 1000 ORDER BY f.liquido")
+
+        assert ("avisar", "varredura completa de tb_folha_pagamento (~206 linhas)") in avaliacao["alertas"]
+        assert any("temp b-tree" in descricao for _, descricao in avaliacao["alertas"])
+        assert not avaliacao["rejeitar"]
+        conn.close()
+
+    @pytest.mark.unit
+    @pytest.mark.db
+    def test_subconsulta_correlacionada_com_varredura_e_rejeitada(self, folha_db):
+        """Testa se uma subconsulta correlacionada que varre a tabela é rejeitada pela ferramenta."""
+        gerenciador = GerenciadorConexoes(folha_db)
+        sql = (
+            "SELECT s.nome FROM tb_servidores s WHERE "
+            "(SELECT COUNT(*) FROM tb_folha_pagamento f WHERE f.liquido > s.id) > 1"
+        )
+
+        resultado = executa_consulta_folha(sql, gerenciador, CacheResultados(0))
+
+        assert resultado.startswith("Erro: consulta rejeitada pelo plano de execução")
+        assert "subconsulta correlacionada varre tb_folha_pagamento" in resultado
+        assert "Plano:" in resultado
+        gerenciador.fecha_todas()
+
+    @pytest.mark.unit
+    @pytest.mark.db
+    def test_modo_aviso_executa_com_alerta(self, folha_db, monkeypatch):
+        """Testa se no modo 'avisar' a consulta é executada e o alerta é anexado."""
+        import consulta_db
+
+        monkeypatch.setattr(consulta_db, "PLAN_GATE_MODE", "avisar")
+        gerenciador = GerenciadorConexoes(folha_db)
+
+        resultado = executa_consulta_folha("SELECT COUNT(*) FROM tb_servidores s, tb_folha_pagamento f", gerenciador, CacheResultados(0))
+
+        assert resultado.startswith("Aviso do plano de execução")
+        assert "junção sem índice entre" in resultado
+        assert "Resultado: COUNT(*) = " in resultado
+        gerenciador.fecha_todas()
+
+
+class TestConsultaAssincrona:
+    """Testes da variante assíncrona da consulta, executada no pool limitado."""
+
+    CONSULTAS = [
+        "SELECT COUNT(*) FROM tb_servidores",
+        "SELECT COUNT(*) FROM tb_folha_pagamento WHERE competencia = '202401'",
+        "SELECT nome FROM tb_servidores WHERE matricula = 'A-1000'",
+        "SELECT * FROM tabela_inexistente",
+    ]
+
+    @pytest.mark.integration
+    @pytest.mark.db
+    def test_variante_assincrona(self, folha_db):
+        """Testa se a variante assíncrona, reunida com gather, retorna na ordem original e igual à síncrona."""
+        gerenciador = GerenciadorConexoes(folha_db)
+        sequenciais = [executa_consulta_folha(sql, gerenciador, CacheResultados(0)) for sql in self.CONSULTAS]
+
+        async def reune():
+            return await asyncio.gather(
+                *(executa_consulta_folha_async(sql, gerenciador, CacheResultados(0)) for sql in self.CONSULTAS)
+            )
+
+        resultados = asyncio.run(reune())
+
+        assert resultados == sequenciais
+        assert resultados[3].startswith("Erro ao executar a consulta SQL")
+        gerenciador.fecha_todas()
+
+
+class TestBuscaServidores:
+    """Testes da busca aproximada de servidores pelo índice de texto."""
+
+    @pytest.mark.unit
+    def test_expressao_busca(self):
+        """Testa se o texto digitado vira termos entre aspas, com prefixo só na última palavra longa."""
+        assert expressao_busca("saude") == '"saude"*'
+        assert expressao_busca("Servidor 2") == '"Servidor" "2"'
+        assert expressao_busca('fazenda" OR cargo:') == '"fazenda" "OR" "cargo"*'
+        assert expressao_busca(" -- ") is None
+
+    @pytest.mark.integration
+    @pytest.mark.db
+    def test_busca_sem_acentos_e_maiusculas(self, folha_db):
+        """Testa se 'saude' encontra todos os servidores da Secretaria da Saúde."""
+        gerenciador = GerenciadorConexoes(folha_db)
+        conn = sqlite3.connect(folha_db)
+        total = conn.execute("SELECT COUNT(*) FROM tb_servidores WHERE orgao = 'Secretaria da Saúde'").fetchone()[0]
+        conn.close()
+
+        resultado = busca_servidores("SAUDE", gerenciador=gerenciador, cache=CacheResultados(0))
+
+        assert resultado.startswith(f"Resultados da consulta ({total} encontrados):")
+        assert "orgao=Secretaria da Saúde" in resultado
+        gerenciador.fecha_todas()
+
+    @pytest.mark.integration
+    @pytest.mark.db
+    def test_busca_por_nome_resolve_matricula(self, folha_db):
+        """Testa se o nome com número casa exatamente um servidor, e não os de número com o mesmo prefixo."""
+        gerenciador = GerenciadorConexoes(folha_db)
+
+        resultado = busca_servidores("servidor 2", gerenciador=gerenciador, cache=CacheResultados(0))
+
+        assert resultado.startswith("Resultado (1 linha):")
+        assert "matricula: A-1001" in resultado
+        assert "nome: Servidor 2" in resultado
+        assert busca_servidores("xyz", gerenciador=gerenciador, cache=CacheResultados(0)).startswith("Nenhum servidor")
+        gerenciador.fecha_todas()
+
+
+class TestGerenciadorDuckDB:
+    """Testes do motor colunar DuckDB sobre os arquivos Parquet."""
+
+    @pytest.fixture
+    def parquet_dir(self, folha_db, tmp_path):
+        """Exporta o banco de exemplo para Parquet."""
+        pytest.importorskip("duckdb")
+        import cria_db
+
+        destino = tmp_path / "parquet"
+        conn = sqlite3.connect(folha_db)
+        cria_db.exporta_parquet(conn, str(destino))
+        conn.close()
+        return str(destino)
+
+    @pytest.mark.integration
+    @pytest.mark.db
+    def test_mesmo_resultado_que_sqlite(self, folha_db, parquet_dir):
+        """Testa se os dois motores retornam o mesmo resultado para uma pergunta de exemplo."""
+        from consulta_db import GerenciadorDuckDB
+
+        sql = (
+            "SELECT s.orgao, SUM(f.liquido) AS total FROM tb_servidores s JOIN tb_folha_pagamento f "
+            "ON f.matricula = s.matricula WHERE f.competencia = '202401' GROUP BY s.orgao ORDER BY s.orgao"
+        )
+        sqlite_ = GerenciadorConexoes(folha_db)
+        duckdb_ = GerenciadorDuckDB(parquet_dir)
+
+        assert executa_consulta_folha(sql, duckdb_, CacheResultados(0)) == executa_consulta_folha(sql, sqlite_, CacheResultados(0))
+        sqlite_.fecha_todas()
+        duckdb_.fecha_todas()
+
+    @pytest.mark.unit
+    @pytest.mark.db
+    def test_somente_um_select(self, parquet_dir):
+        """Testa se o DuckDB recusa múltiplos comandos e comandos diferentes de SELECT."""
+        from consulta_db import GerenciadorDuckDB
+
+        gerenciador = GerenciadorDuckDB(parquet_dir)
+
+        resultado = executa_consulta_folha("SELECT 1; DROP VIEW tb_servidores", gerenciador, CacheResultados(0))
+
+        assert resultado == "Erro: Esta ferramenta só pode executar uma única consulta SELECT."
+        assert "200" in executa_consulta_folha("SELECT COUNT(*) FROM tb_servidores", gerenciador, CacheResultados(0))
+        gerenciador.fecha_todas()
+
+    @pytest.mark.unit
+    @pytest.mark.db
+    def test_recusa_leitura_de_arquivos_externos(self, parquet_dir, tmp_path):
+        """Testa se funções de leitura de arquivos e URLs não alcançam nada fora do diretório Parquet."""
+        from consulta_db import GerenciadorDuckDB
+
+        segredo = tmp_path / "segredo.csv"
+        segredo.write_text("usuario,senha\nadmin,segredo123\n")
+        gerenciador = GerenciadorDuckDB(parquet_dir)
+
+        for sql in (
+            f"SELECT * FROM read_csv('{segredo}')",
+            f"SELECT * FROM read_text('{parquet_dir}/../segredo.csv')",
+            "SELECT * FROM read_parquet('https://example.com/folha.parquet')",
+        ):
+            resultado = executa_consulta_folha(sql, gerenciador, CacheResultados(0))
+            assert resultado.startswith("Erro") and "segredo123" not in resultado
+
+        assert "200" in executa_consulta_folha("SELECT COUNT(*) FROM tb_servidores", gerenciador, CacheResultados(0))
+        gerenciador.fecha_todas()
+
+    @pytest.mark.integration
+    @pytest.mark.db
+    def test_folha_particionada_por_competencia(self, parquet_dir):
+        """Testa se a folha é gravada em partições ano=/competencia= e lida só na competência pedida."""
+        import pyarrow as pa
+        from consulta_db import carrega_folha_parquet
+
+        particoes = sorted(p.name for p in (Path(parquet_dir) / "tb_folha_pagamento" / "ano=2024").iterdir())
+        tabela = carrega_folha_parquet(competencia="202402", parquet_dir=parquet_dir)
+
+        assert particoes == ["competencia=202401", "competencia=202402", "competencia=202403", "competencia=202404"]
+        assert set(tabela.column("competencia").to_pylist()) == {"202402"}
+        assert tabela.num_rows == 50
+        assert pa.types.is_dictionary(tabela.schema.field("orgao").type)
+        assert carrega_folha_parquet(ano="2024", colunas=["matricula"], parquet_dir=parquet_dir).num_columns == 1
+
+    @pytest.mark.unit
+    def test_motor_desconhecido(self):
+        """Testa se um motor inválido na configuração é recusado."""
+        from consulta_db import cria_gerenciador
+
+        with pytest.raises(ValueError):
+            cria_gerenciador("oracle")
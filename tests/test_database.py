@@ -2,8 +2,12 @@
 Testes para módulo de banco de dados.
 """
 
-import pytest
+import json
+import shutil
 import sqlite3
+from pathlib import Path
+
+import pytest
 
 
 class TestDatabase:
@@ -105,3 +109,996 @@ class TestDataIntegrity:
                 VALUES (?, ?, ?, ?)
             """, (999, 1, 2024, 3000.00))
             temp_db.commit()
+
+
+# Consultas geradas pelos agentes para as perguntas de exemplo da barra lateral e o índice (ou busca) esperado
+CONSULTAS_EXEMPLO = {
+    "Qual é a remuneração do Servidor 2?": (
+        "SELECT competencia, vencimentos, descontos, liquido FROM tb_servidores s "
+        "JOIN tb_folha_pagamento f ON f.matricula = s.matricula WHERE s.nome = 'Servidor 2'",
+        "idx_servidores_nome",
+    ),
+    "Quantos servidores ocupam o cargo de Assistente?": (
+        "SELECT COUNT(*) FROM tb_servidores WHERE cargo = 'Assistente'",
+        "cargo_id=?",
+    ),
+    "Quantos servidores são da Secretaria da Saúde?": (
+        "SELECT COUNT(*) FROM tb_servidores WHERE orgao = 'Secretaria da Saúde'",
+        "idx_servidores_orgao_cargo",
+    ),
+    "Na Fazenda, quantos servidores ocupam o cargo de Assistente?": (
+        "SELECT COUNT(*) FROM tb_servidores WHERE orgao = 'Secretaria da Fazenda' AND cargo = 'Assistente'",
+        "idx_servidores_orgao_cargo",
+    ),
+    "Qual é o valor da folha da fazenda em 202401?": (
+        "SELECT SUM(f.liquido) FROM tb_servidores s JOIN tb_folha_pagamento f ON f.matricula = s.matricula "
+        "WHERE s.orgao = 'Secretaria da Fazenda' AND f.competencia = '202401'",
+        "idx_folha_matricula_competencia",
+    ),
+    "Qual é o valor da folha da saude no ano de 2024?": (
+        "SELECT SUM(f.liquido) FROM tb_servidores s JOIN tb_folha_pagamento f ON f.matricula = s.matricula "
+        "WHERE s.orgao = 'Secretaria da Saúde' AND f.competencia BETWEEN '202401' AND '202412'",
+        "idx_folha_competencia",
+    ),
+    "Quantos servidores tiveram aumento?": (
+        "SELECT COUNT(DISTINCT f1.matricula) FROM tb_folha_pagamento AS f1 WHERE f1.vencimentos > "
+        "(SELECT f2.vencimentos FROM tb_folha_pagamento AS f2 WHERE f2.matricula = f1.matricula "
+        "AND f2.competencia < f1.competencia ORDER BY f2.competencia DESC LIMIT 1)",
+        "idx_folha_matricula_competencia",
+    ),
+}
+
+
+class TestIndicesFolha:
+    """Testes do schema físico versionado da Folha de Pagamento."""
+
+    @pytest.mark.integration
+    @pytest.mark.db
+    def test_schema_na_versao_mais_recente(self, folha_db):
+        """Testa se o banco criado está na última versão e tem estatísticas."""
+        import cria_db
+
+        conn = sqlite3.connect(folha_db)
+
+        assert conn.execute("PRAGMA user_version").fetchone()[0] == cria_db.VERSAO_SCHEMA
+        assert conn.execute("SELECT COUNT(*) FROM sqlite_stat1").fetchone()[0] > 0
+        conn.close()
+
+    @pytest.mark.integration
+    @pytest.mark.db
+    def test_migracao_de_banco_existente(self, tmp_path):
+        """Testa se a migração adiciona os índices a um banco na versão base."""
+        import cria_db
+
+        conn = sqlite3.connect(tmp_path / "antigo.db")
+        with open(cria_db.SQL_FILE, encoding="utf-8") as f:
+            conn.executescript(f.read())
+
+        versao = cria_db.migra_schema(conn)
+        indices = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+
+        assert versao == cria_db.VERSAO_SCHEMA
+        assert "idx_folha_matricula_competencia" in indices
+        assert "idx_servidores_orgao_cargo" in indices
+        conn.close()
+
+    @pytest.mark.integration
+    @pytest.mark.db
+    @pytest.mark.parametrize("pergunta", list(CONSULTAS_EXEMPLO))
+    def test_consultas_exemplo_usam_indices(self, folha_db, pergunta):
+        """Testa, via EXPLAIN QUERY PLAN, se as consultas de exemplo usam os índices."""
+        sql, indice = CONSULTAS_EXEMPLO[pergunta]
+        conn = sqlite3.connect(folha_db)
+
+        plano = " ".join(r[3] for r in conn.execute(f"EXPLAIN QUERY PLAN {sql}"))
+
+        assert indice in plano
+        conn.close()
+
+
+class TestResumosFolha:
+    """Testes dos agregados materializados da folha."""
+
+    @pytest.mark.integration
+    @pytest.mark.db
+    def test_resumos_batem_com_a_tabela_fato(self, folha_db):
+        """Testa se os totais mensais e anuais coincidem com tb_folha_pagamento."""
+        conn = sqlite3.connect(folha_db)
+
+        fato = conn.execute("""
+            SELECT SUM(f.liquido), COUNT(*) FROM tb_folha_pagamento f
+            JOIN tb_servidores s ON s.matricula = f.matricula
+            WHERE s.orgao = 'Secretaria da Fazenda' AND f.competencia = '202401'
+        """).fetchone()
+        mensal = conn.execute("""
+            SELECT SUM(total_liquido), SUM(qtd_servidores) FROM tb_resumo_folha_mensal
+            WHERE orgao = 'Secretaria da Fazenda' AND competencia = '202401'
+        """).fetchone()
+        anual = conn.execute("SELECT SUM(total_liquido) FROM tb_resumo_folha_anual WHERE ano = '2024'").fetchone()[0]
+
+        assert mensal == pytest.approx(fato)
+        assert anual == pytest.approx(conn.execute("SELECT SUM(liquido) FROM tb_folha_pagamento").fetchone()[0])
+        conn.close()
+
+    @pytest.mark.integration
+    @pytest.mark.db
+    def test_atualizacao_incremental(self, folha_db):
+        """Testa se a carga de uma nova competência atualiza apenas os agregados afetados."""
+        import cria_db
+
+        conn = sqlite3.connect(folha_db)
+        antes = conn.execute("SELECT * FROM tb_resumo_folha_mensal WHERE competencia = '202401' ORDER BY 1, 2").fetchall()
+
+        conn.execute("""
+            INSERT INTO tb_folha_pagamento (matricula, competencia, vencimentos, descontos, liquido)
+            SELECT matricula, '202501', vencimentos, descontos, liquido FROM tb_folha_pagamento WHERE competencia = '202404'
+        """)
+        cria_db.atualiza_dados_derivados(conn, ["202501"])
+
+        assert conn.execute("SELECT * FROM tb_resumo_folha_mensal WHERE competencia = '202401' ORDER BY 1, 2").fetchall() == antes
+        assert conn.execute("SELECT SUM(total_liquido) FROM tb_resumo_folha_mensal WHERE competencia = '202501'").fetchone()[0] == pytest.approx(
+            conn.execute("SELECT SUM(liquido) FROM tb_folha_pagamento WHERE competencia = '202404'").fetchone()[0]
+        )
+        assert conn.execute("SELECT qtd_competencias FROM tb_resumo_folha_anual WHERE ano = '2025' LIMIT 1").fetchone()[0] == 1
+        conn.close()
+
+    @pytest.mark.integration
+    @pytest.mark.db
+    def test_resumo_usa_indice(self, folha_db):
+        """Testa se a pergunta de total por órgão e competência é respondida pelo resumo indexado."""
+        conn = sqlite3.connect(folha_db)
+
+        plano = " ".join(r[3] for r in conn.execute(
+            "EXPLAIN QUERY PLAN SELECT SUM(total_liquido) FROM tb_resumo_folha_mensal "
+            "WHERE orgao = 'Secretaria da Fazenda' AND competencia = '202401'"
+        ))
+
+        assert "SEARCH tb_resumo_folha_mensal" in plano
+        conn.close()
+
+
+class TestEventosFolha:
+    """Testes da tabela de eventos e da situação dos servidores."""
+
+    @pytest.mark.integration
+    @pytest.mark.db
+    def test_aumentos_batem_com_subconsulta_correlacionada(self, folha_db):
+        """Testa se os aumentos pré-calculados coincidem com a consulta correlacionada original."""
+        sql, _ = CONSULTAS_EXEMPLO["Quantos servidores tiveram aumento?"]
+        conn = sqlite3.connect(folha_db)
+
+        esperado = conn.execute(sql).fetchone()[0]
+
+        assert conn.execute("SELECT COUNT(*) FROM tb_situacao_servidor WHERE qtd_aumentos > 0").fetchone()[0] == esperado
+        assert conn.execute(
+            "SELECT COUNT(DISTINCT matricula) FROM tb_eventos_folha WHERE tipo_evento = 'aumento'"
+        ).fetchone()[0] == esperado
+        conn.close()
+
+    @pytest.mark.integration
+    @pytest.mark.db
+    def test_desligados_e_lacunas(self, folha_db):
+        """Testa a detecção de desligamentos e de meses sem folha."""
+        import cria_db
+
+        conn = sqlite3.connect(folha_db)
+        ultima = conn.execute("SELECT MAX(competencia) FROM tb_folha_pagamento").fetchone()[0]
+
+        desligados = conn.execute("SELECT COUNT(*) FROM tb_situacao_servidor WHERE desligado = 1").fetchone()[0]
+        sem_ultima = conn.execute(
+            "SELECT COUNT(*) FROM tb_servidores WHERE matricula NOT IN "
+            "(SELECT matricula FROM tb_folha_pagamento WHERE competencia = ?)", (ultima,)
+        ).fetchone()[0]
+        assert desligados == sem_ultima
+
+        # Um servidor que volta após três meses sem folha gera uma lacuna
+        conn.execute("""
+            INSERT INTO tb_folha_pagamento (matricula, competencia, vencimentos, descontos, liquido)
+            VALUES ('A-1000', '202408', 5000, 500, 4500)
+        """)
+        cria_db.atualiza_dados_derivados(conn, ["202408"])
+
+        evento = conn.execute(
+            "SELECT competencia_anterior, lacuna_meses, tipo_evento FROM tb_eventos_folha "
+            "WHERE matricula = 'A-1000' AND competencia = '202408'"
+        ).fetchone()
+        situacao = conn.execute(
+            "SELECT qtd_lacunas, meses_ausente, desligado FROM tb_situacao_servidor WHERE matricula = 'A-1000'"
+        ).fetchone()
+
+        assert evento == ("202404", 3, "aumento")
+        assert situacao == (1, 3, 0)
+        assert conn.execute("SELECT COUNT(*) FROM tb_situacao_servidor WHERE desligado = 0").fetchone()[0] == 1
+        conn.close()
+
+    @pytest.mark.integration
+    @pytest.mark.db
+    def test_admissao_refeita_quando_a_competencia_minima_muda(self, folha_db):
+        """Testa se uma carga anterior à primeira competência reclassifica matrículas fora do lote."""
+        import cria_db
+
+        conn = sqlite3.connect(folha_db)
+        minimo = conn.execute("SELECT MIN(competencia) FROM tb_folha_pagamento").fetchone()[0]
+        matricula = conn.execute(
+            "SELECT matricula FROM tb_eventos_folha WHERE tipo_evento = 'inicio' AND matricula <> 'A-1000' LIMIT 1"
+        ).fetchone()[0]
+
+        # Folha de um único servidor em uma competência anterior a todas as já carregadas
+        conn.execute("""
+            INSERT INTO tb_folha_pagamento (matricula, competencia, vencimentos, descontos, liquido)
+            VALUES ('A-1000', '202312', 5000, 500, 4500)
+        """)
+        cria_db.atualiza_dados_derivados(conn, ["202312"])
+
+        assert conn.execute(
+            "SELECT tipo_evento FROM tb_eventos_folha WHERE matricula = ? AND competencia = ?", (matricula, minimo)
+        ).fetchone()[0] == "admissao"
+        assert conn.execute(
+            "SELECT COUNT(*) FROM tb_eventos_folha WHERE tipo_evento = 'inicio'"
+        ).fetchone()[0] == 1
+        conn.close()
+
+
+class TestParticoesFolha:
+    """Testes da folha gravada em um arquivo SQLite por ano."""
+
+    @pytest.fixture
+    def banco_particionado(self, tmp_path, monkeypatch):
+        """Cria um banco com os dados de exemplo em 2023 e 2024, particionado por ano."""
+        import pandas as pd
+        import cria_db
+
+        raiz = Path(__file__).resolve().parent.parent
+        monkeypatch.chdir(tmp_path)
+
+        # Replica a folha de exemplo um ano antes para ter duas partições
+        dados = pd.read_csv(raiz / cria_db.CSV_FILE)
+        anterior = dados.assign(competencia=dados["competencia"] - 100)
+        pd.concat([anterior, dados]).to_csv(tmp_path / "dois_anos.csv", index=False)
+
+        db_path = tmp_path / "folha_pagamento.db"
+        conn, cursor = cria_db.cria_database(str(db_path), str(raiz / cria_db.SQL_FILE))
+        cria_db.popula_tabelas(conn, cursor, str(tmp_path / "dois_anos.csv"))
+        cria_db.particiona_folha(conn)
+        yield conn, str(db_path)
+        conn.close()
+
+    @pytest.mark.integration
+    @pytest.mark.db
+    def test_um_arquivo_por_ano(self, banco_particionado):
+        """Testa se cada ano vai para seu arquivo, com os anteriores fechados e a carga vazia."""
+        conn, db_path = banco_particionado
+
+        assert conn.execute("SELECT ano, arquivo, fechado FROM tb_particoes_folha ORDER BY ano").fetchall() == [
+            ("2023", "folha_pagamento_2023.db", 1),
+            ("2024", "folha_pagamento_2024.db", 0),
+        ]
+        assert conn.execute("SELECT COUNT(*) FROM main.tb_folha_pagamento").fetchone()[0] == 0
+        assert conn.execute("SELECT COUNT(*) FROM p_2023.tb_folha_pagamento").fetchone()[0] == 206
+        assert conn.execute("SELECT COUNT(*) FROM tb_folha_pagamento").fetchone()[0] == 412
+        assert (Path(db_path).parent / "folha_pagamento_2023.db").exists()
+
+    @pytest.mark.integration
+    @pytest.mark.db
+    def test_ano_fechado_e_imutavel(self, banco_particionado):
+        """Testa se novas linhas de um ano fechado são recusadas."""
+        import cria_db
+
+        conn, _ = banco_particionado
+        conn.execute(
+            "INSERT INTO main.tb_folha_pagamento (matricula, competencia, vencimentos, descontos, liquido) "
+            "VALUES ('A-1000', '202305', 1, 0, 1)"
+        )
+
+        with pytest.raises(ValueError, match="2023"):
+            cria_db.particiona_folha(conn)
+
+    @pytest.mark.integration
+    @pytest.mark.db
+    def test_leitura_pela_ferramenta(self, banco_particionado, monkeypatch):
+        """Testa se a ferramenta enxerga as partições e se o filtro por competência usa o índice de cada arquivo."""
+        import consulta_db
+
+        _, db_path = banco_particionado
+        monkeypatch.setattr(consulta_db, "PLAN_WARN_ROWS", 100)
+        gerenciador = consulta_db.GerenciadorConexoes(db_path)
+        conn = gerenciador.obter_conexao()
+        sql = "SELECT SUM(liquido) FROM tb_folha_pagamento WHERE competencia = '202301'"
+
+        plano = [r[3] for r in conn.execute(f"EXPLAIN QUERY PLAN {sql}")]
+
+        assert {nome for _, nome, _ in conn.execute("PRAGMA database_list")} >= {"p_2023", "p_2024"}
+        assert "SEARCH p_2023.tb_folha_pagamento USING INDEX idx_folha_competencia (competencia=?)" in plano
+        assert not any(linha.startswith("SCAN p_") for linha in plano)
+        assert consulta_db.avalia_plano(conn, sql)["alertas"] == []
+        assert consulta_db.avalia_plano(conn, "SELECT COUNT(*) FROM tb_folha_pagamento")["alertas"] == [
+            ("avisar", "varredura completa de p_2023.tb_folha_pagamento (~206 linhas)"),
+            ("avisar", "varredura completa de p_2024.tb_folha_pagamento (~206 linhas)"),
+        ]
+        assert consulta_db.executa_consulta_folha(sql, gerenciador, consulta_db.CacheResultados(0)) == "Resultado: SUM(liquido) = 256035.00"
+        gerenciador.fecha_todas()
+
+    @pytest.mark.integration
+    @pytest.mark.db
+    def test_snapshot_leva_arquivos_anuais(self, banco_particionado, tmp_path):
+        """Testa se a publicação renomeia os arquivos anuais com o snapshot e ajusta o catálogo."""
+        import consulta_db
+        import cria_db
+
+        conn, db_path = banco_particionado
+        conn.close()
+
+        publicado = cria_db.publica_snapshot(db_path, str(tmp_path / "publicado.db"))
+        gerenciador = consulta_db.GerenciadorConexoes(str(tmp_path / "publicado.db"))
+        leitura = gerenciador.obter_conexao()
+
+        assert not Path(db_path).exists() and not (tmp_path / "folha_pagamento_2023.db").exists()
+        assert [Path(p).name for p in cria_db.arquivos_particoes(publicado)] == [
+            Path(cria_db.arquivo_particao(publicado, ano)).name for ano in ("2023", "2024")
+        ]
+        assert leitura.execute("SELECT COUNT(*) FROM tb_folha_pagamento").fetchone()[0] == 412
+        gerenciador.fecha_todas()
+
+
+    @pytest.mark.integration
+    @pytest.mark.db
+    def test_upsert_de_linhas_ainda_no_banco_principal(self, banco_particionado, tmp_path):
+        """Testa se a carga incremental atualiza a linha onde ela está: arquivo anual ou tabela de carga principal."""
+        import cria_db
+
+        conn, _ = banco_particionado
+        cabecalho = "nome,cpf,matricula,orgao,cargo,competencia,vencimentos,descontos,liquido\n"
+        servidor = "Servidor 1,202.535.960-24,A-1000,Secretaria da Saúde,Assistente"
+        primeira = tmp_path / "primeira.csv"
+        primeira.write_text(cabecalho + f"{servidor},202405,3093.0,429.0,2664.0\n", encoding="utf-8")
+        segunda = tmp_path / "segunda.csv"
+        segunda.write_text(
+            cabecalho + f"{servidor},202405,3193.0,429.0,2764.0\n" + f"{servidor},202404,3093.0,429.0,2664.0\n",
+            encoding="utf-8",
+        )
+
+        cria_db.carga_incremental(conn, str(primeira))
+        contagens = cria_db.carga_incremental(conn, str(segunda))
+
+        assert contagens["folha"] == {"inseridos": 0, "atualizados": 2, "inalterados": 0}
+        assert conn.execute("SELECT COUNT(*) FROM main.tb_folha_pagamento").fetchone()[0] == 1
+        assert conn.execute(
+            "SELECT liquido FROM tb_folha_pagamento WHERE matricula = 'A-1000' AND competencia IN ('202404', '202405')"
+        ).fetchall() == [(2664.0,), (2764.0,)]
+        assert conn.execute(
+            "SELECT SUM(total_liquido) FROM tb_resumo_folha_mensal WHERE competencia = '202405'"
+        ).fetchone()[0] == 2764.0
+        assert conn.execute(
+            "SELECT tipo_evento FROM tb_eventos_folha WHERE matricula = 'A-1000' AND competencia = '202405'"
+        ).fetchone()[0] == "aumento"
+
+class TestFolhaCompacta:
+    """Testes do layout compacto da folha (competência inteira, centavos, WITHOUT ROWID)."""
+
+    @pytest.mark.integration
+    @pytest.mark.db
+    def test_view_mantem_colunas_e_valores(self, folha_db):
+        """Testa se a view expõe as mesmas colunas e totais exatos da tabela original."""
+        import cria_db
+
+        conn = sqlite3.connect(folha_db)
+        colunas = [c[1] for c in conn.execute("PRAGMA table_info(tb_folha_pagamento)")]
+        totais = conn.execute("SELECT competencia, SUM(liquido) FROM tb_folha_pagamento GROUP BY 1 ORDER BY 1").fetchall()
+        filtro = "SELECT COUNT(*) FROM tb_folha_pagamento WHERE competencia = '202401'"
+        qtd_competencia = conn.execute(filtro).fetchone()[0]
+
+        cria_db.compacta_folha(conn)
+
+        assert conn.execute("SELECT type FROM sqlite_master WHERE name = 'tb_folha_pagamento'").fetchone()[0] == "view"
+        assert [c[1] for c in conn.execute("PRAGMA table_info(tb_folha_pagamento)")] == colunas
+        assert conn.execute(
+            "SELECT CAST(competencia AS TEXT), SUM(liquido) FROM tb_folha_pagamento GROUP BY 1 ORDER BY 1"
+        ).fetchall() == totais
+        assert conn.execute(filtro).fetchone()[0] == qtd_competencia
+        conn.close()
+
+    @pytest.mark.integration
+    @pytest.mark.db
+    def test_insercao_pela_view_e_tipos_estritos(self, folha_db):
+        """Testa se inserções pela view chegam em centavos e se a tabela STRICT recusa tipos errados."""
+        import cria_db
+
+        conn = sqlite3.connect(folha_db)
+        cria_db.compacta_folha(conn)
+
+        conn.execute(
+            "INSERT INTO tb_folha_pagamento (matricula, competencia, vencimentos, descontos, liquido) "
+            "VALUES ('A-1000', '202405', 3000.15, 429.1, 2571.05)"
+        )
+
+        assert conn.execute(
+            "SELECT competencia, vencimentos_centavos, liquido_centavos FROM tb_folha_compacta "
+            "WHERE matricula = 'A-1000' AND competencia = 202405"
+        ).fetchone() == (202405, 300015, 257105)
+        with pytest.raises(sqlite3.IntegrityError):
+            conn.execute("INSERT INTO tb_folha_compacta VALUES ('A-1000', 202406, 'muito', 0, 0)")
+        conn.close()
+
+    @pytest.mark.integration
+    @pytest.mark.db
+    @pytest.mark.parametrize("pergunta", list(CONSULTAS_EXEMPLO))
+    def test_consultas_exemplo_usam_chave_ou_indice(self, folha_db, pergunta):
+        """Testa se as consultas de exemplo continuam buscando por chave ou índice no layout compacto."""
+        import cria_db
+
+        sql, _ = CONSULTAS_EXEMPLO[pergunta]
+        conn = sqlite3.connect(folha_db)
+        cria_db.compacta_folha(conn)
+
+        plano = [r[3] for r in conn.execute(f"EXPLAIN QUERY PLAN {sql}")]
+
+        assert any(linha.startswith("SEARCH") and " USING " in linha for linha in plano)
+        conn.close()
+
+
+class TestDimensoesServidores:
+    """Testes das tabelas de dimensão de órgão e cargo."""
+
+    @pytest.mark.integration
+    @pytest.mark.db
+    def test_dimensoes_com_chave_de_busca(self, folha_db):
+        """Testa se órgãos e cargos são gravados uma única vez, com a chave de busca sem acentos."""
+        conn = sqlite3.connect(folha_db)
+
+        orgaos = dict(conn.execute("SELECT nome, chave_busca FROM tb_orgaos"))
+
+        assert len(orgaos) == 4
+        assert orgaos["Secretaria da Saúde"] == "secretaria da saude"
+        assert orgaos["Secretaria de Administração"] == "secretaria de administracao"
+        assert conn.execute("SELECT COUNT(*) FROM tb_cargos").fetchone()[0] == 4
+        conn.close()
+
+    @pytest.mark.integration
+    @pytest.mark.db
+    def test_view_mantem_colunas_e_busca_sem_acentos(self, folha_db):
+        """Testa se a view tb_servidores mantém as colunas originais e filtra pela chave de busca."""
+        conn = sqlite3.connect(folha_db)
+
+        colunas = [c[1] for c in conn.execute("PRAGMA table_info(tb_servidores)")]
+        por_nome = conn.execute("SELECT COUNT(*) FROM tb_servidores WHERE orgao = 'Secretaria da Saúde'").fetchone()[0]
+        por_chave = conn.execute("SELECT COUNT(*) FROM tb_servidores WHERE orgao_busca LIKE '%saude%'").fetchone()[0]
+
+        assert colunas == ["id", "nome", "cpf", "matricula", "orgao", "cargo", "orgao_busca", "cargo_busca"]
+        assert por_chave == por_nome > 0
+        conn.close()
+
+    @pytest.mark.integration
+    @pytest.mark.db
+    def test_escrita_pela_view_reaproveita_dimensoes(self, folha_db):
+        """Testa se inserções e atualizações pela view criam ou reaproveitam os ids das dimensões."""
+        conn = sqlite3.connect(folha_db)
+
+        conn.execute(
+            "INSERT INTO tb_servidores (nome, cpf, matricula, orgao, cargo) "
+            "VALUES ('Servidor Novo', '000.000.000-00', 'Z-1', 'Secretaria da Saúde', 'Perito Criminal')"
+        )
+        conn.execute("UPDATE tb_servidores SET cargo = 'Assistente' WHERE matricula = 'Z-1'")
+
+        assert conn.execute("SELECT COUNT(*) FROM tb_orgaos").fetchone()[0] == 4
+        assert conn.execute("SELECT COUNT(*) FROM tb_cargos").fetchone()[0] == 5
+        assert conn.execute(
+            "SELECT orgao, cargo, cargo_busca FROM tb_servidores WHERE matricula = 'Z-1'"
+        ).fetchone() == ("Secretaria da Saúde", "Assistente", "assistente")
+        conn.execute("DELETE FROM tb_servidores WHERE matricula = 'Z-1'")
+        assert conn.execute("SELECT COUNT(*) FROM tb_servidores_base WHERE matricula = 'Z-1'").fetchone()[0] == 0
+        conn.close()
+
+    @pytest.mark.integration
+    @pytest.mark.db
+    def test_indice_de_busca_acompanha_escritas(self, folha_db):
+        """Testa se o índice de texto reflete inserções, mudanças de cargo e exclusões de servidores."""
+        conn = sqlite3.connect(folha_db)
+        busca = "SELECT matricula FROM tb_busca_servidores WHERE tb_busca_servidores MATCH ?"
+
+        assert conn.execute("SELECT COUNT(*) FROM tb_busca_servidores").fetchone()[0] == 200
+        conn.execute(
+            "INSERT INTO tb_servidores (nome, cpf, matricula, orgao, cargo) "
+            "VALUES ('José Conceição', '000.000.000-00', 'Z-1', 'Secretaria da Saúde', 'Perito Criminal')"
+        )
+        assert conn.execute(busca, ('"jose" "conceicao"',)).fetchall() == [("Z-1",)]
+
+        conn.execute("UPDATE tb_servidores SET cargo = 'Assistente' WHERE matricula = 'Z-1'")
+        assert conn.execute(busca, ('"perito"',)).fetchall() == []
+
+        conn.execute("DELETE FROM tb_servidores WHERE matricula = 'Z-1'")
+        assert conn.execute(busca, ('"jose"',)).fetchall() == []
+        conn.close()
+
+
+class TestCargaIncremental:
+    """Testes da carga incremental (upsert) sobre um banco existente."""
+
+    CABECALHO = "nome,cpf,matricula,orgao,cargo,competencia,vencimentos,descontos,liquido\n"
+
+    @pytest.fixture
+    def arquivo_alteracoes(self, tmp_path):
+        """Arquivo com uma linha alterada, uma competência nova, um servidor novo e uma mudança de órgão."""
+        arquivo = tmp_path / "alteracoes.csv"
+        arquivo.write_text(
+            self.CABECALHO
+            + "Servidor 1,202.535.960-24,A-1000,Secretaria da Saúde,Assistente,202404,3093.0,429.0,2664.0\n"
+            + "Servidor 1,202.535.960-24,A-1000,Secretaria da Saúde,Assistente,202405,3093.0,429.0,2664.0\n"
+            + "Servidor Novo,000.000.000-00,Z-1,Secretaria da Fazenda,Analista,202405,5000.0,1000.0,4000.0\n"
+            + "Servidor 2,206.171.800-30,A-1001,Secretaria da Saúde,Assistente,202401,1000.0,100.0,900.0\n",
+            encoding="utf-8",
+        )
+        return arquivo
+
+    @pytest.mark.integration
+    @pytest.mark.db
+    def test_recarga_do_mesmo_arquivo_nao_altera_nada(self, folha_db):
+        """Testa se recarregar o arquivo original só conta linhas inalteradas."""
+        import cria_db
+
+        conn = sqlite3.connect(folha_db)
+        raiz = Path(__file__).resolve().parent.parent
+
+        contagens = cria_db.carga_incremental(conn, str(raiz / cria_db.CSV_FILE))
+
+        assert contagens["servidores"] == {"inseridos": 0, "atualizados": 0, "inalterados": 200}
+        assert contagens["folha"] == {"inseridos": 0, "atualizados": 0, "inalterados": 206}
+        assert conn.execute("SELECT COUNT(*) FROM tb_folha_pagamento").fetchone()[0] == 206
+        conn.close()
+
+    @pytest.mark.integration
+    @pytest.mark.db
+    def test_upsert_e_dados_derivados(self, folha_db, arquivo_alteracoes):
+        """Testa as contagens do upsert e se os agregados afetados refletem as alterações."""
+        import cria_db
+
+        conn = sqlite3.connect(folha_db)
+        saude_antes = conn.execute(
+            "SELECT total_liquido FROM tb_resumo_folha_mensal "
+            "WHERE orgao = 'Secretaria da Saúde' AND cargo = 'Assistente' AND competencia = '202401'"
+        ).fetchone()[0]
+
+        contagens = cria_db.carga_incremental(conn, str(arquivo_alteracoes))
+
+        assert contagens["servidores"] == {"inseridos": 1, "atualizados": 1, "inalterados": 1}
+        assert contagens["folha"] == {"inseridos": 2, "atualizados": 2, "inalterados": 0}
+        assert conn.execute(
+            "SELECT liquido FROM tb_folha_pagamento WHERE matricula = 'A-1000' AND competencia = '202404'"
+        ).fetchone()[0] == 2664.0
+        assert conn.execute("SELECT COUNT(*) FROM tb_folha_pagamento").fetchone()[0] == 208
+
+        # O servidor 2 mudou de órgão: o agregado da Saúde em 202401 passa a incluí-lo com o novo líquido
+        assert conn.execute(
+            "SELECT total_liquido FROM tb_resumo_folha_mensal "
+            "WHERE orgao = 'Secretaria da Saúde' AND cargo = 'Assistente' AND competencia = '202401'"
+        ).fetchone()[0] == saude_antes + 900.0
+        assert conn.execute(
+            "SELECT SUM(total_liquido) FROM tb_resumo_folha_mensal WHERE competencia = '202405'"
+        ).fetchone()[0] == 6664.0
+        assert conn.execute(
+            "SELECT tipo_evento FROM tb_eventos_folha WHERE matricula = 'A-1000' AND competencia = '202404'"
+        ).fetchone()[0] == "aumento"
+        conn.close()
+
+    @pytest.mark.integration
+    @pytest.mark.db
+    def test_upsert_no_layout_compacto(self, folha_db, arquivo_alteracoes):
+        """Testa se as linhas alteradas substituem as existentes na tabela compacta, pela chave."""
+        import cria_db
+
+        conn = sqlite3.connect(folha_db)
+        cria_db.compacta_folha(conn)
+
+        contagens = cria_db.carga_incremental(conn, str(arquivo_alteracoes))
+
+        assert contagens["folha"]["atualizados"] == 2
+        assert conn.execute(
+            "SELECT liquido_centavos FROM tb_folha_compacta WHERE matricula = 'A-1000' AND competencia = 202404"
+        ).fetchone()[0] == 266400
+        assert conn.execute("SELECT COUNT(*) FROM tb_folha_compacta").fetchone()[0] == 208
+        conn.close()
+
+
+class TestCargaEmLotes:
+    """Testes da carga em lotes de arquivos grandes (CSV e XLSX)."""
+
+    @pytest.fixture
+    def banco_vazio(self, tmp_path, monkeypatch):
+        """Banco com o schema completo e sem dados."""
+        import cria_db
+
+        raiz = Path(__file__).resolve().parent.parent
+        monkeypatch.chdir(tmp_path)
+        conn, _ = cria_db.cria_database(str(tmp_path / "lotes.db"), str(raiz / cria_db.SQL_FILE))
+        yield conn
+        conn.close()
+
+    @staticmethod
+    def resumo(conn):
+        """Totais usados para comparar a carga em lotes com a carga completa."""
+        return (
+            conn.execute("SELECT COUNT(*) FROM tb_servidores").fetchone(),
+            conn.execute("SELECT competencia, COUNT(*), SUM(liquido) FROM tb_folha_pagamento GROUP BY 1 ORDER BY 1").fetchall(),
+            conn.execute("SELECT * FROM tb_resumo_folha_mensal ORDER BY orgao, cargo, competencia").fetchall(),
+            conn.execute("SELECT COUNT(*), SUM(desligado) FROM tb_situacao_servidor").fetchone(),
+        )
+
+    @pytest.mark.integration
+    @pytest.mark.db
+    def test_csv_em_lotes_igual_a_carga_completa(self, folha_db, banco_vazio):
+        """Testa se lotes pequenos (servidores repetidos entre lotes) geram o mesmo banco da carga completa."""
+        import cria_db
+
+        raiz = Path(__file__).resolve().parent.parent
+        completo = sqlite3.connect(folha_db)
+
+        total = cria_db.carga_em_lotes(banco_vazio, str(raiz / cria_db.CSV_FILE), tamanho_lote=7)
+
+        assert total == 206
+        assert self.resumo(banco_vazio) == self.resumo(completo)
+        completo.close()
+
+    @pytest.mark.integration
+    @pytest.mark.db
+    def test_xlsx_em_lotes(self, folha_db, banco_vazio, tmp_path):
+        """Testa a leitura da planilha em modo somente leitura, com a competência numérica convertida em texto."""
+        import pandas as pd
+        import cria_db
+
+        raiz = Path(__file__).resolve().parent.parent
+        planilha = tmp_path / "folha.xlsx"
+        pd.read_csv(raiz / cria_db.CSV_FILE).to_excel(planilha, index=False)
+        completo = sqlite3.connect(folha_db)
+
+        cria_db.carga_em_lotes(banco_vazio, str(planilha), tamanho_lote=50)
+
+        assert self.resumo(banco_vazio) == self.resumo(completo)
+        assert banco_vazio.execute("SELECT DISTINCT typeof(competencia) FROM tb_folha_pagamento").fetchall() == [("text",)]
+        completo.close()
+
+    @pytest.mark.integration
+    @pytest.mark.db
+    def test_carga_paralela_de_varios_arquivos(self, folha_db, banco_vazio, tmp_path):
+        """Testa se arquivos por competência, lidos em paralelo, geram o mesmo banco da carga completa."""
+        import pandas as pd
+        import cria_db
+
+        raiz = Path(__file__).resolve().parent.parent
+        diretorio = tmp_path / "cargas"
+        diretorio.mkdir()
+        for competencia, parte in pd.read_csv(raiz / cria_db.CSV_FILE).groupby("competencia"):
+            parte.to_csv(diretorio / f"folha_{competencia}.csv", index=False)
+        (diretorio / "invalido.csv").write_text("matricula,competencia\nA-1,202401\n", encoding="utf-8")
+        completo = sqlite3.connect(folha_db)
+
+        resultado = cria_db.carga_paralela(banco_vazio, cria_db.arquivos_carga(str(diretorio)), tamanho_lote=20, processos=2)
+
+        assert sum(resultado["linhas"].values()) == 206
+        assert list(resultado["erros"]) == [str(diretorio / "invalido.csv")]
+        assert "Coluna(s) ausente(s)" in resultado["erros"][str(diretorio / "invalido.csv")]
+        assert cria_db.arquivos_carga(str(diretorio / "folha_*.csv")) == sorted(str(p) for p in diretorio.glob("folha_*.csv"))
+        assert self.resumo(banco_vazio) == self.resumo(completo)
+        completo.close()
+
+    @pytest.mark.integration
+    @pytest.mark.db
+    def test_falha_do_gravador_interrompe_a_carga(self, tmp_path, monkeypatch):
+        """Testa se uma falha na gravação encerra a carga paralela, com os leitores parados, em vez de travá-la."""
+        import threading
+        import pandas as pd
+        import cria_db
+
+        raiz = Path(__file__).resolve().parent.parent
+        monkeypatch.chdir(tmp_path)
+        diretorio = tmp_path / "cargas"
+        diretorio.mkdir()
+        for competencia, parte in pd.read_csv(raiz / cria_db.CSV_FILE).groupby("competencia"):
+            parte.to_csv(diretorio / f"folha_{competencia}.csv", index=False)
+
+        # O segundo lote gravado falha como um banco travado
+        gravacoes = []
+        grava_lote = cria_db._grava_lote
+
+        def grava_com_falha(conn, lote):
+            gravacoes.append(len(lote))
+            if len(gravacoes) == 2:
+                raise sqlite3.OperationalError("database is locked")
+            grava_lote(conn, lote)
+
+        monkeypatch.setattr(cria_db, "_grava_lote", grava_com_falha)
+        erros = []
+
+        # A carga roda em outra thread (com sua própria conexão) para que um travamento não prenda o teste
+        def carrega():
+            conn, _ = cria_db.cria_database(str(tmp_path / "paralela.db"), str(raiz / cria_db.SQL_FILE))
+            try:
+                cria_db.carga_paralela(conn, cria_db.arquivos_carga(str(diretorio)), tamanho_lote=5, processos=2, tamanho_fila=1)
+            except sqlite3.OperationalError as e:
+                erros.append(e)
+            finally:
+                conn.close()
+
+        thread = threading.Thread(target=carrega, daemon=True)
+        thread.start()
+        thread.join(timeout=30)
+
+        assert not thread.is_alive()
+        assert len(erros) == 1 and "locked" in str(erros[0])
+
+    @pytest.mark.integration
+    @pytest.mark.db
+    def test_carga_rapida_monta_banco_completo(self, folha_db, tmp_path, capsys):
+        """Testa se a carga rápida troca o banco de uma vez, com índices, busca, derivados e estatísticas."""
+        import cria_db
+
+        raiz = Path(__file__).resolve().parent.parent
+        destino = tmp_path / "rapido.db"
+        destino.write_text("banco antigo")
+        completo = sqlite3.connect(folha_db)
+
+        resultado = cria_db.carga_rapida(str(destino), str(raiz / cria_db.CSV_FILE), str(raiz / cria_db.SQL_FILE))
+
+        # Só publica_snapshot anuncia a publicação; a carga rápida apenas monta o arquivo
+        saida = capsys.readouterr().out
+        assert f"Banco '{destino}' montado: 206 linha(s)" in saida and "publicado" not in saida
+
+        conn = sqlite3.connect(destino)
+        indices = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        assert resultado["linhas"] == 206 and resultado["linhas_por_segundo"] > 0
+        assert self.resumo(conn) == self.resumo(completo)
+        assert {"idx_folha_matricula_competencia", "idx_folha_competencia", "idx_servidores_nome"} <= indices
+        assert conn.execute("SELECT COUNT(*) FROM sqlite_stat1").fetchone()[0] > 0
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "delete"
+        assert conn.execute("SELECT COUNT(*) FROM tb_busca_servidores WHERE tb_busca_servidores MATCH 'saude'").fetchone()[0] > 0
+        assert conn.execute("SELECT COUNT(*) FROM sqlite_master WHERE name = 'trg_busca_servidores_insere'").fetchone()[0] == 1
+        assert [p.name for p in tmp_path.iterdir() if p.name.startswith("rapido.db")] == ["rapido.db"]
+        conn.close()
+        completo.close()
+
+
+class TestValidacaoCarga:
+    """Testes da validação vetorizada da carga e da quarentena das linhas recusadas."""
+
+    CABECALHO = "nome,cpf,matricula,orgao,cargo,competencia,vencimentos,descontos,liquido\n"
+
+    @pytest.fixture
+    def arquivo_sujo(self, tmp_path):
+        """Arquivo com uma linha de cada defeito, além de duas válidas."""
+        arquivo = tmp_path / "sujo.csv"
+        arquivo.write_text(
+            self.CABECALHO
+            + "Servidor 1,202.535.960-24,A-1000,Secretaria da Saúde,Assistente,202401,100.0,10.0,90.0\n"
+            + "Servidor 2,20617180030,A-1001,Secretaria da Saúde,Assistente,202413,100.0,10.0,90.0\n"
+            + "Servidor 3,123,A-1002,Secretaria da Saúde,Assistente,202401,100.0,10.0,80.0\n"
+            + "Servidor 1,202.535.960-24,A-1000,Secretaria da Saúde,Assistente,202401,100.0,10.0,90.0\n"
+            + "Servidor 4,206.171.800-30,,Secretaria da Saúde,Assistente,202401,100.0,10.0,\n"
+            + "Servidor 1,202.535.960-24,A-1000,Secretaria da Saúde,Assistente,202402,100.0,10.0,90.0\n",
+            encoding="utf-8",
+        )
+        return arquivo
+
+    @pytest.mark.unit
+    def test_mascaras_por_motivo(self, arquivo_sujo):
+        """Testa se cada verificação marca apenas as linhas com o seu defeito."""
+        import pandas as pd
+        import cria_db
+
+        motivos = cria_db.valida_lote(pd.read_csv(arquivo_sujo))
+
+        assert motivos.to_dict("list") == {
+            "matricula_ausente": [False, False, False, False, True, False],
+            "cpf_invalido": [False, False, True, False, False, False],
+            "competencia_invalida": [False, True, False, False, False, False],
+            "liquido_divergente": [False, False, True, False, True, False],
+        }
+
+    @pytest.mark.integration
+    @pytest.mark.db
+    def test_quarentena_e_relatorio(self, arquivo_sujo, tmp_path, monkeypatch):
+        """Testa se as linhas recusadas (inclusive chaves repetidas entre lotes) vão para a quarentena com os motivos."""
+        import pandas as pd
+        import cria_db
+
+        raiz = Path(__file__).resolve().parent.parent
+        monkeypatch.chdir(tmp_path)
+        conn, _ = cria_db.cria_database(str(tmp_path / "validacao.db"), str(raiz / cria_db.SQL_FILE))
+        quarentena = cria_db.Quarentena(str(tmp_path / "quarentena"))
+
+        total = cria_db.carga_em_lotes(conn, str(arquivo_sujo), tamanho_lote=2, quarentena=quarentena)
+        relatorio = quarentena.relatorio()
+        recusadas = pd.read_csv(quarentena.arquivo)
+
+        assert total == 2
+        assert conn.execute("SELECT matricula, competencia FROM tb_folha_pagamento ORDER BY 2").fetchall() == [
+            ("A-1000", "202401"), ("A-1000", "202402"),
+        ]
+        assert recusadas[["linha", "motivos"]].values.tolist() == [
+            [3, "competencia_invalida"],
+            [4, "cpf_invalido;liquido_divergente"],
+            [5, "chave_duplicada"],
+            [6, "matricula_ausente;liquido_divergente"],
+        ]
+        assert (recusadas["arquivo"] == str(arquivo_sujo)).all()
+        assert relatorio["linhas"] == 6 and relatorio["validas"] == 2 and relatorio["rejeitadas"] == 4
+        assert relatorio["motivos"]["liquido_divergente"] == 2
+        assert json.loads(Path(quarentena.arquivo).with_suffix(".json").read_text(encoding="utf-8")) == relatorio
+        conn.close()
+
+
+class TestSnapshots:
+    """Testes da publicação do banco em snapshots versionados, trocados por um arquivo ponteiro."""
+
+    @staticmethod
+    def copia(folha_db, destino):
+        """Copia o banco de exemplo para um arquivo de trabalho a ser publicado."""
+        shutil.copy(folha_db, destino)
+        return str(destino)
+
+    @pytest.mark.integration
+    @pytest.mark.db
+    def test_publica_e_aponta_para_o_mais_recente(self, folha_db, tmp_path):
+        """Testa se cada publicação gera um snapshot novo, apontado pelo ponteiro, sem tocar no anterior."""
+        import cria_db
+
+        db_file = str(tmp_path / "folha.db")
+        assert cria_db.banco_atual(db_file) == db_file
+
+        primeiro = cria_db.publica_snapshot(self.copia(folha_db, tmp_path / "novo1.db"), db_file)
+        leitor = sqlite3.connect(primeiro)
+        segundo = cria_db.publica_snapshot(self.copia(folha_db, tmp_path / "novo2.db"), db_file)
+
+        assert cria_db.banco_atual(db_file) == segundo != primeiro
+        assert Path(cria_db.ponteiro_snapshot(db_file)).read_text(encoding="utf-8") == Path(segundo).name
+        assert [str(p) for p in cria_db.snapshots(db_file)] == [primeiro, segundo]
+        assert leitor.execute("SELECT COUNT(*) FROM tb_folha_pagamento").fetchone()[0] == 206
+        assert not (tmp_path / "novo1.db").exists() and not (tmp_path / "novo2.db").exists()
+        leitor.close()
+
+    @pytest.mark.integration
+    @pytest.mark.db
+    def test_remove_snapshots_antigos(self, folha_db, tmp_path):
+        """Testa se apenas os snapshots mais recentes são mantidos e se o banco fixo antigo é removido."""
+        import cria_db
+
+        db_file = self.copia(folha_db, tmp_path / "folha.db")
+        publicados = [
+            cria_db.publica_snapshot(self.copia(folha_db, tmp_path / f"novo{i}.db"), db_file, manter=2)
+            for i in range(4)
+        ]
+
+        assert [str(p) for p in cria_db.snapshots(db_file)] == publicados[-2:]
+        assert not Path(db_file).exists()
+        assert cria_db.remove_snapshots_antigos(db_file, manter=1) == [publicados[-2]]
+        assert cria_db.banco_atual(db_file) == publicados[-1]
+
+
+class TestManifesto:
+    """Testes do manifesto de hashes das entradas, do banco publicado e das exportações."""
+
+    @pytest.mark.unit
+    def test_hash_dados_ignora_ordem_e_detecta_mudanca(self):
+        """Testa se o hash do conteúdo não depende da ordem nem dos lotes, mas muda com qualquer valor."""
+        import pandas as pd
+        import cria_db
+
+        df = pd.DataFrame({"matricula": ["A-1", "A-2", "A-3"], "liquido": [1.0, 2.0, 3.0]})
+
+        assert cria_db.hash_dados(df) == cria_db.hash_dados(df.iloc[::-1])
+        assert cria_db.hash_dados(df) == cria_db.hash_dados([df.iloc[:1], df.iloc[1:]])
+        assert cria_db.hash_dados(df) != cria_db.hash_dados(df.assign(liquido=[1.0, 2.0, 3.01]))
+
+    @pytest.mark.integration
+    @pytest.mark.db
+    def test_exporta_apenas_tabelas_alteradas(self, folha_db, tmp_path):
+        """Testa se a exportação com manifesto pula as tabelas iguais e regrava as alteradas ou removidas."""
+        import cria_db
+
+        conn = sqlite3.connect(folha_db)
+        destino = str(tmp_path / "parquet")
+        manifesto = {}
+
+        todas = cria_db.exporta_parquet(conn, destino, manifesto=manifesto)
+        repetida = cria_db.exporta_parquet(conn, destino, manifesto=manifesto)
+        conn.execute("UPDATE tb_resumo_folha_anual SET total_liquido = total_liquido + 1")
+        conn.commit()
+        (tmp_path / "parquet" / "tb_cargos.parquet").unlink()
+        alteradas = cria_db.exporta_parquet(conn, destino, manifesto=manifesto)
+
+        assert "tb_folha_pagamento" in todas and len(todas) == len(manifesto["tabelas"])
+        assert repetida == []
+        assert alteradas == ["tb_cargos", "tb_resumo_folha_anual"]
+        conn.close()
+
+    @pytest.mark.integration
+    @pytest.mark.db
+    def test_versao_do_conteudo_publicado(self, folha_db, tmp_path):
+        """Testa se a versão do conteúdo vale enquanto o banco publicado não é gravado no lugar."""
+        import cria_db
+
+        db_file = str(tmp_path / "folha.db")
+        shutil.copy(folha_db, tmp_path / "novo.db")
+        publicado = cria_db.publica_snapshot(str(tmp_path / "novo.db"), db_file)
+        manifesto = {"conteudo": "abc"}
+        cria_db.registra_banco(manifesto, publicado)
+        cria_db.grava_manifesto(manifesto, db_file)
+
+        assert cria_db.le_manifesto(db_file)["banco"]["arquivo"] == Path(publicado).name
+        assert cria_db.versao_conteudo(db_file) == "abc"
+
+        conn = sqlite3.connect(publicado)
+        conn.execute("DELETE FROM tb_folha_pagamento WHERE competencia = '202401'")
+        conn.commit()
+        conn.close()
+
+        assert cria_db.versao_conteudo(db_file) is None
+
+
+class TestExportacaoPlanilhas:
+    """Testes da etapa de exportação das planilhas (XLSX e CSV) a partir do banco publicado."""
+
+    @pytest.mark.integration
+    @pytest.mark.db
+    def test_exporta_em_lotes_e_pula_inalteradas(self, folha_db, tmp_path):
+        """Testa se as planilhas saem completas em lotes pequenos e se a reexportação pula as inalteradas."""
+        import csv
+        from openpyxl import load_workbook
+        import cria_db
+
+        destino = str(tmp_path / "saidas")
+        manifesto = {}
+
+        gravados = cria_db.exporta_planilhas(folha_db, destino=destino, manifesto=manifesto, processos=2, tamanho_lote=7)
+        repetidos = cria_db.exporta_planilhas(folha_db, destino=destino, manifesto=manifesto, processos=2, tamanho_lote=7)
+
+        conn = sqlite3.connect(folha_db)
+        n_folha = conn.execute("SELECT COUNT(*) FROM tb_folha_pagamento").fetchone()[0]
+        n_servidores = conn.execute("SELECT COUNT(*) FROM tb_servidores").fetchone()[0]
+        conn.close()
+
+        with open(tmp_path / "saidas" / "folha.csv", newline="", encoding="utf-8") as f:
+            linhas = list(csv.reader(f, delimiter=";"))
+        planilha = load_workbook(tmp_path / "saidas" / "servidores.xlsx", read_only=True).active
+
+        assert len(gravados) == 4 and all(gravados.values())
+        assert not any(repetidos.values())
+        assert linhas[0] == ["matricula", "competencia", "vencimentos", "descontos", "liquido"]
+        assert len(linhas) == n_folha + 1 and linhas[1][1].isdigit()
+        assert sum(1 for _ in planilha.iter_rows()) == n_servidores + 1
+        assert set(manifesto["saidas"]) == set(gravados)
+
+    @pytest.mark.integration
+    @pytest.mark.db
+    def test_csv_igual_a_exportacao_anterior(self, folha_db, tmp_path):
+        """Testa se os CSVs saem byte a byte iguais aos gravados antes pelo pandas (to_csv com ';')."""
+        import pandas as pd
+        import cria_db
+
+        raiz = Path(__file__).resolve().parent.parent
+        df = pd.read_csv(raiz / cria_db.CSV_FILE)
+        anteriores = {
+            "servidores": df[["nome", "cpf", "matricula", "orgao", "cargo"]].drop_duplicates(),
+            "folha": df[["matricula", "competencia", "vencimentos", "descontos", "liquido"]],
+        }
+
+        cria_db.exporta_planilhas(folha_db, formatos=("csv",), destino=str(tmp_path), processos=1)
+
+        for nome, anterior in anteriores.items():
+            assert (tmp_path / f"{nome}.csv").read_bytes() == anterior.to_csv(index=False, sep=";", lineterminator="\n").encode("utf-8")
+
+    @pytest.mark.integration
+    @pytest.mark.db
+    def test_ordem_estavel_no_layout_compacto(self, folha_db, tmp_path):
+        """Testa se a folha compacta (sem id) sai ordenada pela chave natural, igual a cada exportação."""
+        import csv
+        import cria_db
+
+        conn = sqlite3.connect(folha_db)
+        cria_db.compacta_folha(conn)
+        conn.close()
+
+        cria_db.exporta_planilhas(folha_db, formatos=("csv",), destino=str(tmp_path / "a"), processos=1)
+        cria_db.exporta_planilhas(folha_db, formatos=("csv",), destino=str(tmp_path / "b"), processos=1)
+        with open(tmp_path / "a" / "folha.csv", newline="", encoding="utf-8") as f:
+            linhas = list(csv.reader(f, delimiter=";"))[1:]
+
+        assert linhas == sorted(linhas, key=lambda linha: (linha[0], int(linha[1])))
+        assert (tmp_path / "a" / "folha.csv").read_bytes() == (tmp_path / "b" / "folha.csv").read_bytes()
@@ -0,0 +1,118 @@
+"""
+Testes para o módulo de execução das chamadas de ferramenta dos agentes (nó de ferramentas do grafo).
+"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from consulta_db import CacheResultados, GerenciadorConexoes, executa_consulta_folha
+from ferramentas import executa_chamadas, executa_chamadas_async
+
+
+class FerramentaFalsa:
+    """Ferramenta com a interface usada pelo nó (invoke/ainvoke), no lugar da StructuredTool do LangChain."""
+
+    def __init__(self, funcao):
+        self.funcao = funcao
+        self.threads = []
+
+    def invoke(self, args):
+        self.threads.append(threading.current_thread().name)
+        return self.funcao(**args)
+
+    async def ainvoke(self, args):
+        return self.funcao(**args)
+
+
+def chamada(nome, args, id_=None):
+    """Monta uma chamada de ferramenta no formato das mensagens da IA."""
+    return {"name": nome, "args": args, "id": id_ or f"{nome}-{id(args)}"}
+
+
+class TestExecutaChamadas:
+    """Testes da execução das chamadas de ferramenta, síncrona e assíncrona."""
+
+    CONSULTAS = [
+        "SELECT COUNT(*) FROM tb_servidores",
+        "SELECT COUNT(*) FROM tb_folha_pagamento WHERE competencia = '202401'",
+        "SELECT nome FROM tb_servidores WHERE matricula = 'A-1000'",
+        "SELECT * FROM tabela_inexistente",
+    ]
+
+    @pytest.fixture
+    def ferramentas(self, folha_db):
+        """Ferramenta de consulta sobre o banco de exemplo, uma busca e uma ferramenta que sempre falha."""
+        gerenciador = GerenciadorConexoes(folha_db)
+
+        def falha(termo):
+            raise ValueError(f"termo inválido: {termo}")
+
+        yield {
+            "query_folha_database": FerramentaFalsa(lambda sql_query: executa_consulta_folha(sql_query, gerenciador, CacheResultados(0))),
+            "busca_servidor": FerramentaFalsa(lambda termo: f"busca: {termo}"),
+            "quebrada": FerramentaFalsa(falha),
+        }
+        gerenciador.fecha_todas()
+
+    @pytest.mark.integration
+    @pytest.mark.db
+    def test_consultas_paralelas_na_ordem_das_chamadas(self, ferramentas):
+        """Testa se várias consultas rodam no pool e voltam na ordem das chamadas, iguais às sequenciais."""
+        consulta = ferramentas["query_folha_database"]
+        sequenciais = [consulta.funcao(sql) for sql in self.CONSULTAS]
+        chamadas = [chamada("query_folha_database", {"sql_query": sql}) for sql in self.CONSULTAS]
+
+        conteudos = executa_chamadas(chamadas, ferramentas, paralelas={"query_folha_database"})
+
+        assert conteudos == sequenciais
+        assert conteudos[3].startswith("Erro ao executar a consulta SQL")
+        assert all(nome.startswith("consulta_folha") for nome in consulta.threads)
+
+    @pytest.mark.integration
+    @pytest.mark.db
+    def test_erros_e_ferramentas_desconhecidas(self, ferramentas):
+        """Testa se exceções, argumentos inválidos e ferramentas inexistentes viram conteúdo de erro, na ordem."""
+        chamadas = [
+            chamada("busca_servidor", {"termo": "saude"}),
+            chamada("quebrada", {"termo": "x"}),
+            chamada("query_folha_database", {"sql": "SELECT 1"}),
+            chamada("inexistente", {}),
+        ]
+
+        conteudos = executa_chamadas(chamadas, ferramentas, paralelas={"query_folha_database"})
+        assincronos = asyncio.run(executa_chamadas_async(chamadas, ferramentas))
+
+        assert conteudos[0] == "busca: saude"
+        assert conteudos[1] == "Erro: termo inválido: x"
+        assert conteudos[2].startswith("Erro: ") and "sql" in conteudos[2]
+        assert conteudos[3] == "Erro: ferramenta 'inexistente' não existe."
+        assert assincronos == conteudos
+
+    @pytest.mark.integration
+    @pytest.mark.db
+    def test_consulta_isolada_com_busca_roda_na_thread(self, ferramentas):
+        """Testa se uma única consulta junto com a busca roda na própria thread, sem passar pelo pool."""
+        chamadas = [
+            chamada("busca_servidor", {"termo": "fazenda"}),
+            chamada("query_folha_database", {"sql_query": self.CONSULTAS[0]}),
+        ]
+
+        conteudos = executa_chamadas(chamadas, ferramentas, paralelas={"query_folha_database"})
+
+        assert conteudos == ["busca: fazenda", "Resultado: COUNT(*) = 200"]
+        assert ferramentas["query_folha_database"].threads == [threading.current_thread().name]
+
+    @pytest.mark.unit
+    def test_chamadas_lentas_rodam_ao_mesmo_tempo(self):
+        """Testa se chamadas paralelas se sobrepõem no tempo e ainda assim mantêm a ordem."""
+        lenta = FerramentaFalsa(lambda atraso: time.sleep(atraso) or atraso)
+        chamadas = [chamada("lenta", {"atraso": a}) for a in (0.3, 0.1, 0.2)]
+
+        inicio = time.perf_counter()
+        conteudos = executa_chamadas(chamadas, {"lenta": lenta}, paralelas={"lenta"})
+
+        assert conteudos == [0.3, 0.1, 0.2]
+        assert time.perf_counter() - inicio < 0.55